@@ -1,15 +1,17 @@
 import os
 import json
 import logging
+import time
 from typing import Dict, List, Optional, Any, Tuple
 import boto3
 from botocore.config import Config
 from tools.search_web import search_web
-from tools.get_page_content import get_page_content
+from tools.fetch_scheduler import FetchScheduler
+from tools.http_client import http_client
 from tools.extract_vocabulary import extract_vocabulary
 from tools.generate_song_id import generate_song_id
 from database import Database
-from config import AWS_CONFIG, MODEL_CONFIG, DB_PATH, LOG_CONFIG
+from config import AWS_CONFIG, MODEL_CONFIG, DB_PATH, LOG_CONFIG, FETCH_CONFIG
 
 # Configure logging
 logging.basicConfig(**LOG_CONFIG)
@@ -19,6 +21,9 @@ class LyricsAgent:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.history: List[Dict[str, Any]] = []
+        # Seconds spent in each stage of the last run
+        self.timings: Dict[str, float] = {}
+        self.fetch_scheduler = FetchScheduler(**FETCH_CONFIG)
         # Initialize Bedrock client with configuration values
         self.bedrock_runtime = boto3.client(
             service_name=AWS_CONFIG["service"],
@@ -45,14 +50,19 @@ class LyricsAgent:
         """
         try:
             self.logger.info(f"Agent running search for '{song_name}' by '{artist_name}'")
+            self.timings = {}
             
             # Get the lyrics
             lyrics = await self.get_lyrics(song_name, artist_name)
             if not lyrics:
+                self._log_timings()
                 return {"error": "Could not find lyrics for this song"}
             
             # Process the lyrics with configured temperature and max_tokens
+            started = time.perf_counter()
             result = await self.process_lyrics(lyrics)
+            self.timings["process"] = time.perf_counter() - started
+            self._log_timings()
             
             # Store in database if successful
             if result.get("success", False):
@@ -84,7 +94,8 @@ class LyricsAgent:
                 "vocabulary": result.get("vocabulary", []),
                 "success": result.get("success", False),
                 "error": result.get("error", None),
-                "song_id": song_id if result.get("success", False) else None
+                "song_id": song_id if result.get("success", False) else None,
+                "timings": dict(self.timings)
             }
             
         except Exception as e:
@@ -92,21 +103,33 @@ class LyricsAgent:
             return {"error": f"An unexpected error occurred: {str(e)}"}
 
     async def get_lyrics(self, song_name: str, artist_name: str = None):
-        # Search for lyrics using configured temperature
+        # Search for lyrics; the candidates are fetched here, not by the search
+        started = time.perf_counter()
         results, status = await search_web(
-            f"{song_name} {artist_name} 歌词"
+            f"{song_name} {artist_name} 歌词",
+            fetch_content=False
         )
+        self.timings["search"] = time.perf_counter() - started
         
-        # Get content from results with configured max_tokens
-        for result in results:
-            content = await get_page_content(
-                result["url"]
-            )
-            if content:
-                return content
+        # Race the candidates: the first page that looks like lyrics wins
+        started = time.perf_counter()
+        try:
+            found = await self.fetch_scheduler.first_good([result["url"] for result in results])
+        finally:
+            self.timings["fetch"] = time.perf_counter() - started
         
+        if found:
+            url, content, score = found
+            self.logger.info(f"Using lyrics from {url} (score {score:.2f})")
+            return content
         return None
 
+    def _log_timings(self):
+        """Log the per-stage breakdown of the last run."""
+        breakdown = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.timings.items())
+        self.logger.info(f"Stage timings: {breakdown} (total {sum(self.timings.values()):.2f}s)")
+        self.logger.debug(f"HTTP pool: {http_client.stats()}")
+
     async def process_lyrics(self, lyrics: str) -> Dict[str, Any]:
         """Process lyrics text and extract vocabulary."""
         try:
@@ -29,6 +29,29 @@ SEARCH_CONFIG = {
     "excluded_sites_path": Path(__file__).parent / "excluded_sites.json"
 }
 
+# Shared HTTP client for page fetches and lang-portal calls (tools/http_client.py)
+HTTP_CONFIG = {
+    "limit": 20,                       # Open connections in total
+    "limit_per_host": 2,               # Open connections per host
+    "ttl_dns_cache": 300,              # Seconds DNS lookups are cached
+    "keepalive_timeout": 30,           # Seconds an idle connection is kept open
+    "timeout": SEARCH_CONFIG["timeout"]
+}
+
+# Page cache for fetched lyrics pages (tools/page_cache.py)
+PAGE_CACHE_CONFIG = {
+    "path": Path(__file__).parent / "page_cache.db",
+    "ttl": 3600,                       # Seconds before a cached page is revalidated
+    "max_bytes": 64 * 1024 * 1024      # Compressed bodies kept before evicting the least recently used
+}
+
+# Concurrent fetching of search results (tools/fetch_scheduler.py)
+FETCH_CONFIG = {
+    "top_k": 3,                        # Candidates fetched at once
+    "per_host": 1,                     # Concurrent fetches per host
+    "min_score": 0.5                   # Lyrics score that ends the race
+}
+
 # AWS Configuration
 AWS_CONFIG = {
     "region": os.getenv("AWS_REGION", "us-east-1"),
@@ -46,6 +69,15 @@ MODEL_CONFIG = {
     "model_id": "anthropic.claude-3-sonnet-20240229-v1:0"  # Updated to Claude 3 Sonnet
 }
 
+# Bedrock call pacing (tools/extract_vocabulary.py)
+BEDROCK_CONFIG = {
+    "max_concurrency": 4,              # Calls in flight at once
+    "requests_per_second": 2.0,        # Starting and highest call rate
+    "min_requests_per_second": 0.2,    # Floor the rate backs off to when throttled
+    "burst": 4,                        # Calls that may start back to back
+    "max_retries": 5                   # Retries of a throttled call
+}
+
 # Agent Configuration (now only contains agent-specific settings)
 AGENT_CONFIG = {
     "exclusion_duration_hours": 24,
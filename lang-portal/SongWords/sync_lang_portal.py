@@ -1,11 +1,16 @@
 import requests
 from database import Database
-from typing import Dict, List
+from typing import Dict, List, Optional
 import logging
+import time
 from config import LANG_PORTAL_URL, DB_PATH, SEARCH_CONFIG, LOG_CONFIG
+from tools.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
+# Seconds before the first retry of a failed lang-portal request; doubles each time
+RETRY_BACKOFF = 0.5
+
 class LangPortalSync:
     def __init__(self, lang_portal_url: str = None):
         # Use configured URL as default, allow override for testing
@@ -20,7 +25,8 @@ class LangPortalSync:
         
         while True:
             try:
-                response = requests.get(
+                response = http_client.request(
+                    "GET",
                     f"{self.lang_portal_url}/words", 
                     params={"page": page},
                     timeout=SEARCH_CONFIG["timeout"]
@@ -51,6 +57,35 @@ class LangPortalSync:
                 
         return all_words
 
+    def find_lang_portal_word(self, jiantizi: str) -> Optional[dict]:
+        """Look a single word up by jiantizi with lang-portal's search endpoint.
+
+        Server errors, timeouts and connection errors are retried with
+        exponential backoff; a 4xx response fails at once.
+        """
+        retries = 0
+        while True:
+            try:
+                response = http_client.request(
+                    "GET",
+                    f"{self.lang_portal_url}/words/search",
+                    params={"q": jiantizi, "field": "jiantizi", "match": "exact", "limit": 1},
+                    timeout=SEARCH_CONFIG["timeout"]
+                )
+                if response.status_code == 200:
+                    words = response.json()["words"]
+                    return words[0] if words else None
+                if response.status_code < 500:
+                    raise Exception(f"Failed to search lang-portal for {jiantizi}: {response.text}")
+                error = f"Failed to search lang-portal for {jiantizi}: {response.text}"
+            except (requests.Timeout, requests.ConnectionError) as e:
+                error = f"Request failed while searching lang-portal for {jiantizi}: {str(e)}"
+
+            if retries >= SEARCH_CONFIG["max_retries"]:
+                raise Exception(error)
+            time.sleep(RETRY_BACKOFF * 2 ** retries)
+            retries += 1
+
     def resolve_conflict(self, songwords_word: dict, lang_portal_word: dict) -> dict:
         """
         Resolve conflicts between two versions of the same word.
@@ -81,15 +116,16 @@ class LangPortalSync:
         retries = 0
         
         try:
-            # Get all words from both systems
+            # Look each SongWords word up in lang-portal instead of downloading every page
             songwords_vocab = self.db.get_all_unique_vocabulary()
-            lang_portal_words = self.get_lang_portal_words()
             
             for word in songwords_vocab:
                 try:
-                    if word["jiantizi"] not in lang_portal_words:
+                    existing_word = self.find_lang_portal_word(word["jiantizi"])
+                    if existing_word is None:
                         # Add new word to lang-portal
-                        response = requests.post(
+                        response = http_client.request(
+                            "POST",
                             f"{self.lang_portal_url}/words",
                             json=word,
                             timeout=SEARCH_CONFIG["timeout"]
@@ -104,11 +140,11 @@ class LangPortalSync:
                             logger.error(f"Failed to add word {word['jiantizi']}: {response.text}")
                     else:
                         # Handle potential conflicts
-                        existing_word = lang_portal_words[word["jiantizi"]]
                         resolved_word = self.resolve_conflict(word, existing_word)
                         
                         if resolved_word != existing_word:
-                            response = requests.put(
+                            response = http_client.request(
+                                "PUT",
                                 f"{self.lang_portal_url}/words/{existing_word['id']}",
                                 json=resolved_word,
                                 timeout=SEARCH_CONFIG["timeout"]
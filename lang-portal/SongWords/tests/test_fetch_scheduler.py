@@ -0,0 +1,39 @@
+# Test lyrics scoring and the candidate race in the fetch scheduler
+
+import asyncio
+from config import FETCH_CONFIG
+from tools.fetch_scheduler import FetchScheduler, score_lyrics
+
+LYRICS = ' '.join(['月亮代表我的心', '你问我爱你有多深', '我爱你有几分', '我的情也真', '我的爱也真'] * 8)
+
+ENGLISH_404 = '''<html><head><title>404 Not Found</title></head>
+<body><h1>Page not found</h1><p>The page you requested could not be found on this server.</p>
+<p>Please check the address and try again later.</p></body></html>'''
+
+def test_lyrics_pass_and_other_pages_do_not():
+    assert score_lyrics(LYRICS) >= FETCH_CONFIG["min_score"]
+    assert score_lyrics(ENGLISH_404) == 0.0
+    assert score_lyrics('Not Found') < FETCH_CONFIG["min_score"]
+    # Chinese prose without line breaks is one long run
+    assert score_lyrics('关于我们的网站是一个非常好的地方欢迎您来访问并且留下评论谢谢') < FETCH_CONFIG["min_score"]
+
+def test_first_good_page_wins_and_the_rest_are_cancelled():
+    pages = {
+        'https://a.example.com/404': (0.01, ENGLISH_404),
+        'https://b.example.com/song': (0.05, LYRICS),
+        'https://c.example.com/song': (5, LYRICS),
+    }
+    cancelled = []
+
+    async def fetch(url):
+        delay, body = pages[url]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(url)
+            raise
+        return body
+
+    url, content, score = asyncio.run(FetchScheduler(fetch=fetch).first_good(list(pages)))
+    assert url == 'https://b.example.com/song'
+    assert cancelled == ['https://c.example.com/song']
@@ -0,0 +1,42 @@
+# Test that get_page_content only returns and caches pages with Chinese text
+
+import asyncio
+import importlib
+import pytest
+from config import SEARCH_CONFIG
+from tools.excluded_sites import ExcludedSitesTracker
+from tools.page_cache import PageCache
+
+page_content = importlib.import_module('tools.get_page_content')
+
+ENGLISH_404 = '''<html><head><title>404 Not Found</title></head>
+<body><h1>Page not found</h1><p>The page you requested could not be found on this server.</p>
+<p>Please check the address and try again later.</p></body></html>'''
+
+LYRICS = '<html><body><p>月亮代表我的心</p><p>你问我爱你有多深</p></body></html>'
+
+@pytest.fixture
+def fetcher(tmp_path, monkeypatch):
+    """Serve get_page_content the given body for every URL, with a fresh cache and no delays."""
+    monkeypatch.setitem(SEARCH_CONFIG, 'excluded_sites_path', tmp_path / 'excluded_sites.json')
+    monkeypatch.setattr(page_content, 'excluded_sites', ExcludedSitesTracker())
+    monkeypatch.setattr(page_content, 'page_cache', PageCache(tmp_path / 'pages.db'))
+    monkeypatch.setattr(page_content.random, 'uniform', lambda low, high: 0)
+
+    def serve(body):
+        async def fetch(url, headers=None, cookies=None):
+            return {"status": 200, "headers": {}, "url": url, "text": body}
+        monkeypatch.setattr(page_content.http_client, 'fetch', fetch)
+
+    return serve
+
+def test_page_without_chinese_is_not_found(fetcher):
+    fetcher(ENGLISH_404)
+    assert asyncio.run(page_content.get_page_content('https://lyrics.example.com/missing')) == ""
+    assert page_content.page_cache.get('https://lyrics.example.com/missing') is None
+
+def test_chinese_page_is_returned_and_cached(fetcher):
+    fetcher(LYRICS)
+    content = asyncio.run(page_content.get_page_content('https://lyrics.example.com/song'))
+    assert content == '月亮代表我的心 你问我爱你有多深'
+    assert page_content.page_cache.get('https://lyrics.example.com/song')['content'] == content
@@ -0,0 +1,52 @@
+# Test the adaptive token bucket pacing Bedrock calls
+
+import asyncio
+import threading
+from time import monotonic
+from tools.rate_limiter import AdaptiveTokenBucket
+
+def test_concurrent_throttles_cut_the_rate_once():
+    bucket = AdaptiveTokenBucket(rate=8, burst=4, min_rate=0.5)
+
+    async def run():
+        # Four calls in flight at once, all throttled
+        sent = [await bucket.acquire() for _ in range(4)]
+        for acquired_at in sent:
+            bucket.throttled(acquired_at)
+        assert bucket.rate == 4
+        # A call let through after the cut that is throttled again cuts again
+        bucket.throttled(await bucket.acquire())
+        assert bucket.rate == 2
+
+    asyncio.run(run())
+
+def test_bucket_works_across_event_loops():
+    bucket = AdaptiveTokenBucket(rate=50, burst=1)
+
+    async def calls():
+        await asyncio.gather(*(bucket.acquire() for _ in range(3)))
+
+    # Streamlit runs every script run in a new event loop
+    asyncio.run(calls())
+    asyncio.run(calls())
+    bucket.succeeded()
+    assert bucket.rate == 50
+
+def test_threads_share_the_rate():
+    bucket = AdaptiveTokenBucket(rate=40, burst=2)
+
+    async def calls():
+        return [await bucket.acquire() for _ in range(6)]
+
+    # Each Streamlit session thread runs its own event loop on the same bucket
+    sent = []
+    threads = [threading.Thread(target=lambda: sent.extend(asyncio.run(calls()))) for _ in range(4)]
+    started = monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 24 calls with 2 tokens to start with take at least 22 refills at 40/s
+    assert len(sent) == 24
+    assert max(sent) - started >= 22 / 40 - 0.01
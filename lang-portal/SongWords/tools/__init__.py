@@ -4,11 +4,15 @@ from .get_page_content import get_page_content
 from .extract_vocabulary import extract_vocabulary
 from .generate_song_id import generate_song_id
 from .excluded_sites import ExcludedSitesTracker
+from .page_cache import PageCache
+from .http_client import http_client
 
 __all__ = [
     'search_web',
     'get_page_content',
     'extract_vocabulary',
     'generate_song_id',
-    'ExcludedSitesTracker'
+    'ExcludedSitesTracker',
+    'PageCache',
+    'http_client'
 ]
\ No newline at end of file
@@ -8,7 +8,10 @@ import logging
 from .text_processing import (process_chinese_text, convert_to_simplified, 
                             contains_chinese, deduplicate_translations)
 import asyncio
-from config import AWS_CONFIG, MODEL_CONFIG
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from .rate_limiter import AdaptiveTokenBucket
+from config import AWS_CONFIG, MODEL_CONFIG, BEDROCK_CONFIG
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,15 +20,51 @@ logger = logging.getLogger(__name__)
 # Constants for Claude 3 Sonnet interaction
 MAX_CHARS_PER_CHUNK = 2000  # Conservative estimate for input text
 
-# Initialize Bedrock client
+# Initialize Bedrock client; throttled calls are retried by invoke_model
+# through the limiter, not inside botocore where the limiter cannot see them
 bedrock_runtime = boto3.client(
     service_name=AWS_CONFIG["service"],
     config=Config(
         region_name=AWS_CONFIG["region"],
-        retries=AWS_CONFIG["retries"]
+        retries={"total_max_attempts": 1, "mode": "standard"},
+        max_pool_connections=BEDROCK_CONFIG["max_concurrency"]
     )
 )
 
+# invoke_model blocks, so it runs on a thread pool; the limiter paces the
+# calls and slows down when Bedrock throttles
+executor = ThreadPoolExecutor(max_workers=BEDROCK_CONFIG["max_concurrency"], thread_name_prefix="bedrock")
+limiter = AdaptiveTokenBucket(
+    rate=BEDROCK_CONFIG["requests_per_second"],
+    burst=BEDROCK_CONFIG["burst"],
+    min_rate=BEDROCK_CONFIG["min_requests_per_second"]
+)
+THROTTLING_ERRORS = ("ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException")
+
+def _invoke(body: str) -> Dict[str, Any]:
+    response = bedrock_runtime.invoke_model(modelId=MODEL_CONFIG["model_id"], body=body)
+    return json.loads(response.get('body').read())
+
+async def invoke_model(body: str) -> Dict[str, Any]:
+    """
+    Call the model without blocking the event loop and return the response body.
+    
+    Throttled calls are retried after the limiter backs off, up to
+    BEDROCK_CONFIG["max_retries"] times; other errors are raised.
+    """
+    loop = asyncio.get_running_loop()
+    for attempt in range(BEDROCK_CONFIG["max_retries"] + 1):
+        acquired_at = await limiter.acquire()
+        try:
+            response_body = await loop.run_in_executor(executor, _invoke, body)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in THROTTLING_ERRORS or attempt == BEDROCK_CONFIG["max_retries"]:
+                raise
+            limiter.throttled(acquired_at)
+            continue
+        limiter.succeeded()
+        return response_body
+
 async def extract_lyrics_and_segment(text: str) -> List[str]:
     """
     Extract lyrics from text and segment them into verses/stanzas.
@@ -61,12 +100,7 @@ async def extract_lyrics_and_segment(text: str) -> List[str]:
             ]
         })
         
-        response = bedrock_runtime.invoke_model(
-            modelId=MODEL_CONFIG["model_id"],
-            body=body
-        )
-        
-        response_body = json.loads(response.get('body').read())
+        response_body = await invoke_model(body)
         segments = response_body.get('content', [])[0].get('text', '').strip().split('\n')
         segments = [s.strip() for s in segments if s.strip()]
         
@@ -142,12 +176,7 @@ async def translate_segment(segment: str) -> List[Dict[str, str]]:
             ]
         })
         
-        response = bedrock_runtime.invoke_model(
-            modelId=MODEL_CONFIG["model_id"],
-            body=body
-        )
-        
-        response_body = json.loads(response.get('body').read())
+        response_body = await invoke_model(body)
         translation_text = response_body.get('content', [])[0].get('text', '').strip()
         
         # Parse the response into individual vocabulary units
@@ -204,17 +233,20 @@ async def extract_vocabulary(text: str) -> Tuple[str, List[Dict[str, Any]]]:
         segments = await extract_lyrics_and_segment(simplified_text)
         logger.info(f"Extracted {len(segments)} segments")
         
-        # Process segments with increased delay between calls
-        translations = []
-        for i, segment in enumerate(segments):
-            # Add longer delay between segments to avoid rate limits
-            if i > 0:
-                await asyncio.sleep(3)
-            
+        # Translate the segments concurrently; the limiter in invoke_model
+        # paces the calls and gather keeps them in verse order
+        done = 0
+        
+        async def translate(segment: str) -> List[Dict[str, str]]:
+            nonlocal done
             translation = await translate_segment(segment)
-            if translation:
-                translations.extend(translation)
-            logger.info(f"Translated segment {i+1}/{len(segments)}")
+            done += 1
+            logger.info(f"Translated segment {done}/{len(segments)}")
+            return translation
+        
+        translations = []
+        for translation in await asyncio.gather(*(translate(segment) for segment in segments)):
+            translations.extend(translation)
         
         # Deduplicate translations
         unique_translations = deduplicate_translations(translations)
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import re
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from .get_page_content import get_page_content
+from .text_processing import contains_chinese
+
+logger = logging.getLogger(__name__)
+
+CHINESE_RUN = re.compile(r'[\u4e00-\u9fff]+')
+
+def score_lyrics(content: str) -> float:
+    """
+    Score processed page content for how much it looks like song lyrics.
+
+    Processed content is the page's runs of Chinese characters joined by
+    spaces. Lyrics give many short runs (one per line); navigation, comments
+    and articles give few runs or long ones. The score is the share of runs
+    of lyric line length, scaled down for pages with little text at all.
+    Only Chinese runs count, so a page without Chinese scores 0.
+    Returns a value between 0 and 1.
+    """
+    if not contains_chinese(content):
+        return 0.0
+    runs = CHINESE_RUN.findall(content)
+    characters = sum(len(run) for run in runs)
+    volume = min(characters / 200, 1.0)
+    lines = sum(1 for run in runs if 4 <= len(run) <= 20)
+    return volume * lines / len(runs)
+
+def _host(url: str) -> str:
+    """Host a URL is fetched from; www. and bare domains share a limit."""
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+class FetchScheduler:
+    """
+    Fetch candidate pages concurrently and return the first good one.
+
+    Up to `top_k` candidates are fetched at once, at most `per_host` of them
+    from the same host. Each body is scored as it arrives; the first one
+    scoring `min_score` or more wins and the fetches still running are
+    cancelled. A candidate that falls short frees its slot for the next one.
+    When none passes, the best scoring non-empty page is returned.
+    """
+
+    def __init__(self, top_k: int = 3, per_host: int = 1, min_score: float = 0.5,
+                 fetch: Callable[[str], Awaitable[str]] = get_page_content,
+                 score: Callable[[str], float] = score_lyrics):
+        self.top_k = top_k
+        self.per_host = per_host
+        self.min_score = min_score
+        self.fetch = fetch
+        self.score = score
+
+    async def first_good(self, urls: List[str]) -> Optional[Tuple[str, str, float]]:
+        """Return (url, content, score) of the winning page, or None if every fetch came back empty."""
+        limits: Dict[str, asyncio.Semaphore] = {}
+
+        async def fetch_one(url: str) -> Tuple[str, str]:
+            limit = limits.setdefault(_host(url), asyncio.Semaphore(self.per_host))
+            async with limit:
+                return url, await self.fetch(url)
+
+        queue = list(dict.fromkeys(urls))
+        running = set()
+        best = None
+        try:
+            while queue or running:
+                while queue and len(running) < self.top_k:
+                    running.add(asyncio.create_task(fetch_one(queue.pop(0))))
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        logger.warning(f"Candidate fetch failed: {task.exception()}")
+                        continue
+                    url, content = task.result()
+                    if not content:
+                        continue
+                    score = self.score(content)
+                    logger.info(f"Candidate {url} scored {score:.2f}")
+                    if score >= self.min_score:
+                        return url, content, score
+                    if best is None or score > best[2]:
+                        best = (url, content, score)
+        finally:
+            # The first good page ends the race; nobody waits for the rest
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+        return best
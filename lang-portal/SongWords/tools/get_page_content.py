@@ -1,14 +1,13 @@
-import aiohttp
 import logging
 import re
-import ssl
 import random
 import asyncio
-from time import time
-import hashlib
 from .excluded_sites import ExcludedSitesTracker
 from hanziconv import HanziConv
-from .text_processing import process_chinese_text
+from .text_processing import process_chinese_text, contains_chinese
+from .page_cache import PageCache
+from .http_client import http_client
+from config import PAGE_CACHE_CONFIG
 
 # Configure logging
 logging.basicConfig(
@@ -17,39 +16,41 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Cache configuration
-page_cache = {}
-CACHE_DURATION = 3600
+# Processed pages persist across restarts in page_cache.db
+page_cache = PageCache(
+    PAGE_CACHE_CONFIG["path"],
+    ttl=PAGE_CACHE_CONFIG["ttl"],
+    max_bytes=PAGE_CACHE_CONFIG["max_bytes"]
+)
 
 # Add after other global variables
 excluded_sites = ExcludedSitesTracker()
 
-def _generate_cache_key(url: str) -> str:
-    """Generate a unique cache key for a URL."""
-    return hashlib.md5(url.encode()).hexdigest()
-
-def _is_cache_valid(timestamp: float) -> bool:
-    """Check if cached result is still valid."""
-    return (time() - timestamp) < CACHE_DURATION
+def _conditional_headers(cached: dict) -> dict:
+    """Validators of a stale cache entry for a conditional request."""
+    headers = {}
+    if cached.get("etag"):
+        headers['If-None-Match'] = cached["etag"]
+    if cached.get("last_modified"):
+        headers['If-Modified-Since'] = cached["last_modified"]
+    return headers
 
 async def get_page_content(url: str) -> str:
     """Get and parse webpage content with caching."""
     try:
         logger.info(f"Starting content fetch process for URL: {url}")
         
+        # Check cache first: a fresh page needs no delay and no request
+        cached = page_cache.get(url)
+        if cached and cached["fresh"]:
+            logger.info(f"Cache hit! Returning cached content from {url}")
+            return cached["content"]
+        
         # Check if site is excluded
         if excluded_sites.is_site_excluded(url):
             logger.warning(f"Skipping excluded site: {url}")
             return ""
         
-        # Check cache first
-        cache_key = _generate_cache_key(url)
-        if cache_key in page_cache:
-            timestamp, content = page_cache[cache_key]
-            if _is_cache_valid(timestamp):
-                logger.info(f"Cache hit! Returning cached content from {url}")
-                return content
-        
         # More browser-like headers
         headers = {
             'User-Agent': random.choice([
@@ -75,65 +76,77 @@ async def get_page_content(url: str) -> str:
             'locale': 'zh-CN',
         }
         
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
+        # Try different variations of the URL
+        url_variations = [url]
+        if 'www.' not in url:
+            url_variations.append(url.replace('://', '://www.'))
+        if url.startswith('https://'):
+            url_variations.append(url.replace('https://', 'http://'))
         
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
-        timeout = aiohttp.ClientTimeout(total=30)
+        # A stale page is revalidated where it was fetched from
+        revalidate = _conditional_headers(cached) if cached else {}
+        if revalidate:
+            url_variations = [cached["fetched_url"]] + [u for u in url_variations if u != cached["fetched_url"]]
         
-        async with aiohttp.ClientSession(connector=connector, headers=headers, cookies=cookies, timeout=timeout) as session:
-            # Try different variations of the URL
-            url_variations = [url]
-            if 'www.' not in url:
-                url_variations.append(url.replace('://', '://www.'))
-            if url.startswith('https://'):
-                url_variations.append(url.replace('https://', 'http://'))
-            
-            logger.info(f"Will try the following URL variations: {url_variations}")
-            
-            for try_url in url_variations:
-                try:
-                    # Random delay between requests
-                    delay = random.uniform(1, 3)  # Random delay between 1-3 seconds
-                    logger.info(f"Waiting {delay:.1f} seconds before trying {try_url}")
-                    await asyncio.sleep(delay)
+        logger.info(f"Will try the following URL variations: {url_variations}")
+        
+        for try_url in url_variations:
+            try:
+                # Random delay between requests
+                delay = random.uniform(1, 3)  # Random delay between 1-3 seconds
+                logger.info(f"Waiting {delay:.1f} seconds before trying {try_url}")
+                await asyncio.sleep(delay)
+                
+                request_headers = revalidate if try_url == url_variations[0] else {}
+                response = await http_client.fetch(try_url, headers={**headers, **request_headers}, cookies=cookies)
+                logger.info(f"Response status for {try_url}: {response['status']}")
+                logger.info(f"Response headers: {dict(response['headers'])}")
+                
+                if response["status"] == 304 and cached:
+                    logger.info(f"Cached content of {url} is still current")
+                    page_cache.revalidated(url)
+                    return cached["content"]
+                elif response["status"] == 200:
+                    content = response["text"]
+                    logger.info(f"Successfully fetched raw content (size: {len(content)} bytes)")
+                    
+                    # Process the content
+                    processed_content, was_converted = process_chinese_text(content)
                     
-                    async with session.get(try_url) as response:
-                        logger.info(f"Response status for {try_url}: {response.status}")
-                        logger.info(f"Response headers: {dict(response.headers)}")
+                    # process_chinese_text hands back text without Chinese unchanged
+                    if processed_content and contains_chinese(processed_content):
+                        if was_converted:
+                            logger.info("Converted Traditional Chinese characters to Simplified")
                         
-                        if response.status == 200:
-                            content = await response.text()
-                            logger.info(f"Successfully fetched raw content (size: {len(content)} bytes)")
-                            
-                            # Process the content
-                            processed_content, was_converted = process_chinese_text(content)
-                            
-                            if processed_content:
-                                if was_converted:
-                                    logger.info("Converted Traditional Chinese characters to Simplified")
-                                
-                                logger.info(f"Successfully processed {len(processed_content)} Chinese characters")
-                                page_cache[cache_key] = (time(), processed_content)
-                                return processed_content
-                            else:
-                                logger.warning("No Chinese characters found in content")
-                        elif response.status in [403, 500]:
-                            logger.warning(f"Access denied or server error. Status: {response.status}")
-                            excluded_sites.add_excluded_site(try_url)
-                        else:
-                            logger.warning(f"Unexpected status code: {response.status}")
-                            
-                except Exception as e:
-                    logger.warning(f"Error fetching {try_url}: {str(e)}")
-                    if "SSL" not in str(e):  # Don't exclude for SSL errors
-                        excluded_sites.add_excluded_site(try_url)
-            
-            logger.error("All URL variations failed. Website may be blocking automated access.")
-            excluded_sites.add_excluded_site(url)
-            return ""
+                        logger.info(f"Successfully processed {len(processed_content)} Chinese characters")
+                        page_cache.put(
+                            url,
+                            processed_content,
+                            etag=response["headers"].get('ETag'),
+                            last_modified=response["headers"].get('Last-Modified'),
+                            fetched_url=try_url
+                        )
+                        return processed_content
+                    else:
+                        logger.warning("No Chinese characters found in content")
+                elif response["status"] in [403, 500]:
+                    logger.warning(f"Access denied or server error. Status: {response['status']}")
+                    excluded_sites.add_excluded_site(try_url)
+                else:
+                    logger.warning(f"Unexpected status code: {response['status']}")
                     
+            except Exception as e:
+                logger.warning(f"Error fetching {try_url}: {str(e)}")
+                if "SSL" not in str(e):  # Don't exclude for SSL errors
+                    excluded_sites.add_excluded_site(try_url)
+        
+        logger.error("All URL variations failed. Website may be blocking automated access.")
+        excluded_sites.add_excluded_site(url)
+        if cached:
+            logger.info(f"Returning stale cached content from {url}")
+            return cached["content"]
+        return ""
+                
     except Exception as e:
         logger.error(f"Critical error: {str(e)}")
         return ""
\ No newline at end of file
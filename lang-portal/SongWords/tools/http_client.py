@@ -0,0 +1,162 @@
+import asyncio
+import atexit
+import logging
+import ssl
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from config import HTTP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+class HttpClient:
+    """
+    Application-wide HTTP client with pooled, keep-alive connections.
+
+    Page fetches share one aiohttp session with a DNS cache and a cap on
+    connections per host. Streamlit runs every script run in a new event
+    loop (asyncio.run), which would close a session bound to it, so the
+    session lives on its own event loop in a background thread for the life
+    of the process; fetch() runs the request there and hands back the read
+    response. Cancelling the caller cancels the request. Synchronous callers
+    (LangPortalSync) use request(), backed by one pooled requests.Session.
+    Both are closed when the process exits.
+    """
+
+    def __init__(self, limit: int = 20, limit_per_host: int = 2, ttl_dns_cache: int = 300,
+                 keepalive_timeout: int = 30, timeout: int = 30):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._sync_session: Optional[requests.Session] = None
+        self.counters = Counter()
+        self.hosts = Counter()
+        atexit.register(self.close)
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="http-client", daemon=True)
+                thread.start()
+                self._session = asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+                self._loop, self._thread = loop, thread
+                logger.info("Started the shared HTTP client")
+            return self._loop
+
+    async def _open(self) -> aiohttp.ClientSession:
+        # Lyrics sites often have broken certificates
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+        connector = aiohttp.TCPConnector(
+            ssl=ssl_context,
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.ttl_dns_cache,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    def _count(self, url: str, failed: bool = False):
+        with self._lock:
+            self.counters["errors" if failed else "requests"] += 1
+            self.hosts[urlparse(url).netloc] += 1
+
+    async def _get(self, url: str, headers: Optional[Dict[str, str]], cookies: Optional[Dict[str, str]]) -> Dict[str, Any]:
+        async with self._session.get(url, headers=headers, cookies=cookies) as response:
+            return {
+                "status": response.status,
+                "headers": response.headers.copy(),
+                "url": str(response.url),
+                "text": await response.text() if response.status == 200 else ""
+            }
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None,
+                    cookies: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        GET a URL on the shared session from any event loop.
+
+        Returns a dict with the status, headers (case-insensitive), final url
+        and, for a 200, the body text. Network errors are raised to the caller.
+        """
+        loop = self._start()
+        future = asyncio.run_coroutine_threadsafe(self._get(url, headers, cookies), loop)
+        try:
+            result = await asyncio.wrap_future(future)
+        except Exception:
+            self._count(url, failed=True)
+            raise
+        self._count(url)
+        return result
+
+    @property
+    def sync_session(self) -> requests.Session:
+        with self._lock:
+            if self._sync_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.limit, pool_maxsize=self.limit_per_host)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sync_session = session
+            return self._sync_session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Synchronous request on the pooled requests.Session."""
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = self.sync_session.request(method, url, **kwargs)
+        except requests.RequestException:
+            self._count(url, failed=True)
+            raise
+        self._count(url)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool statistics for debugging."""
+        with self._lock:
+            stats = {
+                "requests": self.counters["requests"],
+                "errors": self.counters["errors"],
+                "hosts": dict(self.hosts),
+                "running": self._loop is not None
+            }
+        connector = self._session.connector if self._session is not None else None
+        if connector is not None:
+            # Idle keep-alive connections per host and connections in use
+            stats["idle"] = {str(key.host): len(conns) for key, conns in getattr(connector, "_conns", {}).items()}
+            stats["in_use"] = len(getattr(connector, "_acquired", ()))
+            stats["limit"] = connector.limit
+            stats["limit_per_host"] = connector.limit_per_host
+        return stats
+
+    def close(self):
+        """Close both sessions and stop the background loop."""
+        with self._lock:
+            loop, thread, session = self._loop, self._thread, self._session
+            self._loop = self._thread = self._session = None
+            sync_session, self._sync_session = self._sync_session, None
+        if sync_session is not None:
+            sync_session.close()
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"Error closing the shared HTTP client: {str(e)}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+        logger.info("Closed the shared HTTP client")
+
+http_client = HttpClient(**HTTP_CONFIG)
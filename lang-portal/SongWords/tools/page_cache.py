@@ -0,0 +1,145 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import zlib
+from time import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class PageCache:
+    """Disk-backed cache of processed page content, shared across restarts.
+
+    Entries are stored zlib-compressed in SQLite with the ETag and
+    Last-Modified validators of the response they came from. An entry is
+    fresh for `ttl` seconds; after that it is stale and callers revalidate
+    it with a conditional request before serving it again. When the
+    compressed bodies exceed `max_bytes`, the least recently used entries
+    are evicted.
+    """
+
+    def __init__(self, db_path, ttl: int = 3600, max_bytes: int = 64 * 1024 * 1024):
+        self.db_path = str(db_path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "stale": 0, "misses": 0, "revalidated": 0, "stores": 0, "evictions": 0}
+        self.create_tables()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # One connection per thread, as Streamlit runs each session in its own
+        if not hasattr(self._local, "conn"):
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return self._local.conn
+
+    def create_tables(self):
+        with self.conn:
+            self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                fetched_url TEXT,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+            ''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_last_used ON pages(last_used_at)')
+
+    @staticmethod
+    def key(url: str) -> str:
+        """Generate a unique cache key for a URL."""
+        return hashlib.md5(url.encode()).hexdigest()
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the cached page for a URL, or None.
+
+        The result has the content, its validators and whether it is still
+        fresh; stale entries should be revalidated before use.
+        """
+        try:
+            row = self.conn.execute('''
+                SELECT body, etag, last_modified, fetched_url, fetched_at FROM pages WHERE key = ?
+            ''', (self.key(url),)).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            with self.conn:
+                self.conn.execute('UPDATE pages SET last_used_at = ? WHERE key = ?', (time(), self.key(url)))
+        except sqlite3.Error as e:
+            logger.error(f"Error reading page cache: {str(e)}")
+            self._count("misses")
+            return None
+
+        body, etag, last_modified, fetched_url, fetched_at = row
+        fresh = (time() - fetched_at) < self.ttl
+        self._count("hits" if fresh else "stale")
+        return {
+            "content": zlib.decompress(body).decode('utf-8'),
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_url": fetched_url or url,
+            "fresh": fresh
+        }
+
+    def put(self, url: str, content: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+            fetched_url: Optional[str] = None):
+        """Store the processed content of a page and evict down to max_bytes."""
+        body = zlib.compress(content.encode('utf-8'))
+        now = time()
+        try:
+            with self.conn:
+                self.conn.execute('''
+                    INSERT OR REPLACE INTO pages
+                        (key, url, fetched_url, body, size, etag, last_modified, fetched_at, last_used_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (self.key(url), url, fetched_url, body, len(body), etag, last_modified, now, now))
+                self._evict()
+            self._count("stores")
+        except sqlite3.Error as e:
+            logger.error(f"Error writing page cache: {str(e)}")
+
+    def revalidated(self, url: str):
+        """Mark a stale entry fresh again after the server answered 304 Not Modified."""
+        try:
+            with self.conn:
+                self.conn.execute('UPDATE pages SET fetched_at = ? WHERE key = ?', (time(), self.key(url)))
+            self._count("revalidated")
+        except sqlite3.Error as e:
+            logger.error(f"Error updating page cache: {str(e)}")
+
+    def _evict(self):
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self.conn.execute('SELECT key, size FROM pages ORDER BY last_used_at'):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self.conn.executemany('DELETE FROM pages WHERE key = ?', evicted)
+        self._count("evictions", len(evicted))
+        logger.info(f"Evicted {len(evicted)} pages from the page cache")
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages').fetchone()
+        with self._lock:
+            return {**self.counters, "entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute('DELETE FROM pages')
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import threading
+import weakref
+from time import monotonic
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket that paces calls to a throttled API and adapts its rate.
+
+    Tokens refill at `rate` per second up to `burst`; every call takes one
+    and waits for it when the bucket is empty. A throttling response halves
+    the rate (down to `min_rate`) and empties the bucket; each successful
+    call then wins back `increase` per second, up to `max_rate`.
+
+    Calls in flight when the rate was cut were sent at the old rate, so
+    their throttles are the same event: acquire() returns when a call was
+    let through, and only a throttle of a call let through after the last
+    cut halves the rate again.
+
+    One bucket is shared by every Streamlit session thread, each running its
+    own event loop. The bucket state is only changed under a threading lock,
+    and waiting for a token happens outside it.
+    """
+
+    def __init__(self, rate: float = 2.0, burst: int = 4, min_rate: float = 0.2,
+                 max_rate: float = None, increase: float = 0.1):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate
+        self.increase = increase
+        self.tokens = float(burst)
+        self.updated = monotonic()
+        self.last_cut = float('-inf')
+        # The bucket outlives Streamlit's per-run event loops and an
+        # asyncio.Lock is bound to one, so each loop gets its own
+        self._locks = weakref.WeakKeyDictionary()
+        self._locks_guard = threading.Lock()
+        # Guards tokens, rate and last_cut across threads
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _loop_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        with self._locks_guard:
+            lock = self._locks.get(loop)
+            if lock is None:
+                lock = self._locks[loop] = asyncio.Lock()
+            return lock
+
+    def _take(self) -> Tuple[Optional[float], float]:
+        """Take a token: (when it was taken, 0), or (None, seconds until one is there)."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return monotonic(), 0.0
+            return None, (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> float:
+        """Wait for a token, callers are served in order; returns when the call was let through."""
+        async with self._loop_lock():
+            while True:
+                acquired_at, wait = self._take()
+                if acquired_at is not None:
+                    return acquired_at
+                await asyncio.sleep(wait)
+
+    def throttled(self, acquired_at: float):
+        """Back off after a throttling response to a call let through at acquired_at."""
+        with self._lock:
+            if acquired_at < self.last_cut:
+                # Sent before the last cut, which already answered this throttle
+                return
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            self.last_cut = monotonic()
+            rate = self.rate
+        logger.warning(f"Throttled, slowing down to {rate:.2f} calls/s")
+
+    def succeeded(self):
+        """Speed back up after a successful call."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
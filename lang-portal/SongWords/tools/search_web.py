@@ -10,8 +10,7 @@ import hashlib
 from .excluded_sites import ExcludedSitesTracker
 from hanziconv import HanziConv
 from .text_processing import process_chinese_text
-import random
-import aiohttp
+from .get_page_content import get_page_content
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -44,25 +43,6 @@ def _is_cache_valid(timestamp: float) -> bool:
     """Check if cached result is still valid."""
     return (time() - timestamp) < CACHE_DURATION
 
-async def get_page_content(url: str) -> str:
-    """Fetch the content of a web page."""
-    try:
-        # Random delay between requests
-        delay = random.uniform(1, 3)
-        await asyncio.sleep(delay)
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    return content
-                else:
-                    logger.warning(f"Access denied or server error. Status: {response.status}")
-                    return ""
-    except Exception as e:
-        logger.error(f"Error fetching {url}: {str(e)}")
-        return ""
-
 def handle_exclusion(url: str, error_info: Dict[str, Any], tracker: ExcludedSitesTracker = None) -> bool:
     """Handle adding sites to the exclusion list based on specific errors.
     Returns True if site was excluded, False otherwise."""
@@ -77,8 +57,12 @@ def handle_exclusion(url: str, error_info: Dict[str, Any], tracker: ExcludedSite
             logger.error(f"Error adding domain to exclusion list: {str(e)}")
     return False
 
-async def search_web(query: str, excluded_sites: ExcludedSitesTracker = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-    """Search the web using DuckDuckGo with excluded sites filtering."""
+async def search_web(query: str, excluded_sites: ExcludedSitesTracker = None,
+                     fetch_content: bool = True) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Search the web using DuckDuckGo with excluded sites filtering.
+    
+    With fetch_content=False the results are returned unfetched, for callers
+    that fetch the candidates themselves (see tools/fetch_scheduler.py)."""
     global last_request_time
     
     # Input validation
@@ -144,13 +128,19 @@ async def search_web(query: str, excluded_sites: ExcludedSitesTracker = None) ->
                     
                     # Check URL validity and exclusion
                     if url not in seen_urls and (excluded_sites is None or not excluded_sites.is_site_excluded(url)):
-                        # Try to fetch content before adding to results
+                        if not fetch_content:
+                            formatted_results.append({"title": title, "url": url})
+                            seen_urls.add(url)
+                            continue
+                        # Try to fetch content before adding to results; the
+                        # content travels with the result so it is not fetched again
                         content = await get_page_content(url)
                         if content:
                             logger.info(f"Found result: {title} at {url}")
                             formatted_results.append({
                                 "title": title,
-                                "url": url
+                                "url": url,
+                                "content": content
                             })
                             seen_urls.add(url)
                 
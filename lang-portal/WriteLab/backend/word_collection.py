@@ -1,32 +1,54 @@
 # word_collection.py (added back)
 
 import config
+import json
 import sqlite3
 import requests
 import streamlit as st
 from flask import Flask, request, jsonify
 from flask_cors import cross_origin
 
+# One statement per sort column and order, built once from the whitelist,
+# so request parameters never reach the SQL text and the set of statements
+# (mirroring lang-portal's lib/queries.py) stays fixed.
+WORD_SORT_COLUMNS = ['jiantizi', 'pinyin', 'english', 'correct_count', 'wrong_count']
+WORDS_PAGE_QUERIES = {
+    (sort_by, order): f'''
+        SELECT w.id, w.jiantizi, w.pinyin, w.english,
+            COALESCE(r.correct_count, 0) AS correct_count,
+            COALESCE(r.wrong_count, 0) AS wrong_count
+        FROM words w
+        LEFT JOIN word_reviews r ON w.id = r.word_id
+        ORDER BY {sort_by} {order}
+        LIMIT ? OFFSET ?
+    '''
+    for sort_by in WORD_SORT_COLUMNS
+    for order in ('asc', 'desc')
+}
+
+WORD_QUERY = '''
+    SELECT w.id, w.jiantizi, w.pinyin, w.english,
+           COALESCE(r.correct_count, 0) AS correct_count,
+           COALESCE(r.wrong_count, 0) AS wrong_count,
+           (SELECT json_group_array(json_object('id', g.id, 'name', g.name))
+            FROM groups g
+            WHERE g.id IN (SELECT group_id FROM word_groups WHERE word_id = w.id)) AS groups
+    FROM words w
+    LEFT JOIN word_reviews r ON w.id = r.word_id
+    WHERE w.id = ?
+'''
+
 def fetch_words_from_db(db_path, page=1, words_per_page=50, sort_by='jiantizi', order='asc'):
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     offset = (page - 1) * words_per_page
 
-    valid_columns = ['jiantizi', 'pinyin', 'english', 'correct_count', 'wrong_count']
-    if sort_by not in valid_columns:
+    if sort_by not in WORD_SORT_COLUMNS:
         sort_by = 'jiantizi'
     if order not in ['asc', 'desc']:
         order = 'asc'
 
-    cursor.execute(f'''
-        SELECT w.id, w.jiantizi, w.pinyin, w.english, 
-            COALESCE(r.correct_count, 0) AS correct_count,
-            COALESCE(r.wrong_count, 0) AS wrong_count
-        FROM words w
-        LEFT JOIN word_reviews r ON w.id = r.word_id
-        ORDER BY {sort_by} {order}
-        LIMIT ? OFFSET ?
-    ''', (words_per_page, offset))
+    cursor.execute(WORDS_PAGE_QUERIES[sort_by, order], (words_per_page, offset))
     words = cursor.fetchall()
 
     cursor.execute('SELECT COUNT(*) FROM words')
@@ -40,18 +62,7 @@ def fetch_word_from_db(db_path, word_id):
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT w.id, w.jiantizi, w.pinyin, w.english,
-               COALESCE(r.correct_count, 0) AS correct_count,
-               COALESCE(r.wrong_count, 0) AS wrong_count,
-               GROUP_CONCAT(DISTINCT g.id || '::' || g.name) as groups
-        FROM words w
-        LEFT JOIN word_reviews r ON w.id = r.word_id
-        LEFT JOIN word_groups wg ON w.id = wg.word_id
-        LEFT JOIN groups g ON wg.group_id = g.id
-        WHERE w.id = ?
-        GROUP BY w.id
-    ''', (word_id,))
+    cursor.execute(WORD_QUERY, (word_id,))
     word = cursor.fetchone()
 
     conn.close()
@@ -125,14 +136,8 @@ def get_word(word_id):
         if not word:
             return jsonify({"error": "Word not found"}), 404
 
-        groups = []
-        if word[6]:
-            for group_str in word[6].split(','):
-                group_id, group_name = group_str.split('::')
-                groups.append({
-                    "id": int(group_id),
-                    "name": group_name
-                })
+        # Groups come back as a JSON array, so names may contain commas
+        groups = json.loads(word[6])
 
         return jsonify({
             "word": {
@@ -2,6 +2,11 @@ import logging
 from flask import Flask, g, jsonify
 from flask_cors import CORS
 from lib.db import Db
+from lib.pool import DEFAULT_STATEMENT_CACHE
+from lib.cache import ResponseCache, DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL
+from lib import metrics
+from lib import review_buffer
+from lib.compaction import DEFAULT_RETENTION_DAYS
 import routes.words
 import routes.groups
 import routes.study_sessions
@@ -35,15 +40,76 @@ def get_allowed_origins(app):
 def create_app(test_config=None):
     app = Flask(__name__)
     
-    app.config.from_mapping(DATABASE='words.db')
+    app.config.from_mapping(
+        DATABASE='words.db',
+        DB_POOL_SIZE=8,
+        DB_POOL_TIMEOUT=10.0,
+        DB_PRAGMAS=None,
+        DB_STATEMENT_CACHE=DEFAULT_STATEMENT_CACHE,
+        MAX_REVIEW_BATCH=1000,
+        MAX_WORD_IDS=1000,
+        RESPONSE_CACHE_SIZE=DEFAULT_CACHE_SIZE,
+        RESPONSE_CACHE_TTL=DEFAULT_CACHE_TTL,
+        SLOW_REQUEST_MS=None,
+        REVIEW_WRITES='sync',
+        REVIEW_FLUSH_MS=review_buffer.DEFAULT_FLUSH_MS,
+        REVIEW_FLUSH_ITEMS=review_buffer.DEFAULT_FLUSH_ITEMS,
+        REVIEW_QUEUE_SIZE=review_buffer.DEFAULT_QUEUE_SIZE,
+        REVIEW_QUEUE_TIMEOUT=review_buffer.DEFAULT_QUEUE_TIMEOUT,
+        REVIEW_COMMIT_TIMEOUT=review_buffer.DEFAULT_COMMIT_TIMEOUT,
+        REVIEW_LOG=None,
+        REVIEW_RETENTION_DAYS=DEFAULT_RETENTION_DAYS,
+        REVIEW_ARCHIVE=None
+    )
 
     if test_config is not None:
         if 'DATABASE' not in test_config:
             test_config['DATABASE'] = ':memory:'
         app.config.update(test_config)
 
-    app.db = Db(database=app.config['DATABASE'])
+    app.db = Db(
+        database=app.config['DATABASE'],
+        pool_size=app.config['DB_POOL_SIZE'],
+        pool_timeout=app.config['DB_POOL_TIMEOUT'],
+        pragmas=app.config['DB_PRAGMAS'],
+        statement_cache_size=app.config['DB_STATEMENT_CACHE']
+    )
+
+    # Cache for read-mostly GET endpoints; a TTL of 0 disables it
+    app.response_cache = ResponseCache(
+        max_entries=app.config['RESPONSE_CACHE_SIZE'],
+        ttl=app.config['RESPONSE_CACHE_TTL']
+    )
     
+    # Review writes: 'sync' commits per request, 'group' and 'log' go through
+    # the write-behind buffer in lib/review_buffer.py
+    app.review_buffer = None
+    mode = app.config['REVIEW_WRITES']
+    if mode not in review_buffer.WRITE_MODES:
+        raise ValueError(f"REVIEW_WRITES must be one of {', '.join(review_buffer.WRITE_MODES)}")
+    if mode != 'sync':
+        if app.config['DATABASE'] == ':memory:':
+            raise ValueError(f"REVIEW_WRITES='{mode}' needs a database file")
+        app.review_buffer = review_buffer.ReviewBuffer(
+            app.db.pool.connect,
+            mode=mode,
+            flush_ms=app.config['REVIEW_FLUSH_MS'],
+            flush_items=app.config['REVIEW_FLUSH_ITEMS'],
+            max_items=app.config['REVIEW_QUEUE_SIZE'],
+            put_timeout=app.config['REVIEW_QUEUE_TIMEOUT'],
+            commit_timeout=app.config['REVIEW_COMMIT_TIMEOUT'],
+            log_path=app.config['REVIEW_LOG'] or app.config['DATABASE'] + '-reviews.log',
+            on_flush=lambda: app.response_cache.invalidate('word_review_items', 'word_reviews')
+        ).start()
+
+    # Per-route latency and SQL metrics for /metrics; SLOW_REQUEST_MS logs slow requests
+    metrics.init_app(app)
+
+    # Registered before the first app context so that connection goes back to the pool
+    @app.teardown_appcontext
+    def close_db(exception):
+        app.db.close()
+
     with app.app_context():
         allowed_origins = get_allowed_origins(app)
     
@@ -58,10 +124,6 @@ def create_app(test_config=None):
         }
     })
 
-    @app.teardown_appcontext
-    def close_db(exception):
-        app.db.close()
-
     @app.errorhandler(404)
     def not_found(error):
         logger.error(f"404 error: {error}")
@@ -73,11 +135,13 @@ def create_app(test_config=None):
         return jsonify({'error': 'Internal server error'}), 500
 
     if not app.config.get('TESTING', False):
-        from routes import study_sessions, groups, words, dashboard
+        from routes import study_sessions, groups, words, dashboard, admin, exports
         study_sessions.load(app)
         groups.load(app)
         words.load(app)
         dashboard.load(app)
+        admin.load(app)
+        exports.load(app)
         app.register_blueprint(study_activities_bp)  # Register the Blueprint
     else:
         @app.route('/api/words', methods=['POST'])
@@ -0,0 +1,221 @@
+"""Build a synthetic lang-portal database at a chosen scale.
+
+The schema comes from sql/setup (Db.setup_tables), so the database has the
+same tables, indexes and triggers as a real one. Rows are generated with
+recursive CTEs inside SQLite. The triggers are dropped while loading, the
+data they maintain (review counters, session tracking, dashboard stats,
+search indexes) and the distractor index are rebuilt in one pass, and
+then the triggers are created again. The data is deterministic, so the same sizes always produce the
+same database.
+
+Usage: python benchmarks/generate.py [--preset small|medium|production] [--out benchmarks/data/bench.db]
+                                     [--words N] [--groups N] [--sessions N] [--reviews N]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from lib import distractors, stats  # noqa: E402
+
+PRESETS = {
+  'small': {'words': 20_000, 'groups': 200, 'sessions': 5_000, 'reviews': 200_000},
+  'medium': {'words': 100_000, 'groups': 1_000, 'sessions': 50_000, 'reviews': 2_000_000},
+  'production': {'words': 500_000, 'groups': 5_000, 'sessions': 200_000, 'reviews': 10_000_000},
+}
+
+MAX_WORDS = 25_000_000
+
+DEFAULT_OUT = os.path.join('benchmarks', 'data', 'bench.db')
+
+SYLLABLES = [
+  'ài', 'bā', 'bái', 'bàn', 'běi', 'bù', 'chá', 'cháng', 'chī', 'chū', 'dà', 'dōng', 'duō', 'ér', 'fàn',
+  'fēi', 'gāo', 'gè', 'gōng', 'guó', 'hǎo', 'hé', 'hěn', 'huā', 'jiā', 'jiàn', 'jīn', 'kàn', 'kě', 'lái',
+  'lǎo', 'lǜ', 'mǎ', 'měi', 'míng', 'nǐ', 'nián', 'péng', 'qián', 'qù', 'rén', 'shān', 'shàng', 'shēng',
+  'shí', 'shuō', 'tiān', 'wǒ', 'xiǎo', 'xīn', 'xué', 'yǒu', 'yuè', 'zài', 'zhōng', 'zǐ', 'zǒu', 'zuò',
+]
+
+ENGLISH = [
+  'study', 'speak', 'go', 'exercise', 'pay', 'wake', 'good', 'old', 'new', 'big', 'small', 'eat', 'drink',
+  'read', 'write', 'walk', 'run', 'teacher', 'student', 'friend', 'family', 'water', 'tea', 'rice', 'book',
+  'mountain', 'river', 'city', 'country', 'year', 'month', 'day', 'morning', 'evening', 'happy', 'busy',
+  'green', 'red', 'white', 'black', 'market', 'money', 'work', 'school', 'music', 'flower', 'heart', 'sky',
+]
+
+ACTIVITIES = [
+  ('Typing Tutor', 'http://localhost:8080', None),
+  ('Flashcards', 'http://localhost:8081', None),
+  ('WriteLab', 'http://localhost:8501', None),
+]
+
+def create_schema(path):
+  app = create_app({'DATABASE': path, 'DB_POOL_SIZE': 1})
+  with app.app_context():
+    app.db.setup_tables(app.db.cursor())
+  app.db.dispose()
+
+def drop_triggers(conn):
+  triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall()
+  for name, _ in triggers:
+    conn.execute(f'DROP TRIGGER {name}')
+  return [sql for _, sql in triggers]
+
+def load(conn, words, groups, sessions, reviews):
+  per_session = max(1, reviews // max(1, sessions))
+  conn.execute('CREATE TEMP TABLE syllables (n INTEGER PRIMARY KEY, s TEXT)')
+  conn.executemany('INSERT INTO syllables VALUES (?, ?)', enumerate(SYLLABLES))
+  conn.execute('CREATE TEMP TABLE vocabulary (n INTEGER PRIMARY KEY, s TEXT)')
+  conn.executemany('INSERT INTO vocabulary VALUES (?, ?)', enumerate(ENGLISH))
+  conn.executemany('INSERT INTO study_activities (name, url, preview_url) VALUES (?, ?, ?)', ACTIVITIES)
+
+  # One to three characters from the first 5000 CJK code points. Every word
+  # of two or more characters starts with a pair encoding its number, so
+  # every jiantizi is distinct (up to MAX_WORDS)
+  conn.execute(f'''
+    WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {words} - 1)
+    INSERT INTO words (jiantizi, pinyin, english, parts)
+    SELECT char(19968 + i % 5000)
+             || CASE WHEN i < 5000 AND i % 2 = 0 THEN ''
+                ELSE char(19968 + i / 5000)
+                     || CASE WHEN i % 3 = 0 THEN char(19968 + (i * 7) % 5000) ELSE '' END
+                END,
+           s1.s || ' ' || s2.s,
+           'to ' || v1.s || CASE WHEN i % 2 = 0 THEN ' ' || v2.s ELSE '' END,
+           '[]'
+    FROM n
+    JOIN syllables s1 ON s1.n = i % {len(SYLLABLES)}
+    JOIN syllables s2 ON s2.n = (i / {len(SYLLABLES)}) % {len(SYLLABLES)}
+    JOIN vocabulary v1 ON v1.n = (i * 13) % {len(ENGLISH)}
+    JOIN vocabulary v2 ON v2.n = (i / {len(ENGLISH)}) % {len(ENGLISH)}
+  ''')
+
+  conn.execute(f'''
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {groups})
+    INSERT INTO groups (name) SELECT 'Group ' || i FROM n
+  ''')
+
+  # Every word belongs to one group, every fourth word to a second one
+  conn.execute(f'''
+    INSERT INTO word_groups (word_id, group_id)
+    SELECT id, (id - 1) % {groups} + 1 FROM words
+    UNION ALL
+    SELECT id, (id * 7) % {groups} + 1 FROM words
+    WHERE id % 4 = 0 AND (id * 7) % {groups} != (id - 1) % {groups}
+  ''')
+
+  # Sessions spread over a year, one every few minutes
+  conn.execute(f'''
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {sessions})
+    INSERT INTO study_sessions (group_id, study_activity_id, created_at)
+    SELECT (i * 31) % {groups} + 1, i % {len(ACTIVITIES)} + 1,
+           datetime('2024-01-01', '+' || (i * 525600 / {sessions}) || ' minutes')
+    FROM n
+  ''')
+
+  # Reviews fill the sessions in order, a few seconds apart; 70% are correct
+  conn.execute(f'''
+    WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {reviews} - 1)
+    INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
+    SELECT (i * 2654435761) % {words} + 1,
+           i / {per_session} % {sessions} + 1,
+           (i * 7) % 10 < 7,
+           datetime('2024-01-01', '+' || ((i / {per_session} % {sessions} + 1) * 525600 / {sessions}) || ' minutes',
+                    '+' || ((i % {per_session}) * 5) || ' seconds')
+    FROM n
+  ''')
+
+def rebuild_derived(conn):
+  conn.executescript('''
+    INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+    SELECT word_id, SUM(correct = 1), SUM(correct != 1), MAX(created_at)
+    FROM word_review_items
+    GROUP BY word_id;
+
+    UPDATE study_sessions SET
+      review_items_count = t.reviews,
+      correct_count = t.correct,
+      last_activity_at = t.last_activity,
+      ended_at = t.last_activity,
+      duration_ms = MAX(0, CAST(ROUND((julianday(t.last_activity) - julianday(study_sessions.created_at)) * 86400000) AS INTEGER))
+    FROM (
+      SELECT study_session_id, COUNT(*) AS reviews, SUM(correct = 1) AS correct, MAX(created_at) AS last_activity
+      FROM word_review_items
+      GROUP BY study_session_id
+    ) t
+    WHERE t.study_session_id = study_sessions.id;
+
+    UPDATE groups SET words_count = (SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id);
+
+    INSERT INTO words_fts (words_fts) VALUES ('rebuild');
+    INSERT INTO words_fts_cjk (words_fts_cjk) VALUES ('rebuild');
+    INSERT OR IGNORE INTO word_characters (character, word_id)
+    SELECT substr(w.jiantizi, p.column1, 1), w.id
+    FROM words w
+    JOIN (VALUES (1), (2), (3), (4), (5), (6), (7), (8), (9), (10), (11), (12), (13), (14), (15), (16)) p
+      ON p.column1 <= length(w.jiantizi);
+  ''')
+  conn.commit()
+  stats.rebuild_stats(conn.cursor())
+  distractors.build_index(conn)
+
+def generate(path, words, groups, sessions, reviews):
+  for suffix in ('', '-wal', '-shm'):
+    if os.path.exists(path + suffix):
+      os.unlink(path + suffix)
+  os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+  create_schema(path)
+
+  conn = sqlite3.connect(path)
+  conn.execute('PRAGMA journal_mode = OFF')
+  conn.execute('PRAGMA synchronous = OFF')
+  conn.execute('PRAGMA cache_size = -262144')
+  steps = []
+
+  started = time.perf_counter()
+  triggers = drop_triggers(conn)
+  load(conn, words, groups, sessions, reviews)
+  conn.commit()
+  steps.append(('load', time.perf_counter() - started))
+
+  started = time.perf_counter()
+  rebuild_derived(conn)
+  for sql in triggers:
+    conn.execute(sql)
+  conn.commit()
+  steps.append(('derive', time.perf_counter() - started))
+
+  started = time.perf_counter()
+  conn.execute('ANALYZE')
+  conn.execute('PRAGMA journal_mode = WAL')
+  conn.close()
+  steps.append(('analyze', time.perf_counter() - started))
+  return steps
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--preset', choices=sorted(PRESETS), default='small')
+  parser.add_argument('--out', default=DEFAULT_OUT)
+  for name in ('words', 'groups', 'sessions', 'reviews'):
+    parser.add_argument(f'--{name}', type=int, help=f'override the preset number of {name}')
+  args = parser.parse_args()
+
+  sizes = dict(PRESETS[args.preset])
+  sizes.update({name: getattr(args, name) for name in sizes if getattr(args, name) is not None})
+  if not 1 <= sizes['words'] <= MAX_WORDS or min(sizes.values()) < 1:
+    parser.error(f'sizes must be positive and there can be at most {MAX_WORDS:,} words')
+  print(f"Generating {args.out}: {sizes['words']:,} words, {sizes['groups']:,} groups, "
+        f"{sizes['sessions']:,} sessions, {sizes['reviews']:,} review items")
+
+  steps = generate(args.out, **sizes)
+  for name, seconds in steps:
+    print(f'  {name:<8} {seconds:8.1f}s')
+  print(f'  {"size":<8} {os.path.getsize(args.out) / 1e6:8.1f}MB')
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,131 @@
+"""Latency of GET /groups/<id>/study_sessions against sessions per group.
+
+Reports the endpoint latency and the time of its single query, next to
+the original implementation: two correlated subqueries over
+word_review_items per session, followed by one datetime() round trip for
+every session without reviews.
+
+Usage: python benchmarks/group_sessions.py [--sizes 100,1000,10000] [--reviews 20] [--repeat 50]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import create_app  # noqa: E402
+from routes.groups import GROUP_SESSION_COLUMNS  # noqa: E402
+
+LEGACY_QUERY = '''
+  SELECT
+    s.id, s.group_id, s.study_activity_id, s.created_at as start_time,
+    (SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = s.id) as last_activity_time,
+    a.name as activity_name,
+    g.name as group_name,
+    (SELECT COUNT(*) FROM word_review_items WHERE study_session_id = s.id) as review_count
+  FROM study_sessions s
+  JOIN study_activities a ON s.study_activity_id = a.id
+  JOIN groups g ON s.group_id = g.id
+  WHERE s.group_id = ?
+  ORDER BY {sort_column} {order}
+  LIMIT ? OFFSET ?
+'''
+
+def seed(conn, sessions, reviews):
+  # Two thirds of the sessions have reviews; the rest fall back to start + 30 minutes
+  conn.executescript(f'''
+    INSERT INTO study_activities (name, url) VALUES ('Typing Tutor', 'http://localhost:8080');
+    INSERT INTO groups (name) VALUES ('Benchmark'), ('Other');
+    INSERT INTO words (jiantizi, pinyin, english, parts) VALUES ('学习', 'xué xí', 'to study', '[]');
+
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {sessions})
+    INSERT INTO study_sessions (group_id, study_activity_id, created_at)
+    SELECT 1, 1, datetime('2024-01-01', '+' || i || ' hours') FROM n;
+
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {sessions * reviews})
+    INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
+    SELECT 1, (i - 1) / {reviews} + 1, i % 4 != 0,
+           datetime('2024-01-01', '+' || ((i - 1) / {reviews} + 1) || ' hours', '+' || (i % {reviews}) || ' minutes')
+    FROM n
+    WHERE ((i - 1) / {reviews} + 1) % 3 != 0;
+
+    ANALYZE;
+  ''')
+
+CURRENT_QUERY = f'''
+  SELECT {GROUP_SESSION_COLUMNS}
+  FROM study_sessions s
+  JOIN study_activities a ON s.study_activity_id = a.id
+  JOIN groups g ON s.group_id = g.id
+  WHERE s.group_id = ?
+  ORDER BY {{sort_column}} {{order}}
+  LIMIT ? OFFSET ?
+'''
+
+def current_request(conn, sort_column, order):
+  return conn.execute(CURRENT_QUERY.format(sort_column=sort_column, order=order), (1, 10, 0)).fetchall()
+
+def legacy_request(conn, sort_column, order):
+  rows = conn.execute(LEGACY_QUERY.format(sort_column=sort_column, order=order), (1, 10, 0)).fetchall()
+  for row in rows:
+    if not row['last_activity_time']:
+      conn.execute('SELECT datetime(?, "+30 minutes")', (row['start_time'],)).fetchone()
+  return rows
+
+def timed(fn, repeat):
+  samples = []
+  for _ in range(repeat):
+    started = time.perf_counter()
+    fn()
+    samples.append((time.perf_counter() - started) * 1000)
+  samples.sort()
+  return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+def run(size, reviews, repeat):
+  db_fd, db_path = tempfile.mkstemp()
+  app = create_app({'DATABASE': db_path})
+  app.testing = True
+  with app.app_context():
+    conn = app.db.get()
+    app.db.setup_tables(conn.cursor())
+    seed(conn, size, reviews)
+
+  client = app.test_client()
+  results = []
+  for sort_by, sort_column in (('startTime', 'created_at'), ('reviewItemsCount', 'review_count')):
+    url = f'/groups/1/study_sessions?sort_by={sort_by}&order=desc&with_total=false'
+    assert client.get(url).status_code == 200
+    endpoint = timed(lambda: client.get(url), repeat)
+    with app.app_context():
+      conn = app.db.get()
+      current = timed(lambda: current_request(conn, sort_column, 'desc'), repeat)
+      legacy = timed(lambda: legacy_request(conn, sort_column, 'desc'), repeat)
+    results.append((sort_by, endpoint, current, legacy))
+
+  app.db.dispose()
+  os.close(db_fd)
+  for suffix in ('', '-wal', '-shm'):
+    if os.path.exists(db_path + suffix):
+      os.unlink(db_path + suffix)
+  return results
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--sizes', default='100,1000,10000', help='Comma-separated sessions per group')
+  parser.add_argument('--reviews', type=int, default=20, help='Review items per reviewed session')
+  parser.add_argument('--repeat', type=int, default=50, help='Requests per measurement')
+  args = parser.parse_args()
+
+  print("p50 / p95 latency in ms")
+  print(f"{'sessions':>9}  {'sort_by':<18}{'endpoint':>18}{'query':>18}{'legacy':>18}")
+  for size in (int(size) for size in args.sizes.split(',')):
+    for sort_by, *timings in run(size, args.reviews, args.repeat):
+      cells = ''.join(f"{p50:>10.2f} / {p95:<5.2f}" for p50, p95 in timings)
+      print(f"{size:>9}  {sort_by:<18}{cells}")
+
+if __name__ == '__main__':
+  main()
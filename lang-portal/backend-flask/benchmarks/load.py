@@ -0,0 +1,284 @@
+"""Replay a mix of API requests and report latency percentiles and throughput.
+
+Runs against the Flask app in-process (--db, the default) or against a
+running server (--url). Each worker thread picks an operation by weight:
+
+  words        GET /words?page=N&sort_by=...&order=...
+  group_words  GET /groups/<id>/words?page=N&sort_by=...
+  dashboard    GET /dashboard/stats
+  reviews      POST /api/study-sessions/<id>/reviews with a batch of reviews
+
+Results (p50/p95/p99/max latency and requests per second, overall and per
+operation) are printed and written to benchmarks/results/ as JSON, named
+after the time and the current commit. --compare prints the change
+against an earlier result file ('latest' picks the newest one).
+
+Usage: python benchmarks/load.py [--db benchmarks/data/bench.db | --url http://localhost:5000]
+                                 [--duration 30] [--threads 4] [--mix words=40,group_words=25,dashboard=20,reviews=15]
+                                 [--no-cache] [--review-writes sync|group|log] [--compare latest]
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+DEFAULT_DB = os.path.join('benchmarks', 'data', 'bench.db')
+RESULTS_DIR = os.path.join('benchmarks', 'results')
+DEFAULT_MIX = 'words=40,group_words=25,dashboard=20,reviews=15'
+WORD_SORTS = ('jiantizi', 'pinyin', 'english', 'correct_count', 'wrong_count')
+REVIEW_BATCH = 10
+
+class InProcessClient:
+  """Requests through the Flask test client, one per worker thread."""
+
+  def __init__(self, app):
+    self.app = app
+    self.local = threading.local()
+
+  def request(self, method, path, body=None):
+    client = getattr(self.local, 'client', None)
+    if client is None:
+      client = self.local.client = self.app.test_client()
+    response = client.open(path, method=method, json=body)
+    return response.status_code, response.get_json(silent=True)
+
+class HttpClient:
+  def __init__(self, url):
+    self.url = url.rstrip('/')
+
+  def request(self, method, path, body=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = urllib.request.Request(self.url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+    try:
+      with urllib.request.urlopen(request, timeout=30) as response:
+        return response.status, json.loads(response.read() or b'null')
+    except urllib.error.HTTPError as e:
+      return e.code, None
+
+def parse_mix(text):
+  mix = {}
+  for part in text.split(','):
+    name, _, weight = part.partition('=')
+    if name not in OPERATIONS:
+      raise SystemExit(f"Unknown operation '{name}', expected one of {', '.join(OPERATIONS)}")
+    mix[name] = float(weight or 1)
+  return mix
+
+class Workload:
+  def __init__(self, client):
+    self.client = client
+    status, words = client.request('GET', '/words?page=1')
+    status_groups, groups = client.request('GET', '/groups')
+    if status != 200 or status_groups != 200:
+      raise SystemExit('Could not read /words and /groups; is the database set up?')
+    self.word_pages = max(1, words['total_pages'] or 1)
+    self.words = max(1, words['total_words'] or 1)
+    self.groups = max(1, (groups['total_pages'] or 1) * 10)
+    self.sessions = {}
+
+  def session_for(self, worker):
+    if worker not in self.sessions:
+      status, body = self.client.request('POST', '/api/study-sessions', {
+        'group_id': 1, 'study_activity_id': 1,
+        'created_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+      })
+      if status != 201:
+        raise SystemExit(f'Could not create a study session ({status})')
+      self.sessions[worker] = body['id']
+    return self.sessions[worker]
+
+def op_words(workload, rng, worker):
+  page = rng.randint(1, min(workload.word_pages, 200))
+  return 'GET', f'/words?page={page}&sort_by={rng.choice(WORD_SORTS)}&order={rng.choice(("asc", "desc"))}', None
+
+def op_group_words(workload, rng, worker):
+  group = rng.randint(1, workload.groups)
+  return 'GET', f'/groups/{group}/words?page={rng.randint(1, 3)}&sort_by={rng.choice(WORD_SORTS)}', None
+
+def op_dashboard(workload, rng, worker):
+  return 'GET', '/dashboard/stats', None
+
+def op_reviews(workload, rng, worker):
+  items = [{'word_id': rng.randint(1, workload.words), 'correct': rng.random() < 0.7} for _ in range(REVIEW_BATCH)]
+  return 'POST', f'/api/study-sessions/{workload.session_for(worker)}/reviews', items
+
+OPERATIONS = {
+  'words': op_words,
+  'group_words': op_group_words,
+  'dashboard': op_dashboard,
+  'reviews': op_reviews,
+}
+
+def percentile(sorted_values, fraction):
+  """Nearest-rank percentile of an already sorted list."""
+  if not sorted_values:
+    return None
+  index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+  return sorted_values[index]
+
+def summarize(latencies, errors, seconds):
+  latencies = sorted(latencies)
+  ms = lambda value: round(value * 1000, 3) if value is not None else None  # noqa: E731
+  return {
+    "requests": len(latencies),
+    "errors": errors,
+    "rps": round(len(latencies) / seconds, 1) if seconds > 0 else None,
+    "p50_ms": ms(percentile(latencies, 0.50)),
+    "p95_ms": ms(percentile(latencies, 0.95)),
+    "p99_ms": ms(percentile(latencies, 0.99)),
+    "max_ms": ms(latencies[-1] if latencies else None),
+    "mean_ms": ms(sum(latencies) / len(latencies) if latencies else None),
+  }
+
+def run(client, mix, duration, threads, seed):
+  workload = Workload(client)
+  names = list(mix)
+  weights = [mix[name] for name in names]
+  results = {name: {"latencies": [], "errors": 0} for name in names}
+  lock = threading.Lock()
+
+  def worker(number):
+    rng = random.Random(seed + number)
+    local = {name: {"latencies": [], "errors": 0} for name in names}
+    while time.perf_counter() < deadline:
+      name = rng.choices(names, weights)[0]
+      method, path, body = OPERATIONS[name](workload, rng, number)
+      started = time.perf_counter()
+      status, _ = client.request(method, path, body)
+      local[name]["latencies"].append(time.perf_counter() - started)
+      if status >= 400:
+        local[name]["errors"] += 1
+    with lock:
+      for name in names:
+        results[name]["latencies"].extend(local[name]["latencies"])
+        results[name]["errors"] += local[name]["errors"]
+
+  # Sessions for the review batches are created before timing starts
+  if 'reviews' in mix:
+    for number in range(threads):
+      workload.session_for(number)
+
+  started = time.perf_counter()
+  deadline = started + duration
+  workers = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+  for thread in workers:
+    thread.start()
+  for thread in workers:
+    thread.join()
+  elapsed = time.perf_counter() - started
+
+  everything = [latency for result in results.values() for latency in result["latencies"]]
+  return {
+    "seconds": round(elapsed, 3),
+    "overall": summarize(everything, sum(result["errors"] for result in results.values()), elapsed),
+    "operations": {name: summarize(result["latencies"], result["errors"], elapsed) for name, result in results.items()},
+  }
+
+def git_commit():
+  try:
+    commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, text=True).strip())
+    return commit, dirty
+  except (OSError, subprocess.CalledProcessError):
+    return None, None
+
+def database_sizes(path):
+  import sqlite3
+  conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+  try:
+    return {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+            for table in ('words', 'groups', 'study_sessions', 'word_review_items')}
+  finally:
+    conn.close()
+
+def print_report(report, previous=None):
+  columns = ('requests', 'errors', 'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')
+  print(f"{'operation':<12}" + ''.join(f'{column:>10}' for column in columns))
+  rows = [('overall', report["overall"])] + sorted(report["operations"].items())
+  for name, stats in rows:
+    print(f'{name:<12}' + ''.join(f'{"-" if stats[column] is None else stats[column]:>10}' for column in columns))
+    if previous is not None:
+      before = previous["overall"] if name == 'overall' else previous["operations"].get(name)
+      if before:
+        changes = []
+        for column in ('rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+          if before.get(column) and stats[column] is not None:
+            changes.append(f'{column} {100 * (stats[column] - before[column]) / before[column]:+.1f}%')
+        print(f'{"":<12}  vs {previous.get("commit") or "previous"}: ' + ', '.join(changes))
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  target = parser.add_mutually_exclusive_group()
+  target.add_argument('--db', default=DEFAULT_DB, help='database for the in-process app')
+  target.add_argument('--url', help='base URL of a running server')
+  parser.add_argument('--duration', type=float, default=30.0, help='seconds to run')
+  parser.add_argument('--threads', type=int, default=4)
+  parser.add_argument('--mix', default=DEFAULT_MIX, help='operation=weight pairs')
+  parser.add_argument('--seed', type=int, default=1)
+  parser.add_argument('--no-cache', action='store_true', help='disable the in-process response cache')
+  parser.add_argument('--review-writes', choices=('sync', 'group', 'log'), default='sync',
+                      help='REVIEW_WRITES mode of the in-process app')
+  parser.add_argument('--out', default=RESULTS_DIR, help="directory for the JSON result ('' to skip)")
+  parser.add_argument('--compare', help="earlier result file, or 'latest'")
+  args = parser.parse_args()
+
+  mix = parse_mix(args.mix)
+  previous_path = args.compare
+  if previous_path == 'latest':
+    found = sorted(glob.glob(os.path.join(args.out or RESULTS_DIR, '*.json')))
+    previous_path = found[-1] if found else None
+  previous = None
+  if previous_path:
+    with open(previous_path) as file:
+      previous = json.load(file)
+
+  if args.url:
+    client = HttpClient(args.url)
+    target_info = {"url": args.url}
+  else:
+    if not os.path.exists(args.db):
+      raise SystemExit(f'{args.db} does not exist; create it with benchmarks/generate.py')
+    from app import create_app
+    config = {'DATABASE': args.db, 'DB_POOL_SIZE': max(8, args.threads)}
+    if args.no_cache:
+      config['RESPONSE_CACHE_TTL'] = 0
+    config['REVIEW_WRITES'] = args.review_writes
+    client = InProcessClient(create_app(config))
+    target_info = {"db": args.db, "sizes": database_sizes(args.db), "response_cache": not args.no_cache,
+                   "review_writes": args.review_writes}
+
+  commit, dirty = git_commit()
+  started_at = datetime.now(timezone.utc)
+  report = {
+    "commit": commit,
+    "dirty": dirty,
+    "started_at": started_at.isoformat(timespec='seconds'),
+    "target": target_info,
+    "config": {"duration": args.duration, "threads": args.threads, "mix": mix, "seed": args.seed,
+               "review_batch": REVIEW_BATCH},
+    **run(client, mix, args.duration, args.threads, args.seed),
+  }
+
+  print_report(report, previous)
+  if args.out:
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"{started_at.strftime('%Y%m%dT%H%M%SZ')}-{commit or 'unknown'}.json")
+    with open(path, 'w') as file:
+      json.dump(report, file, indent=2)
+    print(f'Saved {path}')
+
+if __name__ == '__main__':
+  main()
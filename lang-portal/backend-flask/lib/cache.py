@@ -0,0 +1,166 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+
+# In-process response cache for read-mostly GET endpoints.
+#
+# Routes opt in with @cached('table', ...), naming the tables their response
+# is built from; write routes declare the tables they modify with
+# @invalidates('table', ...). Entries are kept in an LRU with a TTL, keyed
+# by path and query string. Every response carries an ETag (a hash of the
+# body) and a Last-Modified (the last invalidation of its tables), so
+# clients that revalidate with If-None-Match / If-Modified-Since get a 304.
+#
+# The TTL bounds staleness for writes made outside this process, such as
+# invoke tasks, migrations or other workers.
+
+DEFAULT_CACHE_SIZE = 512
+DEFAULT_CACHE_TTL = 60.0
+
+class CacheEntry:
+  __slots__ = ('body', 'mimetype', 'etag', 'last_modified', 'tables', 'expires')
+
+  def __init__(self, body, mimetype, etag, last_modified, tables, expires):
+    self.body = body
+    self.mimetype = mimetype
+    self.etag = etag
+    self.last_modified = last_modified
+    self.tables = tables
+    self.expires = expires
+
+class ResponseCache:
+  def __init__(self, max_entries=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL):
+    self.max_entries = max_entries
+    self.ttl = ttl
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+    self._started = time.time()
+    # Per table: number of invalidations and the time of the last one
+    self._generations = {}
+    self._modified = {}
+    self._stats = {"hits": 0, "misses": 0, "stores": 0, "not_modified": 0,
+                   "evictions": 0, "expirations": 0, "invalidations": 0}
+
+  @property
+  def enabled(self):
+    return self.max_entries > 0 and self.ttl > 0
+
+  def generation(self, tables):
+    with self._lock:
+      return tuple(self._generations.get(table, 0) for table in tables)
+
+  def last_modified(self, tables):
+    with self._lock:
+      return max((self._modified.get(table, self._started) for table in tables), default=self._started)
+
+  def get(self, key):
+    now = time.monotonic()
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        self._stats["misses"] += 1
+        return None
+      if entry.expires <= now:
+        del self._entries[key]
+        self._stats["expirations"] += 1
+        self._stats["misses"] += 1
+        return None
+      self._entries.move_to_end(key)
+      self._stats["hits"] += 1
+      return entry
+
+  def put(self, key, entry, generation):
+    with self._lock:
+      # A write landed while the response was being built; it may be stale
+      if tuple(self._generations.get(table, 0) for table in entry.tables) != generation:
+        return
+      self._entries[key] = entry
+      self._entries.move_to_end(key)
+      self._stats["stores"] += 1
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+        self._stats["evictions"] += 1
+
+  def invalidate(self, *tables):
+    """Drop every entry built from any of the given tables."""
+    tables = set(tables)
+    now = time.time()
+    with self._lock:
+      for table in tables:
+        self._generations[table] = self._generations.get(table, 0) + 1
+        self._modified[table] = now
+      stale = [key for key, entry in self._entries.items() if tables & entry.tables]
+      for key in stale:
+        del self._entries[key]
+      self._stats["invalidations"] += len(stale)
+
+  def record(self, stat):
+    with self._lock:
+      self._stats[stat] += 1
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+  def stats(self):
+    with self._lock:
+      return {**self._stats, "size": len(self._entries), "max_entries": self.max_entries, "ttl": self.ttl}
+
+def etag_for(body):
+  return hashlib.sha1(body).hexdigest()
+
+def conditional(response, etag, last_modified):
+  """Add the validators and turn the response into a 304 when they match."""
+  response.set_etag(etag)
+  response.last_modified = last_modified
+  response.headers['Cache-Control'] = 'no-cache'
+  response.make_conditional(request)
+  if response.status_code == 304:
+    current_app.response_cache.record("not_modified")
+  return response
+
+def cached(*tables):
+  """Cache successful GET responses of a view built from the given tables."""
+  tables = frozenset(tables)
+
+  def decorator(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+      cache = current_app.response_cache
+      if not cache.enabled:
+        return view(*args, **kwargs)
+
+      key = (request.path, tuple(sorted(request.args.items(multi=True))))
+      entry = cache.get(key)
+      if entry is not None:
+        response = current_app.response_class(entry.body, mimetype=entry.mimetype)
+        return conditional(response, entry.etag, entry.last_modified)
+
+      generation = cache.generation(tables)
+      last_modified = cache.last_modified(tables)
+      response = current_app.make_response(view(*args, **kwargs))
+      if response.status_code != 200 or response.direct_passthrough:
+        return response
+
+      body = response.get_data()
+      entry = CacheEntry(body, response.mimetype, etag_for(body), last_modified,
+                         tables, time.monotonic() + cache.ttl)
+      cache.put(key, entry, generation)
+      return conditional(response, entry.etag, entry.last_modified)
+    return wrapper
+  return decorator
+
+def invalidates(*tables):
+  """Invalidate cached responses built from the given tables after a successful write."""
+  def decorator(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+      response = current_app.make_response(view(*args, **kwargs))
+      if response.status_code < 400:
+        current_app.response_cache.invalidate(*tables)
+      return response
+    return wrapper
+  return decorator
@@ -0,0 +1,134 @@
+import time
+
+# Compaction of old review items.
+#
+# word_review_items only ever grows. Review items older than the retention
+# horizon are summed into word_review_daily (one row per word and day) and
+# deleted; with an archive path they are first copied into that database,
+# attached as review_archive, so the raw history is kept outside the hot
+# database.
+#
+# Everything derived from the review items already counts them: the
+# dashboard statistics, the per-session counters and word_reviews. The
+# triggers on word_review_items are therefore dropped while a chunk is
+# deleted and created again in the same transaction, so other connections
+# never see the table without them. The word_review_days view combines
+# the rollups with the remaining review items for recounts and per-word
+# history.
+#
+# Work is done in chunks of chunk_size items, each in its own transaction,
+# to keep the write lock short for the routes recording reviews.
+
+DEFAULT_RETENTION_DAYS = 365
+DEFAULT_CHUNK_SIZE = 50000
+
+ARCHIVE_SCHEMA = '''
+  CREATE TABLE IF NOT EXISTS review_archive.word_review_items (
+    id INTEGER PRIMARY KEY,
+    word_id INTEGER NOT NULL,
+    study_session_id INTEGER NOT NULL,
+    correct BOOLEAN NOT NULL,
+    created_at DATETIME,
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+  )
+'''
+
+def cutoff_day(cursor, days):
+  """The first day that is kept as raw review items."""
+  cursor.execute("SELECT date('now', ?)", (f'-{int(days)} days',))
+  return cursor.fetchone()[0]
+
+def review_item_triggers(cursor):
+  cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'word_review_items'")
+  return [(row[0], row[1]) for row in cursor.fetchall()]
+
+def compact_chunk(conn, cutoff, chunk_size, archive):
+  """Compact up to chunk_size of the oldest review items before cutoff.
+
+  Returns (compacted, archived, daily_rows).
+  """
+  cursor = conn.cursor()
+  archived = 0
+  try:
+    cursor.execute('BEGIN IMMEDIATE')
+    cursor.execute('DELETE FROM temp.compaction_batch')
+    cursor.execute('''
+      INSERT INTO temp.compaction_batch (id)
+      SELECT id FROM word_review_items WHERE created_at < ? ORDER BY created_at LIMIT ?
+    ''', (cutoff, chunk_size))
+    if cursor.rowcount == 0:
+      conn.commit()
+      return 0, 0, 0
+
+    if archive:
+      cursor.execute('''
+        INSERT OR IGNORE INTO review_archive.word_review_items (id, word_id, study_session_id, correct, created_at)
+        SELECT id, word_id, study_session_id, correct, created_at
+        FROM word_review_items
+        WHERE id IN (SELECT id FROM temp.compaction_batch)
+      ''')
+      archived = cursor.rowcount
+      # Commits across attached WAL databases are not atomic, so the copy
+      # commits first; a crash before the delete below only repeats it
+      conn.commit()
+      cursor.execute('BEGIN IMMEDIATE')
+
+    triggers = review_item_triggers(cursor)
+    for name, _ in triggers:
+      cursor.execute(f'DROP TRIGGER {name}')
+
+    # Reviews of deleted sessions are not counted anywhere, so they are not rolled up
+    cursor.execute('''
+      INSERT INTO word_review_daily (word_id, day, correct, wrong)
+      SELECT wri.word_id, date(wri.created_at), SUM(wri.correct = 1), SUM(wri.correct != 1)
+      FROM word_review_items wri
+      WHERE wri.id IN (SELECT id FROM temp.compaction_batch)
+        AND EXISTS (SELECT 1 FROM study_sessions ss WHERE ss.id = wri.study_session_id)
+      GROUP BY wri.word_id, date(wri.created_at)
+      ON CONFLICT(word_id, day) DO UPDATE SET
+        correct = correct + excluded.correct,
+        wrong = wrong + excluded.wrong
+    ''')
+    daily_rows = cursor.rowcount
+    cursor.execute('DELETE FROM word_review_items WHERE id IN (SELECT id FROM temp.compaction_batch)')
+    compacted = cursor.rowcount
+
+    for _, sql in triggers:
+      cursor.execute(sql)
+    conn.commit()
+  except Exception:
+    conn.rollback()
+    raise
+  return compacted, archived, daily_rows
+
+def compact_reviews(conn, days=DEFAULT_RETENTION_DAYS, archive_path=None, chunk_size=DEFAULT_CHUNK_SIZE):
+  """Roll review items older than `days` days up into word_review_daily and return a report."""
+  started = time.perf_counter()
+  cursor = conn.cursor()
+  conn.commit()
+  cutoff = cutoff_day(cursor, days)
+  report = {"cutoff": cutoff, "archive": archive_path, "compacted": 0, "archived": 0,
+            "daily_rows": 0, "chunks": 0}
+
+  cursor.execute('CREATE TEMP TABLE IF NOT EXISTS compaction_batch (id INTEGER PRIMARY KEY)')
+  if archive_path:
+    cursor.execute('ATTACH DATABASE ? AS review_archive', (archive_path,))
+  try:
+    if archive_path:
+      cursor.execute(ARCHIVE_SCHEMA)
+      conn.commit()
+    while True:
+      compacted, archived, daily_rows = compact_chunk(conn, cutoff, chunk_size, bool(archive_path))
+      if not compacted:
+        break
+      report["chunks"] += 1
+      report["compacted"] += compacted
+      report["archived"] += archived
+      report["daily_rows"] += daily_rows
+  finally:
+    cursor.execute('DROP TABLE IF EXISTS temp.compaction_batch')
+    if archive_path:
+      cursor.execute('DETACH DATABASE review_archive')
+
+  report["seconds"] = round(time.perf_counter() - started, 3)
+  return report
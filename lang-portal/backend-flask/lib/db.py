@@ -1,16 +1,24 @@
 import sqlite3
 import json
+import time
 from flask import g
+import migrate
+from lib import importer, queries
+from lib.metrics import InstrumentedCursor
+from lib.pool import ConnectionPool, DEFAULT_POOL_SIZE, DEFAULT_POOL_TIMEOUT, DEFAULT_STATEMENT_CACHE
 
 class Db:
-  def __init__(self, database='words.db'):
+  def __init__(self, database='words.db', pool_size=DEFAULT_POOL_SIZE, pool_timeout=DEFAULT_POOL_TIMEOUT, pragmas=None,
+               statement_cache_size=DEFAULT_STATEMENT_CACHE):
     self.database = database
-    self.connection = None
+    # Warm connections are checked out per request and returned on teardown
+    self.pool = ConnectionPool(database, max_size=pool_size, timeout=pool_timeout, pragmas=pragmas,
+                               statement_cache_size=statement_cache_size)
+    self.statement_stats = queries.StatementStats()
 
   def get(self):
     if 'db' not in g:
-      g.db = sqlite3.connect(self.database)
-      g.db.row_factory = sqlite3.Row  # Return rows as dictionaries
+      g.db = self.pool.acquire()
     return g.db
 
   def commit(self):
@@ -19,12 +27,42 @@ class Db:
   def cursor(self):
     # Ensure the connection is valid before getting a cursor
     connection = self.get()
-    return connection.cursor()
+    # Statements and their time are added to the request metrics
+    return connection.cursor(InstrumentedCursor)
+
+  # Run a statement from lib/queries.py and return its rows as dicts
+  def query(self, statement, params=()):
+    cursor = self.cursor()
+    # Plain tuples are mapped to dicts in one pass below
+    cursor.row_factory = None
+    started = time.perf_counter()
+    cursor.execute(statement.sql, params)
+    rows = cursor.fetchall()
+    self.statement_stats.record(statement.name, time.perf_counter() - started, len(rows))
+    return queries.to_dicts(cursor.description, rows)
+
+  def query_one(self, statement, params=()):
+    rows = self.query(statement, params)
+    return rows[0] if rows else None
 
   def close(self):
     db = g.pop('db', None)
     if db is not None:
-      db.close()
+      self.pool.release(db)
+
+  def pool_stats(self):
+    return self.pool.stats()
+
+  def query_stats(self):
+    return {
+      "statements": len(queries.STATEMENTS),
+      "statement_cache_size": self.pool.statement_cache_size,
+      "queries": self.statement_stats.snapshot()
+    }
+
+  # Close every idle connection, e.g. when the worker shuts down
+  def dispose(self):
+    self.pool.close()
 
   # Function to load SQL from a file
   def sql(self, filepath):
@@ -59,6 +97,36 @@ class Db:
     cursor.execute(self.sql('setup/create_table_study_sessions.sql'))
     self.get().commit()
 
+    # Spaced-repetition schedules and their due queue index
+    cursor.executescript(self.sql('setup/create_table_word_schedules.sql'))
+
+    # Create the indexes used by the routes (several statements per file)
+    cursor.executescript(self.sql('setup/create_indexes.sql'))
+
+    # Materialized dashboard statistics and the triggers maintaining them
+    cursor.executescript(self.sql('setup/create_dashboard_stats.sql'))
+
+    # Per-session review counters, end time and duration
+    cursor.executescript(self.sql('setup/create_session_tracking.sql'))
+
+    # Full-text word search indexes and the triggers syncing them
+    cursor.executescript(self.sql('setup/create_word_search.sql'))
+
+    # groups.words_count maintained by triggers on word_groups
+    cursor.executescript(self.sql('setup/create_group_counts.sql'))
+
+    # Distractor index for quizzes and the queue of words to index
+    cursor.executescript(self.sql('setup/create_word_neighbours.sql'))
+
+    # Daily rollups of compacted review items
+    cursor.executescript(self.sql('setup/create_review_rollup.sql'))
+
+    # Checkpoint of the write-behind review log
+    cursor.executescript(self.sql('setup/create_review_log.sql'))
+
+    # The schema above is already at the latest migration
+    migrate.mark_all_applied(self.get())
+
   def import_study_activities_json(self,cursor,data_json_path):
     study_actvities = self.load_json(data_json_path)
     for activity in study_actvities:
@@ -68,46 +136,16 @@ class Db:
     self.get().commit()
 
   def import_word_json(self,cursor,group_name,data_json_path):
-      # Insert a new group
-      cursor.execute('''
-        INSERT INTO groups (name) VALUES (?)
-      ''', (group_name,))
-      self.get().commit()
-
-      # Get the ID of the group
-      cursor.execute('SELECT id FROM groups WHERE name = ?', (group_name,))
-      core_verbs_group_id = cursor.fetchone()[0]
-
-      # Insert some sample words (verbs) from JSON file and associate with the group
-      words = self.load_json(data_json_path)
-
-      for word in words:
-        # Insert the word into the words table
-        cursor.execute('''
-          INSERT INTO words (jiantizi, pinyin, english, parts) VALUES (?, ?, ?, ?)
-        ''', (word['jiantizi'], word['pinyin'], word['english'], json.dumps(word['parts'])))
-        
-        # Get the last inserted word's ID
-        word_id = cursor.lastrowid
-
-        # Insert the word-group relationship into word_groups table
-        cursor.execute('''
-          INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)
-        ''', (word_id, core_verbs_group_id))
-      self.get().commit()
-
-      # Update the words_count in the groups table by counting all words in the group
-      cursor.execute('''
-        UPDATE groups
-        SET words_count = (
-          SELECT COUNT(*) FROM word_groups WHERE group_id = ?
-        )
-        WHERE id = ?
-      ''', (core_verbs_group_id, core_verbs_group_id))
-
-      self.get().commit()
-
-      print(f"Successfully added {len(words)} verbs to the '{group_name}' group.")
+    # Bulk-insert the words and link them to the group in one transaction
+    with open(data_json_path, 'r', encoding='utf-8') as file:
+      report = importer.import_words(
+        self.get(),
+        importer.read_records(file, 'json'),
+        group_name=group_name
+      )
+    print(f"Successfully added {report['linked']} words to the '{group_name}' group "
+          f"({report['words_per_second']} words/s).")
+    return report
 
   # Initialize the database with sample data
   def init(self, app):
@@ -0,0 +1,217 @@
+import heapq
+import json
+import re
+import time
+import unicodedata
+from collections import Counter, defaultdict
+
+# Distractor index for quizzes (sql/setup/create_word_neighbours.sql).
+#
+# A word's features are its characters, its pinyin syllables without tone
+# marks and the words of its English gloss. Two words score the weighted
+# number of features they share, counting only features shared by at most
+# MAX_POSTING words (a syllable like "shi" says nothing about similarity),
+# and each word keeps its NEIGHBOURS_PER_WORD best scoring words. Words
+# with the same characters or the same gloss are never neighbours: they
+# would be a second right answer.
+#
+# build_index recomputes everything in memory, for a fresh database or
+# offline. New and edited words are queued by triggers on words and
+# index_pending adds them one at a time: it scores the word against the
+# words sharing a feature (through word_features), keeps its best
+# neighbours and joins those words' lists where it ranks high enough.
+# refresh settles the queue: word by word in batches of REFRESH_BATCH, or,
+# when a bulk import left many words queued, with one build_index.
+# Indexing words in id order gives the same lists as build_index, except
+# that a feature can grow past MAX_POSTING after words were scored on it,
+# and that words losing a neighbour to an edit keep the rest of their list;
+# the next build_index settles both.
+
+NEIGHBOURS_PER_WORD = 10
+MAX_POSTING = 200
+
+# Words indexed per transaction by refresh, so writers get in between
+REFRESH_BATCH = 500
+
+# index_word costs about as much as build_index spends on twenty words, so
+# refresh rebuilds instead once at least one word in twenty is queued
+REBUILD_RATIO = 20
+
+# Weight of a shared character, English word and syllable
+WEIGHTS = {'c': 3, 'e': 2, 's': 1}
+
+STOPWORDS = frozenset([
+  'a', 'an', 'and', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it', 'of', 'on', 'one', 'or',
+  'sb', 'sth', 'the', 'to', 'with'
+])
+
+CJK = re.compile(r'[㐀-䶿一-鿿豈-﫿\U00020000-\U0002ffff]')
+
+def strip_tones(text):
+  """Drop tone marks (and the diaeresis, as words_fts does): 'lǜ' -> 'lu'."""
+  return ''.join(c for c in unicodedata.normalize('NFD', text) if not unicodedata.combining(c))
+
+def features(jiantizi, pinyin, english):
+  found = {'c:' + character for character in CJK.findall(jiantizi)}
+  found.update('s:' + syllable for syllable in re.findall(r'[a-z]+', strip_tones(pinyin).lower()))
+  found.update('e:' + token for token in re.findall(r'[a-z]+', english.lower()) if token not in STOPWORDS)
+  return found
+
+def identity(jiantizi, english):
+  """Words with the same key are interchangeable answers."""
+  return jiantizi, english.strip().lower()
+
+def top_neighbours(scores):
+  """The best (neighbour_id, score) pairs: highest score first, then lowest id."""
+  return heapq.nlargest(NEIGHBOURS_PER_WORD, scores.items(), key=lambda item: (item[1], -item[0]))
+
+def build_index(conn):
+  """Recompute word_features and word_neighbours for every word and return a report."""
+  started = time.perf_counter()
+  cursor = conn.cursor()
+  try:
+    cursor.execute('SELECT id, jiantizi, pinyin, english FROM words')
+    words = {}
+    keys = {}
+    postings = defaultdict(list)
+    for word_id, jiantizi, pinyin, english in cursor.fetchall():
+      words[word_id] = features(jiantizi, pinyin, english)
+      keys[word_id] = identity(jiantizi, english)
+      for feature in words[word_id]:
+        postings[feature].append(word_id)
+
+    neighbours = []
+    for word_id, word_features in words.items():
+      scores = Counter()
+      for feature in word_features:
+        posting = postings[feature]
+        if len(posting) > MAX_POSTING:
+          continue
+        weight = WEIGHTS[feature[0]]
+        for other in posting:
+          scores[other] += weight
+      key = keys[word_id]
+      for other in list(scores):
+        if keys[other][0] == key[0] or keys[other][1] == key[1]:
+          del scores[other]
+      neighbours.extend((word_id, other, score) for other, score in top_neighbours(scores))
+
+    cursor.execute('DELETE FROM word_features')
+    cursor.execute('DELETE FROM word_neighbours')
+    cursor.execute('DELETE FROM word_neighbour_queue')
+    cursor.executemany('INSERT INTO word_features (feature, word_id) VALUES (?, ?)',
+                       [(feature, word_id) for word_id, word_features in words.items() for feature in word_features])
+    cursor.executemany('INSERT INTO word_neighbours (word_id, neighbour_id, score) VALUES (?, ?, ?)', neighbours)
+    conn.commit()
+  except Exception:
+    conn.rollback()
+    raise
+  return {"words": len(words), "neighbours": len(neighbours),
+          "seconds": round(time.perf_counter() - started, 3)}
+
+def pending(cursor):
+  cursor.execute('SELECT COUNT(*) FROM word_neighbour_queue')
+  return cursor.fetchone()[0]
+
+def index_word(cursor, word_id, jiantizi, pinyin, english):
+  word_features = features(jiantizi, pinyin, english)
+  cursor.executemany('INSERT OR IGNORE INTO word_features (feature, word_id) VALUES (?, ?)',
+                     [(feature, word_id) for feature in word_features])
+
+  scores = Counter()
+  for feature in word_features:
+    cursor.execute('SELECT word_id FROM word_features WHERE feature = ? LIMIT ?', (feature, MAX_POSTING + 1))
+    posting = [row[0] for row in cursor.fetchall()]
+    if len(posting) > MAX_POSTING:
+      continue
+    weight = WEIGHTS[feature[0]]
+    for other in posting:
+      scores[other] += weight
+  if not scores:
+    return 0
+
+  key = identity(jiantizi, english)
+  cursor.execute('''
+    SELECT w.id, w.jiantizi, w.english FROM json_each(?) ids CROSS JOIN words w ON w.id = ids.value
+  ''', (json.dumps(list(scores)),))
+  scores = Counter({
+    row[0]: scores[row[0]] for row in cursor.fetchall()
+    if row[0] != word_id and row[1] != key[0] and identity(row[1], row[2])[1] != key[1]
+  })
+
+  cursor.executemany('INSERT OR REPLACE INTO word_neighbours (word_id, neighbour_id, score) VALUES (?, ?, ?)',
+                     [(word_id, other, score) for other, score in top_neighbours(scores)])
+
+  # The similarity is symmetric: the word also joins the lists of the
+  # scoring words that have room or whose worst neighbour it beats (or
+  # ties, in which case the ids decide below)
+  cursor.execute('''
+    SELECT word_id, COUNT(*), MIN(score) FROM word_neighbours
+    WHERE word_id IN (SELECT value FROM json_each(?))
+    GROUP BY word_id
+  ''', (json.dumps(list(scores)),))
+  lists = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+  offers = []
+  full = []
+  for other, score in scores.items():
+    count, worst = lists.get(other, (0, 0))
+    if count < NEIGHBOURS_PER_WORD:
+      offers.append((other, word_id, score))
+    elif score >= worst:
+      offers.append((other, word_id, score))
+      full.append((other, other))
+  cursor.executemany('INSERT OR REPLACE INTO word_neighbours (word_id, neighbour_id, score) VALUES (?, ?, ?)', offers)
+  # A full list that took the word gives up its worst neighbour
+  cursor.executemany('''
+    DELETE FROM word_neighbours
+    WHERE word_id = ? AND neighbour_id = (
+      SELECT neighbour_id FROM word_neighbours WHERE word_id = ? ORDER BY score, neighbour_id DESC LIMIT 1
+    )
+  ''', full)
+  return len(scores)
+
+def index_pending(cursor, limit=None):
+  """Index the first `limit` queued words (all by default) inside the caller's transaction; returns how many."""
+  cursor.execute('''
+    SELECT w.id, w.jiantizi, w.pinyin, w.english
+    FROM word_neighbour_queue q
+    JOIN words w ON w.id = q.word_id
+    ORDER BY q.word_id
+    LIMIT ?
+  ''', (-1 if limit is None else limit,))
+  queued = cursor.fetchall()
+  for word_id, jiantizi, pinyin, english in queued:
+    index_word(cursor, word_id, jiantizi, pinyin, english)
+  if limit is None:
+    cursor.execute('DELETE FROM word_neighbour_queue')
+  else:
+    cursor.executemany('DELETE FROM word_neighbour_queue WHERE word_id = ?', [(row[0],) for row in queued])
+  return len(queued)
+
+def refresh(conn):
+  """Index the queued words and return a report.
+
+  Each batch of REFRESH_BATCH words is committed on its own. A queue of
+  at least REFRESH_BATCH words that is also one REBUILD_RATIO-th of all
+  words is settled with build_index instead, in a fraction of the time.
+  """
+  started = time.perf_counter()
+  cursor = conn.cursor()
+  queued = pending(cursor)
+  cursor.execute('SELECT COUNT(*) FROM words')
+  if queued >= REFRESH_BATCH and queued * REBUILD_RATIO >= cursor.fetchone()[0]:
+    build_index(conn)
+    return {"words": queued, "rebuilt": True, "seconds": round(time.perf_counter() - started, 3)}
+
+  indexed = 0
+  while True:
+    try:
+      batch = index_pending(cursor, REFRESH_BATCH)
+      conn.commit()
+    except Exception:
+      conn.rollback()
+      raise
+    indexed += batch
+    if batch < REFRESH_BATCH:
+      break
+  return {"words": indexed, "rebuilt": False, "seconds": round(time.perf_counter() - started, 3)}
@@ -0,0 +1,204 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timezone
+
+# Streaming exports (GET /api/export/<name>).
+#
+# An export is a single SELECT whose rows are read with fetchmany, BATCH_SIZE
+# at a time, and written out batch by batch as NDJSON or CSV (optionally
+# through a streaming gzip compressor), so memory stays flat however many
+# rows there are. Every filter combination is answered by an index in the
+# order of the export, with no sort step that would have to read every row
+# before the first one is sent: words come in id order, study sessions by
+# start time, review items by time or, when filtered by session, group or
+# activity, session by session.
+
+FORMATS = ('ndjson', 'csv')
+BATCH_SIZE = 1000
+
+MIMETYPES = {
+  'ndjson': 'application/x-ndjson',
+  'csv': 'text/csv'
+}
+
+# The filters each export accepts
+FILTERS = {
+  'words': ('group_id',),
+  'study-sessions': ('since', 'until', 'group_id', 'activity_id'),
+  'review-items': ('since', 'until', 'group_id', 'activity_id', 'session_id')
+}
+
+class InvalidExport(ValueError):
+  """Raised for export parameters that cannot be turned into a query."""
+
+def parse_time(name, value):
+  """Accept an ISO date or datetime and return it as stored ('YYYY-MM-DD HH:MM:SS', UTC)."""
+  try:
+    parsed = datetime.fromisoformat(value)
+  except ValueError:
+    raise InvalidExport(f"{name} must be an ISO date or datetime")
+  if parsed.tzinfo is not None:
+    parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+  return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+def parse_filters(name, args):
+  """Read the export's filters from the query string; unsupported ones are rejected."""
+  filters = {}
+  for key in ('since', 'until', 'group_id', 'activity_id', 'session_id'):
+    value = args.get(key)
+    if value is None or value == '':
+      continue
+    if key not in FILTERS[name]:
+      raise InvalidExport(f"{name} cannot be filtered by {key}")
+    if key in ('since', 'until'):
+      filters[key] = parse_time(key, value)
+    else:
+      try:
+        filters[key] = int(value)
+      except ValueError:
+        raise InvalidExport(f"{key} must be an integer")
+  return filters
+
+def words_query(filters):
+  select = '''
+    SELECT w.id, w.jiantizi, w.pinyin, w.english, w.parts,
+           COALESCE(r.correct_count, 0) AS correct_count,
+           COALESCE(r.wrong_count, 0) AS wrong_count
+  '''
+  if 'group_id' in filters:
+    return select + '''
+      FROM word_groups wg
+      JOIN words w ON w.id = wg.word_id
+      LEFT JOIN word_reviews r ON r.word_id = w.id
+      WHERE wg.group_id = ?
+      ORDER BY wg.word_id
+    ''', (filters['group_id'],)
+  return select + '''
+    FROM words w
+    LEFT JOIN word_reviews r ON r.word_id = w.id
+    ORDER BY w.id
+  ''', ()
+
+def time_conditions(filters, column):
+  conditions, params = [], []
+  if 'since' in filters:
+    conditions.append(f'{column} >= ?')
+    params.append(filters['since'])
+  if 'until' in filters:
+    conditions.append(f'{column} < ?')
+    params.append(filters['until'])
+  return conditions, params
+
+def session_conditions(filters):
+  conditions, params = [], []
+  if 'group_id' in filters:
+    conditions.append('group_id = ?')
+    params.append(filters['group_id'])
+  if 'activity_id' in filters:
+    conditions.append('study_activity_id = ?')
+    params.append(filters['activity_id'])
+  return conditions, params
+
+def where(conditions):
+  return 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+
+def sessions_query(filters):
+  conditions, params = session_conditions(filters)
+  times, time_params = time_conditions(filters, 'created_at')
+  return f'''
+    SELECT id, group_id, study_activity_id, created_at, ended_at, closed_at, duration_ms,
+           review_items_count, correct_count
+    FROM study_sessions
+    {where(conditions + times)}
+    ORDER BY created_at
+  ''', (*params, *time_params)
+
+def review_items_query(filters):
+  conditions, params = [], []
+  sessions, session_params = session_conditions(filters)
+  if 'session_id' in filters:
+    conditions.append('study_session_id = ?')
+    params.append(filters['session_id'])
+  if sessions:
+    conditions.append(f'study_session_id IN (SELECT id FROM study_sessions {where(sessions)})')
+    params.extend(session_params)
+  # Session filters walk idx_word_review_items_session, the rest idx_word_review_items_created
+  order = 'study_session_id, created_at' if conditions else 'created_at'
+  times, time_params = time_conditions(filters, 'created_at')
+  return f'''
+    SELECT id, word_id, study_session_id, correct, created_at
+    FROM word_review_items
+    {where(conditions + times)}
+    ORDER BY {order}
+  ''', (*params, *time_params)
+
+QUERIES = {
+  'words': words_query,
+  'study-sessions': sessions_query,
+  'review-items': review_items_query
+}
+
+def build(name, args):
+  """Return (sql, params) for an export and the request's query string."""
+  return QUERIES[name](parse_filters(name, args))
+
+def batches(cursor):
+  while True:
+    rows = cursor.fetchmany(BATCH_SIZE)
+    if not rows:
+      return
+    yield rows
+
+def ndjson_record(columns, row):
+  record = dict(zip(columns, row))
+  if 'parts' in record:
+    try:
+      record['parts'] = json.loads(record['parts'])
+    except (TypeError, ValueError):
+      pass
+  if 'correct' in record:
+    record['correct'] = bool(record['correct'])
+  return record
+
+def ndjson_chunks(columns, batches):
+  for rows in batches:
+    yield ''.join(json.dumps(ndjson_record(columns, row), ensure_ascii=False) + '\n' for row in rows)
+
+def csv_chunks(columns, batches):
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  # The header goes out even when there are no rows
+  writer.writerow(columns)
+  for rows in batches:
+    writer.writerows(rows)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+  if buffer.tell():
+    yield buffer.getvalue()
+
+def gzip_chunks(chunks):
+  compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+  for chunk in chunks:
+    data = compressor.compress(chunk)
+    if data:
+      yield data
+  yield compressor.flush()
+
+def stream(conn, sql, params, fmt, gzip=False):
+  """Run an export query and yield its encoded output, one batch of rows at a time."""
+  cursor = conn.cursor()
+  try:
+    cursor.execute(sql, params)
+    columns = [column[0] for column in cursor.description]
+    if fmt == 'csv':
+      chunks = csv_chunks(columns, batches(cursor))
+    else:
+      chunks = ndjson_chunks(columns, batches(cursor))
+    encoded = (chunk.encode('utf-8') for chunk in chunks)
+    yield from (gzip_chunks(encoded) if gzip else encoded)
+  finally:
+    # Resets the statement, which ends its read transaction
+    cursor.close()
@@ -0,0 +1,189 @@
+import csv
+import io
+import json
+import time
+from lib import distractors
+
+# Bulk vocabulary import.
+#
+# Records are read lazily from JSON, NDJSON or CSV and written in batches
+# with executemany inside a single transaction. Words are de-duplicated on
+# jiantizi (within the input and against the words already stored), so
+# importing a deck that overlaps an existing group links the existing rows
+# instead of inserting copies.
+
+FORMATS = ('json', 'ndjson', 'csv')
+DEFAULT_BATCH_SIZE = 1000
+
+# Keep IN (...) lists well below SQLite's bound parameter limit
+LOOKUP_CHUNK = 500
+
+# Imports inserting more words than this index them for distractors after
+# committing, through distractors.refresh, instead of inside the import
+INDEX_INLINE_LIMIT = 100
+
+class InvalidImport(ValueError):
+  """Raised when the input cannot be read as vocabulary records."""
+
+def detect_format(filename=None, mimetype=None):
+  """Guess the input format from a file name or MIME type (default: json)."""
+  name = (filename or '').lower()
+  if name.endswith(('.ndjson', '.jsonl')) or mimetype in ('application/x-ndjson', 'application/jsonlines'):
+    return 'ndjson'
+  if name.endswith('.csv') or mimetype in ('text/csv', 'application/csv'):
+    return 'csv'
+  return 'json'
+
+def read_records(stream, fmt):
+  """Yield word records from a text stream in the given format."""
+  if fmt == 'json':
+    data = json.load(stream)
+    if isinstance(data, dict):
+      data = data.get('words')
+    if not isinstance(data, list):
+      raise InvalidImport("Expected a JSON array of words or an object with 'words'")
+    yield from data
+  elif fmt == 'ndjson':
+    for number, line in enumerate(stream, start=1):
+      line = line.strip()
+      if not line:
+        continue
+      try:
+        yield json.loads(line)
+      except ValueError:
+        raise InvalidImport(f"Line {number} is not valid JSON")
+  elif fmt == 'csv':
+    for row in csv.DictReader(stream):
+      parts = (row.get('parts') or '').strip()
+      try:
+        row['parts'] = json.loads(parts) if parts else []
+      except ValueError:
+        row['parts'] = []
+      yield row
+  else:
+    raise InvalidImport(f"Unsupported format '{fmt}', expected one of {', '.join(FORMATS)}")
+
+def text_stream(binary):
+  """Wrap a binary stream (file upload, request body) for read_records."""
+  return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+def text_field(record, key):
+  """Return a record's field stripped, or '' when it is missing or not a string."""
+  value = record.get(key)
+  return value.strip() if isinstance(value, str) else ''
+
+def normalize(record):
+  """Return the (jiantizi, pinyin, english, parts) row for a record, or None."""
+  if not isinstance(record, dict):
+    return None
+  jiantizi = text_field(record, 'jiantizi')
+  pinyin = text_field(record, 'pinyin')
+  english = text_field(record, 'english')
+  if not (jiantizi and pinyin and english):
+    return None
+  return (jiantizi, pinyin, english, json.dumps(record.get('parts') or [], ensure_ascii=False))
+
+def batches(records, size):
+  batch = []
+  for record in records:
+    batch.append(record)
+    if len(batch) >= size:
+      yield batch
+      batch = []
+  if batch:
+    yield batch
+
+def group_id_for(cursor, group_name):
+  """Return the id of the named group, creating it if needed."""
+  cursor.execute('SELECT id FROM groups WHERE name = ? ORDER BY id LIMIT 1', (group_name,))
+  row = cursor.fetchone()
+  if row:
+    return row[0]
+  cursor.execute('INSERT INTO groups (name) VALUES (?)', (group_name,))
+  return cursor.lastrowid
+
+def word_ids_for(cursor, keys):
+  """Map jiantizi to the (lowest) id of the stored word."""
+  ids = {}
+  keys = list(keys)
+  for start in range(0, len(keys), LOOKUP_CHUNK):
+    chunk = keys[start:start + LOOKUP_CHUNK]
+    cursor.execute(f'''
+      SELECT jiantizi, MIN(id) FROM words
+      WHERE jiantizi IN ({','.join('?' * len(chunk))})
+      GROUP BY jiantizi
+    ''', chunk)
+    ids.update(cursor.fetchall())
+  return ids
+
+def import_words(conn, records, group_name=None, batch_size=DEFAULT_BATCH_SIZE):
+  """Import word records in one transaction and return a report.
+
+  When group_name is given, every imported (or already present) word is
+  linked to that group; the word_groups triggers keep its words_count.
+  Up to INDEX_INLINE_LIMIT inserted words are added to the distractor
+  index before committing; more are indexed by distractors.refresh once
+  the import is committed. "seconds" and "words_per_second" cover the
+  import alone and "index_seconds" the indexing.
+  """
+  started = time.perf_counter()
+  report = {"group": group_name, "group_id": None, "read": 0, "inserted": 0,
+            "duplicates": 0, "rejected": 0, "linked": 0}
+  seen = set()
+  cursor = conn.cursor()
+  try:
+    group_id = group_id_for(cursor, group_name) if group_name else None
+    report["group_id"] = group_id
+
+    for batch in batches(records, batch_size):
+      report["read"] += len(batch)
+      rows = {}
+      for record in batch:
+        row = normalize(record)
+        if row is None:
+          report["rejected"] += 1
+        elif row[0] in seen or row[0] in rows:
+          report["duplicates"] += 1
+        else:
+          rows[row[0]] = row
+      if not rows:
+        continue
+      seen.update(rows)
+
+      existing = word_ids_for(cursor, rows)
+      new_rows = [row for key, row in rows.items() if key not in existing]
+      report["duplicates"] += len(rows) - len(new_rows)
+      cursor.executemany('''
+        INSERT INTO words (jiantizi, pinyin, english, parts) VALUES (?, ?, ?, ?)
+      ''', new_rows)
+      report["inserted"] += len(new_rows)
+
+      if group_id is not None:
+        ids = existing
+        ids.update(word_ids_for(cursor, [row[0] for row in new_rows]))
+        cursor.executemany('''
+          INSERT INTO word_groups (word_id, group_id)
+          SELECT ?1, ?2
+          WHERE NOT EXISTS (SELECT 1 FROM word_groups WHERE word_id = ?1 AND group_id = ?2)
+        ''', [(ids[key], group_id) for key in rows])
+        report["linked"] += cursor.rowcount
+
+    # A few new words join the distractor index in the same transaction;
+    # indexing a bulk import word by word would hold the write lock for long
+    indexed_at = time.perf_counter()
+    inline = report["inserted"] <= INDEX_INLINE_LIMIT
+    if inline:
+      distractors.index_pending(cursor)
+    index_seconds = time.perf_counter() - indexed_at
+    conn.commit()
+  except Exception:
+    conn.rollback()
+    raise
+
+  seconds = time.perf_counter() - started - index_seconds
+  report["seconds"] = round(seconds, 3)
+  report["words_per_second"] = round(report["read"] / seconds) if seconds > 0 else None
+  if not inline:
+    index_seconds = distractors.refresh(conn)["seconds"]
+  report["index_seconds"] = round(index_seconds, 3)
+  return report
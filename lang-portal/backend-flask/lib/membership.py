@@ -0,0 +1,102 @@
+import json
+
+# Group membership.
+#
+# Words are added to and removed from a group in bulk, one statement each
+# over a JSON array of ids, inside a single transaction. groups.words_count
+# follows along through the triggers in sql/setup/create_group_counts.sql,
+# so nothing here recounts a group. verify_counts and repair_counts compare
+# the counters with a single grouped count over word_groups and fix only
+# the groups that drifted, e.g. after rows were changed with the triggers
+# dropped.
+
+def group_exists(cursor, group_id):
+  cursor.execute('SELECT 1 FROM groups WHERE id = ?', (group_id,))
+  return cursor.fetchone() is not None
+
+def words_count(cursor, group_id):
+  cursor.execute('SELECT words_count FROM groups WHERE id = ?', (group_id,))
+  return cursor.fetchone()['words_count']
+
+def known_words(cursor, word_ids):
+  cursor.execute('''
+    SELECT w.id FROM json_each(?) ids CROSS JOIN words w ON w.id = ids.value
+  ''', (json.dumps(word_ids),))
+  return {row['id'] for row in cursor.fetchall()}
+
+def add_words(conn, group_id, word_ids):
+  """Link distinct word ids to a group in one transaction.
+
+  Returns {"added", "already_in_group", "missing"}; ids of words that do
+  not exist are listed in "missing" and skipped.
+  """
+  cursor = conn.cursor()
+  try:
+    known = known_words(cursor, word_ids)
+    ids = json.dumps([word_id for word_id in word_ids if word_id in known])
+    cursor.execute('''
+      INSERT INTO word_groups (word_id, group_id)
+      SELECT ids.value, ?1
+      FROM json_each(?2) ids
+      WHERE NOT EXISTS (SELECT 1 FROM word_groups WHERE group_id = ?1 AND word_id = ids.value)
+    ''', (group_id, ids))
+    added = cursor.rowcount
+    conn.commit()
+  except Exception:
+    conn.rollback()
+    raise
+  return {
+    "added": added,
+    "already_in_group": len(known) - added,
+    "missing": [word_id for word_id in word_ids if word_id not in known]
+  }
+
+def remove_words(conn, group_id, word_ids):
+  """Unlink distinct word ids from a group in one transaction.
+
+  Returns {"removed", "not_in_group"}. word_groups has no unique
+  constraint, so a word may be linked more than once; "removed" counts
+  words, not rows, and every link of a removed word goes.
+  """
+  ids = json.dumps(word_ids)
+  cursor = conn.cursor()
+  try:
+    cursor.execute('''
+      SELECT COUNT(DISTINCT word_id) AS linked FROM word_groups
+      WHERE group_id = ? AND word_id IN (SELECT value FROM json_each(?))
+    ''', (group_id, ids))
+    removed = cursor.fetchone()['linked']
+    cursor.execute('''
+      DELETE FROM word_groups
+      WHERE group_id = ? AND word_id IN (SELECT value FROM json_each(?))
+    ''', (group_id, ids))
+    conn.commit()
+  except Exception:
+    conn.rollback()
+    raise
+  return {"removed": removed, "not_in_group": len(word_ids) - removed}
+
+def verify_counts(cursor):
+  """Return {group_id: (stored, counted)} for every group whose words_count drifted."""
+  cursor.execute('''
+    SELECT g.id, g.words_count AS stored, COALESCE(c.counted, 0) AS counted
+    FROM groups g
+    LEFT JOIN (
+      SELECT group_id, COUNT(*) AS counted FROM word_groups GROUP BY group_id
+    ) c ON c.group_id = g.id
+    WHERE g.words_count IS NOT COALESCE(c.counted, 0)
+  ''')
+  return {row['id']: (row['stored'], row['counted']) for row in cursor.fetchall()}
+
+def repair_counts(conn):
+  """Fix the drifted counters and return what was wrong (see verify_counts)."""
+  cursor = conn.cursor()
+  try:
+    mismatches = verify_counts(cursor)
+    cursor.executemany('UPDATE groups SET words_count = ? WHERE id = ?',
+                       [(counted, group_id) for group_id, (_, counted) in mismatches.items()])
+    conn.commit()
+  except Exception:
+    conn.rollback()
+    raise
+  return mismatches
@@ -0,0 +1,249 @@
+import logging
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from flask import g, has_app_context, request
+
+# Request and SQL instrumentation, exposed in the Prometheus text format.
+#
+# Every request records its latency, response size, number of SQL
+# statements and time spent in SQLite, labelled with the route rule (e.g.
+# /groups/<int:id>/study_sessions) rather than the raw path so the label
+# set stays bounded. SQL is measured by the cursor class Db hands out.
+#
+# With SLOW_REQUEST_MS set, requests slower than that are logged together
+# with the statements they ran and their EXPLAIN QUERY PLAN, and the most
+# recent ones are kept for GET /api/admin/slow-requests.
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SLOW_REQUESTS_KEPT = 50
+
+class InstrumentedCursor(sqlite3.Cursor):
+  """A cursor that adds its statements and their time to the current request."""
+
+  def execute(self, sql, parameters=()):
+    started = time.perf_counter()
+    try:
+      return super().execute(sql, parameters)
+    finally:
+      record_statement(sql, parameters, time.perf_counter() - started)
+
+  def executemany(self, sql, seq_of_parameters):
+    started = time.perf_counter()
+    try:
+      return super().executemany(sql, seq_of_parameters)
+    finally:
+      record_statement(sql, None, time.perf_counter() - started)
+
+  def executescript(self, sql_script):
+    started = time.perf_counter()
+    try:
+      return super().executescript(sql_script)
+    finally:
+      record_statement(sql_script, None, time.perf_counter() - started)
+
+  # SQLite produces rows lazily, so fetching is part of the statement's time
+  def fetchone(self):
+    started = time.perf_counter()
+    try:
+      return super().fetchone()
+    finally:
+      record_fetch(time.perf_counter() - started)
+
+  def fetchmany(self, size=None):
+    started = time.perf_counter()
+    try:
+      return super().fetchmany(self.arraysize if size is None else size)
+    finally:
+      record_fetch(time.perf_counter() - started)
+
+  def fetchall(self):
+    started = time.perf_counter()
+    try:
+      return super().fetchall()
+    finally:
+      record_fetch(time.perf_counter() - started)
+
+def request_sql():
+  """The SQL counters of the current request, or None outside of one."""
+  if not has_app_context():
+    return None
+  return g.get('sql_metrics')
+
+def record_statement(sql, parameters, seconds):
+  counters = request_sql()
+  if counters is None:
+    return
+  counters["statements"] += 1
+  counters["seconds"] += seconds
+  if counters["log"] is not None:
+    counters["log"].append((sql, parameters, seconds))
+
+def record_fetch(seconds):
+  counters = request_sql()
+  if counters is not None:
+    counters["seconds"] += seconds
+
+class Histogram:
+  __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+  def __init__(self, buckets):
+    self.buckets = buckets
+    self.counts = [0] * len(buckets)
+    self.sum = 0.0
+    self.count = 0
+
+  def observe(self, value):
+    index = bisect_left(self.buckets, value)
+    if index < len(self.counts):
+      self.counts[index] += 1
+    self.sum += value
+    self.count += 1
+
+def label_text(labels):
+  if not labels:
+    return ''
+  escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+  return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+def format_value(value):
+  return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metrics:
+  def __init__(self, slow_request_ms=None):
+    self.slow_request_ms = slow_request_ms
+    self.slow_requests = deque(maxlen=SLOW_REQUESTS_KEPT)
+    self._lock = threading.Lock()
+    self._in_flight = 0
+    self._requests = {}
+    self._histograms = {}
+
+  def start_request(self):
+    with self._lock:
+      self._in_flight += 1
+
+  def finish_request(self):
+    with self._lock:
+      self._in_flight -= 1
+
+  def observe(self, method, endpoint, status, seconds, size, statements, sql_seconds):
+    labels = (('method', method), ('endpoint', endpoint))
+    with self._lock:
+      key = labels + (('status', str(status)),)
+      self._requests[key] = self._requests.get(key, 0) + 1
+      for name, buckets, value in (
+        ('http_request_duration_seconds', LATENCY_BUCKETS, seconds),
+        ('http_response_size_bytes', SIZE_BUCKETS, size),
+        ('db_statements_per_request', STATEMENT_BUCKETS, statements),
+        ('db_time_per_request_seconds', LATENCY_BUCKETS, sql_seconds),
+      ):
+        histogram = self._histograms.get((name, labels))
+        if histogram is None:
+          histogram = self._histograms[name, labels] = Histogram(buckets)
+        histogram.observe(value)
+
+  def render(self):
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    with self._lock:
+      lines.append('# HELP http_requests_in_flight Requests currently being served.')
+      lines.append('# TYPE http_requests_in_flight gauge')
+      lines.append(f'http_requests_in_flight {self._in_flight}')
+
+      lines.append('# HELP http_requests_total Requests served, by route, method and status.')
+      lines.append('# TYPE http_requests_total counter')
+      for labels, count in sorted(self._requests.items()):
+        lines.append(f'http_requests_total{label_text(labels)} {count}')
+
+      for name, help_text in (
+        ('http_request_duration_seconds', 'Request latency in seconds.'),
+        ('http_response_size_bytes', 'Response body size in bytes.'),
+        ('db_statements_per_request', 'SQL statements executed per request.'),
+        ('db_time_per_request_seconds', 'Time spent executing SQL and fetching rows per request.'),
+      ):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (metric, labels), histogram in sorted(self._histograms.items()):
+          if metric != name:
+            continue
+          cumulative = 0
+          for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{label_text(labels + (("le", format_value(bound)),))} {cumulative}')
+          lines.append(f'{name}_bucket{label_text(labels + (("le", "+Inf"),))} {histogram.count}')
+          lines.append(f'{name}_sum{label_text(labels)} {format_value(histogram.sum)}')
+          lines.append(f'{name}_count{label_text(labels)} {histogram.count}')
+    return '\n'.join(lines) + '\n'
+
+def explain(db, statements):
+  """EXPLAIN QUERY PLAN for the read statements of a slow request."""
+  plans = []
+  # Reuse the request's connection if it still holds one; the pool may have no other
+  conn = g.get('db')
+  borrowed = conn is None
+  if borrowed:
+    conn = db.pool.acquire()
+  try:
+    for sql, parameters, seconds in statements:
+      entry = {"sql": ' '.join(sql.split()), "ms": round(seconds * 1000, 3)}
+      if parameters is not None and sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        try:
+          entry["plan"] = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, parameters)]
+        except sqlite3.Error as e:
+          entry["plan_error"] = str(e)
+      plans.append(entry)
+  finally:
+    if borrowed:
+      db.pool.release(conn)
+  return plans
+
+def init_app(app):
+  app.metrics = Metrics(slow_request_ms=app.config.get('SLOW_REQUEST_MS'))
+
+  @app.before_request
+  def start_timer():
+    app.metrics.start_request()
+    g.in_flight = True
+    g.request_started = time.perf_counter()
+    g.sql_metrics = {"statements": 0, "seconds": 0.0,
+                     "log": [] if app.metrics.slow_request_ms else None}
+
+  @app.after_request
+  def record_request(response):
+    started = g.pop('request_started', None)
+    counters = g.pop('sql_metrics', None)
+    if started is None or counters is None:
+      return response
+    seconds = time.perf_counter() - started
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    size = response.calculate_content_length() or 0
+    app.metrics.observe(request.method, endpoint, response.status_code, seconds, size,
+                        counters["statements"], counters["seconds"])
+
+    threshold = app.metrics.slow_request_ms
+    if threshold and seconds * 1000 >= threshold:
+      slow = {
+        "method": request.method,
+        "path": request.full_path.rstrip('?'),
+        "endpoint": endpoint,
+        "status": response.status_code,
+        "ms": round(seconds * 1000, 3),
+        "sql_ms": round(counters["seconds"] * 1000, 3),
+        "statements": explain(app.db, counters["log"])
+      }
+      app.metrics.slow_requests.append(slow)
+      logger.warning("Slow request %s %s took %.1fms (%d statements, %.1fms SQL): %s",
+                     slow["method"], slow["path"], slow["ms"], len(slow["statements"]),
+                     slow["sql_ms"], slow["statements"])
+    return response
+
+  @app.teardown_request
+  def finish_request(exception):
+    if g.pop('in_flight', False):
+      app.metrics.finish_request()
@@ -0,0 +1,83 @@
+import base64
+import binascii
+import json
+
+# Keyset (cursor) pagination helpers shared by the list endpoints.
+#
+# A cursor is an opaque, url-safe token holding the sort column, the
+# direction and the sort key of the last row on the previous page.
+# The next page is fetched with a seek predicate such as
+#   (w.jiantizi, w.id) > (?, ?)
+# so SQLite can start reading the index right after that row instead of
+# stepping over every earlier row the way LIMIT/OFFSET does.
+
+MAX_PER_PAGE = 100
+
+class InvalidCursor(ValueError):
+  pass
+
+def per_page(args, default=10):
+  """Read ?per_page=, clamped to 1..MAX_PER_PAGE."""
+  value = args.get('per_page', default, type=int)
+  return min(max(value, 1), MAX_PER_PAGE)
+
+def encode_cursor(sort_by, order, key):
+  payload = json.dumps({'s': sort_by, 'o': order, 'k': list(key)}, separators=(',', ':'), ensure_ascii=False)
+  return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token, sort_by, order):
+  try:
+    padded = token + '=' * (-len(token) % 4)
+    payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    key = payload['k']
+  except (ValueError, KeyError, TypeError, binascii.Error):
+    raise InvalidCursor('Invalid cursor')
+  # A cursor is only meaningful for the ordering it was produced with
+  if payload.get('s') != sort_by or payload.get('o') != order or not isinstance(key, list):
+    raise InvalidCursor('Cursor does not match the requested sort order')
+  return key
+
+def cursor_requested(args):
+  # Cursor mode is opt-in: '?after=' (empty) asks for the first page
+  return 'after' in args
+
+def seek(args, sort_by, order, columns):
+  """Return (predicate, params) restricting rows to those after the cursor.
+
+  `columns` are the SQL expressions making up the sort key, the last one
+  being a unique tie breaker (normally the primary key).
+  """
+  token = args.get('after', '')
+  if not token:
+    return '1 = 1', ()
+  key = decode_cursor(token, sort_by, order)
+  if len(key) != len(columns):
+    raise InvalidCursor('Invalid cursor')
+  return seek_predicate(columns, order), tuple(key)
+
+def seek_predicate(columns, order):
+  """The row-value comparison seeking past a sort key, e.g. (w.jiantizi, w.id) > (?, ?)."""
+  comparison = '<' if order == 'desc' else '>'
+  placeholders = ', '.join('?' for _ in columns)
+  return f"({', '.join(columns)}) {comparison} ({placeholders})"
+
+def page(rows, limit, sort_by, order, key_of):
+  """Trim the look-ahead row and build the cursor for the next page.
+
+  Queries fetch `limit + 1` rows so we know whether another page exists
+  without running a COUNT(*).
+  """
+  if limit < 1:
+    # Nothing to page through (and no last row to build a cursor from)
+    return [], None, False
+  has_more = len(rows) > limit
+  rows = rows[:limit]
+  next_cursor = encode_cursor(sort_by, order, key_of(rows[-1])) if has_more else None
+  return rows, next_cursor, has_more
+
+def wants_total(args, default=True):
+  # '?with_total=false' skips the COUNT(*) query entirely
+  value = args.get('with_total')
+  if value is None:
+    return default
+  return value.lower() not in ('0', 'false', 'no', 'off')
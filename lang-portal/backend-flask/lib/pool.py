@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Pragmas applied to every pooled connection when it is opened.
+# WAL lets readers keep going while a writer holds the lock, and
+# synchronous=NORMAL is the recommended durability level for WAL.
+DEFAULT_PRAGMAS = {
+  'journal_mode': 'WAL',
+  'synchronous': 'NORMAL',
+  'cache_size': -16000,      # negative values are KiB, so roughly 16MB per connection
+  'mmap_size': 268435456,    # 256MB of the database file memory mapped
+  'busy_timeout': 5000,      # wait up to 5s for a lock instead of failing immediately
+  'temp_store': 'MEMORY',
+}
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_POOL_TIMEOUT = 10.0
+
+# Prepared statements kept per connection (sqlite3's default is 128). It
+# must hold the whole statement set in lib/queries.py, or the least
+# recently used statements are finalized and prepared again.
+DEFAULT_STATEMENT_CACHE = 256
+
+class PoolTimeout(sqlite3.OperationalError):
+  """Raised when no connection becomes available within the pool timeout."""
+
+class ConnectionPool:
+  def __init__(self, database, max_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_POOL_TIMEOUT, pragmas=None,
+               statement_cache_size=DEFAULT_STATEMENT_CACHE):
+    self.database = database
+    # Every connection to ':memory:' is a separate database, so keep exactly one
+    self.max_size = 1 if database == ':memory:' else max(1, max_size)
+    self.timeout = timeout
+    self.statement_cache_size = statement_cache_size
+    self.pragmas = dict(DEFAULT_PRAGMAS)
+    if pragmas:
+      self.pragmas.update(pragmas)
+
+    self._lock = threading.Condition()
+    self._idle = deque()
+    self._size = 0
+    self._closed = False
+    self._pid = os.getpid()
+    self._stats = {
+      'created': 0,
+      'acquired': 0,
+      'reused': 0,
+      'released': 0,
+      'discarded': 0,
+      'waits': 0,
+      'wait_time_ms': 0.0,
+      'timeouts': 0,
+    }
+
+  def _connect(self):
+    # Connections are handed from thread to thread between requests, but
+    # only ever used by one thread at a time while checked out.
+    conn = sqlite3.connect(self.database, check_same_thread=False,
+                           cached_statements=self.statement_cache_size)
+    conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+    for name, value in self.pragmas.items():
+      conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+  def connect(self):
+    """A new connection with the pool's settings that the pool does not manage."""
+    return self._connect()
+
+  def _check_fork(self):
+    # Connections must not be shared across a fork (e.g. gunicorn --preload),
+    # so a worker process starts with an empty pool of its own.
+    if self._pid != os.getpid():
+      self._idle.clear()
+      self._size = 0
+      self._pid = os.getpid()
+
+  def acquire(self):
+    with self._lock:
+      if self._closed:
+        raise sqlite3.ProgrammingError('Connection pool is closed')
+      self._check_fork()
+
+      if not self._idle and self._size >= self.max_size:
+        self._stats['waits'] += 1
+        started = time.perf_counter()
+        available = self._lock.wait_for(
+          lambda: self._idle or self._size < self.max_size or self._closed,
+          timeout=self.timeout
+        )
+        self._stats['wait_time_ms'] += (time.perf_counter() - started) * 1000
+        if not available:
+          self._stats['timeouts'] += 1
+          raise PoolTimeout(f'No database connection available after {self.timeout}s')
+        if self._closed:
+          raise sqlite3.ProgrammingError('Connection pool is closed')
+
+      self._stats['acquired'] += 1
+      if self._idle:
+        self._stats['reused'] += 1
+        # LIFO keeps the most recently used (warmest) connection in play
+        return self._idle.pop()
+      self._size += 1
+
+    try:
+      conn = self._connect()
+    except Exception:
+      with self._lock:
+        self._size -= 1
+        self._lock.notify()
+      raise
+    with self._lock:
+      self._stats['created'] += 1
+    return conn
+
+  def release(self, conn):
+    healthy = True
+    try:
+      # Never hand out a connection with a half finished transaction
+      if conn.in_transaction:
+        conn.rollback()
+    except sqlite3.Error:
+      healthy = False
+
+    with self._lock:
+      self._stats['released'] += 1
+      if self._closed or not healthy or self._pid != os.getpid():
+        self._stats['discarded'] += 1
+        self._size = max(0, self._size - 1)
+        self._lock.notify()
+        conn.close()
+        return
+      self._idle.append(conn)
+      self._lock.notify()
+
+  def close(self):
+    with self._lock:
+      self._closed = True
+      while self._idle:
+        self._idle.pop().close()
+        self._size -= 1
+      self._lock.notify_all()
+
+  def stats(self):
+    with self._lock:
+      stats = dict(self._stats)
+      stats.update({
+        'database': self.database,
+        'max_size': self.max_size,
+        'size': self._size,
+        'idle': len(self._idle),
+        'in_use': self._size - len(self._idle),
+        'journal_mode': self.pragmas.get('journal_mode'),
+        'statement_cache_size': self.statement_cache_size,
+      })
+      stats['wait_time_ms'] = round(stats['wait_time_ms'], 3)
+      return stats
@@ -0,0 +1,200 @@
+import threading
+from lib import pagination
+
+# Named statements for the listing and lookup routes.
+#
+# sqlite3 keeps a cache of prepared statements per connection, keyed by the
+# SQL text. Sort columns and directions come from small whitelists, so
+# every variant of a listing query is built once here, at import time, and
+# the routes only ever hand one of this fixed set of strings to sqlite3:
+# each statement is prepared once per pooled connection and reused after
+# that (see DEFAULT_STATEMENT_CACHE in lib/pool.py). Db.query runs them and
+# records per-statement execution counts and timings.
+
+ORDERS = ('asc', 'desc')
+
+class Statement:
+  __slots__ = ('name', 'sql')
+
+  def __init__(self, name, sql):
+    self.name = name
+    self.sql = sql
+
+  def __repr__(self):
+    return f'Statement({self.name!r})'
+
+# Every statement defined below, by name
+STATEMENTS = {}
+
+def statement(name, sql):
+  if name in STATEMENTS:
+    raise ValueError(f"Duplicate statement name '{name}'")
+  STATEMENTS[name] = Statement(name, sql)
+  return STATEMENTS[name]
+
+def to_dicts(description, rows):
+  """Map plain tuple rows to dicts, resolving the column names once."""
+  names = [column[0] for column in description]
+  return [dict(zip(names, row)) for row in rows]
+
+def where(conditions):
+  return 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+
+def listing(prefix, select, sort_columns, conditions=()):
+  """Build the offset and keyset variants of a listing for every sort and order.
+
+  `select` is formatted with the WHERE clause, the ORDER BY list and the LIMIT.
+  Offset pages order by the bare sort column the routes have always used;
+  keyset pages order by the sort expression and the tie breaker (the
+  `sort_columns` pair) and, past the first page, seek beyond the cursor.
+  """
+  pages, seeks = {}, {}
+  for sort_by, columns in sort_columns.items():
+    for order in ORDERS:
+      keyset_order = f'{columns[0]} {order}, {columns[1]} {order}'
+      pages[sort_by, order] = statement(
+        f'{prefix}.page.{sort_by}.{order}',
+        select.format(where=where(conditions), order=f'{sort_by} {order}', limit='LIMIT ? OFFSET ?')
+      )
+      seeks[sort_by, order, False] = statement(
+        f'{prefix}.first.{sort_by}.{order}',
+        select.format(where=where(conditions), order=keyset_order, limit='LIMIT ?')
+      )
+      seeks[sort_by, order, True] = statement(
+        f'{prefix}.after.{sort_by}.{order}',
+        select.format(where=where([*conditions, pagination.seek_predicate(columns, order)]),
+                      order=keyset_order, limit='LIMIT ?')
+      )
+  return pages, seeks
+
+# GET /words
+WORD_SORT_COLUMNS = {
+  'jiantizi': ['w.jiantizi', 'w.id'],
+  'pinyin': ['w.pinyin', 'w.id'],
+  'english': ['w.english', 'w.id'],
+  'correct_count': ['COALESCE(r.correct_count, 0)', 'w.id'],
+  'wrong_count': ['COALESCE(r.wrong_count, 0)', 'w.id']
+}
+
+WORD_PAGES, WORD_SEEKS = listing('words', '''
+  SELECT w.id, w.jiantizi, w.pinyin, w.english,
+         COALESCE(r.correct_count, 0) AS correct_count,
+         COALESCE(r.wrong_count, 0) AS wrong_count
+  FROM words w
+  LEFT JOIN word_reviews r ON w.id = r.word_id
+  {where}
+  ORDER BY {order}
+  {limit}
+''', WORD_SORT_COLUMNS)
+
+WORD_COUNT = statement('words.count', 'SELECT COUNT(*) AS count FROM words')
+
+WORD_EXISTS = statement('words.exists', 'SELECT 1 AS found FROM words WHERE id = ?')
+
+# Words with their review counters and groups, one row per id in the JSON
+# array bound to the statement, in the order given. Groups are aggregated
+# with json_group_array, so names may contain any character.
+WORD_DETAILS = statement('words.details', '''
+  SELECT w.id, w.jiantizi, w.pinyin, w.english,
+         COALESCE(r.correct_count, 0) AS correct_count,
+         COALESCE(r.wrong_count, 0) AS wrong_count,
+         (SELECT json_group_array(json_object('id', g.id, 'name', g.name))
+          FROM groups g
+          WHERE g.id IN (SELECT group_id FROM word_groups WHERE word_id = w.id)) AS groups
+  FROM json_each(?) ids
+  CROSS JOIN words w ON w.id = ids.value
+  LEFT JOIN word_reviews r ON w.id = r.word_id
+  ORDER BY ids.key
+''')
+
+# Daily review totals of a word since a day, from the rollups of compacted
+# review items (lib/compaction.py) and the review items still kept. The
+# word filter is repeated in both halves so each is an index range.
+WORD_HISTORY = statement('words.history', '''
+  SELECT day, SUM(correct) AS correct, SUM(wrong) AS wrong
+  FROM (
+    SELECT day, correct, wrong
+    FROM word_review_daily
+    WHERE word_id = ?1 AND day >= ?2
+    UNION ALL
+    SELECT date(wri.created_at), wri.correct = 1, wri.correct != 1
+    FROM word_review_items wri
+    JOIN study_sessions ss ON ss.id = wri.study_session_id
+    WHERE wri.word_id = ?1 AND wri.created_at >= ?2
+  )
+  GROUP BY day
+  ORDER BY day
+''')
+
+# GET /groups
+GROUP_SORT_COLUMNS = {
+  'name': ['name', 'id'],
+  'words_count': ['words_count', 'id']
+}
+
+GROUP_PAGES, GROUP_SEEKS = listing('groups', '''
+  SELECT id, name, words_count
+  FROM groups
+  {where}
+  ORDER BY {order}
+  {limit}
+''', GROUP_SORT_COLUMNS)
+
+GROUP_COUNT = statement('groups.count', 'SELECT COUNT(*) AS count FROM groups')
+
+GROUP_BY_ID = statement('groups.by_id', 'SELECT id, name, words_count FROM groups WHERE id = ?')
+
+# GET /groups/<id>/words
+GROUP_WORD_SORT_COLUMNS = {
+  'jiantizi': ['w.jiantizi', 'w.id'],
+  'pinyin': ['w.pinyin', 'w.id'],
+  'english': ['w.english', 'w.id'],
+  'correct_count': ['COALESCE(wr.correct_count, 0)', 'w.id'],
+  'wrong_count': ['COALESCE(wr.wrong_count, 0)', 'w.id']
+}
+
+GROUP_WORD_PAGES, GROUP_WORD_SEEKS = listing('group_words', '''
+  SELECT w.id, w.jiantizi, w.pinyin, w.english,
+         COALESCE(wr.correct_count, 0) AS correct_count,
+         COALESCE(wr.wrong_count, 0) AS wrong_count
+  FROM words w
+  JOIN word_groups wg ON w.id = wg.word_id
+  LEFT JOIN word_reviews wr ON w.id = wr.word_id
+  {where}
+  ORDER BY {order}
+  {limit}
+''', GROUP_WORD_SORT_COLUMNS, ['wg.group_id = ?'])
+
+GROUP_WORD_COUNT = statement('group_words.count', 'SELECT COUNT(*) AS count FROM word_groups WHERE group_id = ?')
+
+class StatementStats:
+  """Execution counts and timings per statement name."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._stats = {}
+
+  def record(self, name, seconds, rows):
+    with self._lock:
+      stats = self._stats.get(name)
+      if stats is None:
+        stats = self._stats[name] = {"calls": 0, "rows": 0, "total_ms": 0.0, "max_ms": 0.0}
+      milliseconds = seconds * 1000
+      stats["calls"] += 1
+      stats["rows"] += rows
+      stats["total_ms"] += milliseconds
+      stats["max_ms"] = max(stats["max_ms"], milliseconds)
+
+  def reset(self):
+    with self._lock:
+      self._stats.clear()
+
+  def snapshot(self):
+    """Per-statement stats, the most expensive (by total time) first."""
+    with self._lock:
+      stats = [{"name": name, **values} for name, values in self._stats.items()]
+    for entry in stats:
+      entry["mean_ms"] = round(entry["total_ms"] / entry["calls"], 3)
+      entry["total_ms"] = round(entry["total_ms"], 3)
+      entry["max_ms"] = round(entry["max_ms"], 3)
+    return sorted(stats, key=lambda entry: entry["total_ms"], reverse=True)
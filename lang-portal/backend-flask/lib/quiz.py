@@ -0,0 +1,122 @@
+import json
+
+# Multiple-choice quizzes over a group (GET /api/groups/<id>/quiz).
+#
+# The words to ask are sampled with index seeks instead of ORDER BY
+# RANDOM(), which would read and sort the whole group: random pivots
+# between the group's lowest and highest word id are each moved to the
+# next word id in the group on idx_word_groups_group_word. A word after a
+# gap in the ids is picked a little more often; imported decks have
+# near-contiguous ids. Small groups are read whole and sampled in Python.
+#
+# Distractors are a random pick among each word's best neighbours in the
+# distractor index (lib/distractors.py). Words that are not indexed yet,
+# or have too few neighbours, get random words of the group instead.
+
+DEFAULT_ITEMS = 20
+MAX_ITEMS = 100
+DEFAULT_CHOICES = 4
+MIN_CHOICES = 2
+MAX_CHOICES = 8
+
+# Groups up to this size are sampled from a full read of their word ids
+SMALL_GROUP = 256
+# Rounds of pivots before settling for fewer words
+SAMPLE_ROUNDS = 4
+
+def sample_group_words(cursor, group_id, size, n, rng):
+  """Return up to n distinct word ids of the group in random order."""
+  if size <= max(SMALL_GROUP, 2 * n):
+    cursor.execute('SELECT word_id FROM word_groups WHERE group_id = ?', (group_id,))
+    ids = list(dict.fromkeys(row[0] for row in cursor.fetchall()))
+    return rng.sample(ids, min(n, len(ids)))
+
+  cursor.execute('SELECT MIN(word_id), MAX(word_id) FROM word_groups WHERE group_id = ?', (group_id,))
+  low, high = cursor.fetchone()
+  chosen = {}
+  for _ in range(SAMPLE_ROUNDS):
+    pivots = [rng.randint(low, high) for _ in range(2 * (n - len(chosen)))]
+    cursor.execute('''
+      SELECT (
+        SELECT wg.word_id FROM word_groups wg
+        WHERE wg.group_id = ?1 AND wg.word_id >= p.value
+        ORDER BY wg.word_id
+        LIMIT 1
+      )
+      FROM json_each(?2) p
+    ''', (group_id, json.dumps(pivots)))
+    for row in cursor.fetchall():
+      chosen.setdefault(row[0])
+    if len(chosen) >= n:
+      break
+  return list(chosen)[:n]
+
+def word_rows(cursor, word_ids):
+  cursor.execute('''
+    SELECT w.id, w.jiantizi, w.pinyin, w.english
+    FROM json_each(?) ids CROSS JOIN words w ON w.id = ids.value
+  ''', (json.dumps(word_ids),))
+  return {row[0]: format_choice(row) for row in cursor.fetchall()}
+
+def format_choice(row):
+  return {"id": row[0], "jiantizi": row[1], "pinyin": row[2], "english": row[3]}
+
+def neighbours(cursor, word_ids):
+  """Map each word id to its indexed neighbours, best first."""
+  cursor.execute('''
+    SELECT n.word_id, w.id, w.jiantizi, w.pinyin, w.english
+    FROM json_each(?) ids
+    JOIN word_neighbours n ON n.word_id = ids.value
+    JOIN words w ON w.id = n.neighbour_id
+    ORDER BY n.word_id, n.score DESC, n.neighbour_id
+  ''', (json.dumps(word_ids),))
+  found = {}
+  for row in cursor.fetchall():
+    found.setdefault(row[0], []).append(format_choice(row[1:]))
+  return found
+
+def pick(candidates, count, taken, rng):
+  """Pick up to count candidates at random, one per jiantizi and per gloss."""
+  picked = []
+  for candidate in rng.sample(candidates, len(candidates)):
+    keys = (candidate["jiantizi"], candidate["english"].strip().lower())
+    if keys[0] in taken or keys[1] in taken:
+      continue
+    taken.update(keys)
+    picked.append(candidate)
+    if len(picked) == count:
+      break
+  return picked
+
+def build_quiz(cursor, group_id, size, n, choices, rng):
+  """Return n multiple-choice items (fewer for small groups) with up to `choices` choices each."""
+  word_ids = sample_group_words(cursor, group_id, size, n, rng)
+  words = word_rows(cursor, word_ids)
+  similar = neighbours(cursor, word_ids)
+  wanted = choices - 1
+
+  fillers = None
+  items = []
+  for word_id in word_ids:
+    word = words.get(word_id)
+    if word is None:
+      continue
+    taken = {word["jiantizi"], word["english"].strip().lower()}
+    # The most similar words, with some variety between quizzes
+    distractors = pick(similar.get(word_id, [])[:2 * wanted], wanted, taken, rng)
+    if len(distractors) < wanted:
+      if fillers is None:
+        fillers = list(word_rows(cursor, sample_group_words(cursor, group_id, size, n + 2 * choices, rng)).values())
+      distractors += pick(fillers, wanted - len(distractors), taken, rng)
+
+    options = distractors + [word]
+    rng.shuffle(options)
+    items.append({
+      "word_id": word_id,
+      "jiantizi": word["jiantizi"],
+      "pinyin": word["pinyin"],
+      "english": word["english"],
+      "choices": options,
+      "answer": options.index(word)
+    })
+  return items
@@ -0,0 +1,484 @@
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from lib import reviews
+
+try:
+  import fcntl
+except ImportError:  # Windows
+  fcntl = None
+  import msvcrt
+
+# Write-behind buffer for review items.
+#
+# Recording reviews synchronously costs one transaction, and so one fsync,
+# per request, and SQLite only has one writer at a time. With the buffer
+# the routes validate a request's items and queue them; a background
+# committer writes everything queued in one transaction every flush_ms
+# milliseconds or as soon as flush_items items are waiting. The mode
+# (REVIEW_WRITES) chooses when a request is answered:
+#
+#   sync   no buffer, every request commits its own transaction (default)
+#   group  group commit: the request waits until the transaction holding
+#          its items has committed, so a 201 still means the reviews are
+#          in the database, but many requests share one commit
+#   log    the items are appended to a log file and fsync'd, and the
+#          request is answered with a 202 before they reach the database.
+#          The log is replayed on startup, skipping entries at or below
+#          the checkpoint committed with each flush
+#
+# In log mode every process (e.g. each gunicorn worker) writes a log of its
+# own: it takes an exclusive lock on the first free slot, log_path for slot
+# 0 and log_path.<n> after that, and checkpoints it under id = slot + 1.
+# On start it also replays the logs no running process holds, left behind
+# by workers that died. A flush that keeps failing is retried
+# MAX_FLUSH_ATTEMPTS times; then its requests are written one by one and
+# those that still fail go to the slot's dead letter file (<log>.dead) so
+# they no longer hold up the queue.
+#
+# In group mode a request waits at most commit_timeout seconds for its
+# transaction and then fails with CommitTimeout (a 503); its items may
+# still be written afterwards.
+#
+# The queue is bounded to max_items. A request that does not fit waits up
+# to put_timeout seconds for the committer to catch up and then fails with
+# BufferFull, which the routes answer with 503 and a Retry-After header.
+
+logger = logging.getLogger(__name__)
+
+WRITE_MODES = ('sync', 'group', 'log')
+
+DEFAULT_FLUSH_MS = 20
+DEFAULT_FLUSH_ITEMS = 500
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_QUEUE_TIMEOUT = 1.0
+
+DEFAULT_COMMIT_TIMEOUT = 30.0
+
+# Pause before retrying a failed flush in log mode
+RETRY_DELAY = 1.0
+# Failed flushes of the same items before they are written one request at a time
+MAX_FLUSH_ATTEMPTS = 5
+# Review logs (one per process) a database can have
+MAX_LOG_SLOTS = 64
+
+class BufferFull(Exception):
+  """Raised when review items do not fit in the queue within the put timeout."""
+
+class CommitTimeout(BufferFull):
+  """Raised in group mode when the transaction holding a request's items does not commit in time."""
+
+class PendingReviews:
+  __slots__ = ('session_id', 'rows', 'reviewed_at', 'seq', 'queued_at', 'done', 'error')
+
+  def __init__(self, session_id, rows, reviewed_at, seq=None):
+    self.session_id = session_id
+    self.rows = rows
+    self.reviewed_at = reviewed_at
+    self.seq = seq
+    self.queued_at = time.monotonic()
+    self.done = threading.Event()
+    self.error = None
+
+def read_log(path):
+  """Entries of a review log, stopping at a line torn by a crash."""
+  entries = []
+  if not os.path.exists(path):
+    return entries
+  with open(path, 'rb') as file:
+    for line in file:
+      try:
+        entries.append(json.loads(line))
+      except ValueError:
+        # Written but never fsync'd, so its request was never answered
+        break
+  return entries
+
+def slot_path(log_path, slot):
+  return log_path if slot == 0 else f'{log_path}.{slot}'
+
+def log_slots(log_path):
+  """Slots of the review logs that exist for log_path."""
+  slots = {0} if os.path.exists(log_path) else set()
+  for path in glob.glob(glob.escape(log_path) + '.*'):
+    match = re.fullmatch(r'\.(\d+)', path[len(log_path):])
+    if match:
+      slots.add(int(match.group(1)))
+  return slots
+
+def try_lock(file):
+  """Take an exclusive lock on an open log without waiting; held until it is closed."""
+  try:
+    if fcntl is not None:
+      fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+      file.seek(0)
+      msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+  except OSError:
+    return False
+  return True
+
+def read_checkpoint(conn, slot=0):
+  try:
+    row = conn.execute('SELECT seq FROM review_log_checkpoint WHERE id = ?', (slot + 1,)).fetchone()
+  except Exception:
+    # The schema may not be set up yet
+    return 0
+  return row[0] if row else 0
+
+def write_batches(conn, batches, seq=None, slot=0):
+  """Write queued reviews, and the log checkpoint, in one transaction."""
+  try:
+    cursor = conn.cursor()
+    for batch in batches:
+      reviews.write_reviews(cursor, batch.session_id, batch.rows, batch.reviewed_at)
+    if seq is not None:
+      cursor.execute('''
+        INSERT INTO review_log_checkpoint (id, seq) VALUES (?, ?)
+        ON CONFLICT(id) DO UPDATE SET seq = excluded.seq
+      ''', (slot + 1, seq))
+    conn.commit()
+  except Exception:
+    conn.rollback()
+    raise
+
+class ReviewBuffer:
+  def __init__(self, connect, mode='group', flush_ms=DEFAULT_FLUSH_MS, flush_items=DEFAULT_FLUSH_ITEMS,
+               max_items=DEFAULT_QUEUE_SIZE, put_timeout=DEFAULT_QUEUE_TIMEOUT, log_path=None, on_flush=None,
+               commit_timeout=DEFAULT_COMMIT_TIMEOUT):
+    if mode not in ('group', 'log'):
+      raise ValueError(f"Unknown review buffer mode '{mode}'")
+    if mode == 'log' and not log_path:
+      raise ValueError('The log mode needs a log_path')
+    self.connect = connect
+    self.mode = mode
+    self.flush_ms = flush_ms
+    self.flush_items = max(1, flush_items)
+    self.max_items = max(1, max_items)
+    self.put_timeout = put_timeout
+    self.commit_timeout = commit_timeout
+    # log_path names the logs; this process's own one is set by start()
+    self.log_base = log_path if mode == 'log' else None
+    self.log_path = None
+    self.slot = None
+    # Called after every flush, e.g. to invalidate cached responses
+    self.on_flush = on_flush
+
+    self._cond = threading.Condition()
+    self._queue = deque()
+    self._queued_items = 0
+    # Items queued or being written, bounded by max_items
+    self._pending_items = 0
+    self._submitted = 0
+    self._completed = 0
+    self._flush_requested = False
+    self._closing = False
+    self._flush_on_close = True
+    self._thread = None
+    self._conn = None
+    self._log = None
+    self._log_lock = threading.Lock()
+    self._seq = 0
+    self._failed_attempts = 0
+    self._stats = {
+      'flushes': 0,
+      'batches_written': 0,
+      'items_written': 0,
+      'largest_flush': 0,
+      'flush_time_ms': 0.0,
+      'last_flush_ms': 0.0,
+      'rejected': 0,
+      'errors': 0,
+      'replayed': 0,
+      'dead_lettered': 0,
+    }
+
+  @property
+  def deferred(self):
+    """True when requests are answered before their reviews are committed."""
+    return self.mode == 'log'
+
+  def start(self):
+    self._conn = self.connect()
+    if self.mode == 'log':
+      self._claim_log()
+    self._thread = threading.Thread(target=self._run, name='review-buffer', daemon=True)
+    self._thread.start()
+    return self
+
+  def _claim_log(self):
+    """Lock a log of our own and replay every log no running process holds."""
+    existing = log_slots(self.log_base)
+    for slot in sorted(existing | set(range(MAX_LOG_SLOTS))):
+      if self._log is not None and slot not in existing:
+        continue
+      file = open(slot_path(self.log_base, slot), 'ab')
+      if not try_lock(file):
+        file.close()
+        continue
+      seq = self._replay(slot, file)
+      if self._log is None:
+        self._log, self.slot, self.log_path, self._seq = file, slot, slot_path(self.log_base, slot), seq
+      else:
+        # Left behind by a process that died; replayed, so let it go
+        file.close()
+    if self._log is None:
+      raise RuntimeError(f'All {MAX_LOG_SLOTS} review log slots of {self.log_base} are in use')
+
+  def _replay(self, slot, file):
+    """Write the entries of a slot's log past its checkpoint; returns the last seq."""
+    path = slot_path(self.log_base, slot)
+    checkpoint = read_checkpoint(self._conn, slot)
+    entries = read_log(path)
+    pending = [PendingReviews(entry['session_id'], entry['rows'], entry['reviewed_at'], entry['seq'])
+               for entry in entries if entry['seq'] > checkpoint]
+    seq = max([checkpoint] + [entry['seq'] for entry in entries])
+    if pending:
+      write_batches(self._conn, pending, seq, slot)
+      replayed = sum(len(batch.rows) for batch in pending)
+      self._stats['replayed'] += replayed
+      logger.warning("Replayed %d review items from %s", replayed, path)
+    # Everything in the log is in the database now
+    if entries:
+      file.truncate(0)
+    return seq
+
+  def submit(self, session_id, rows, reviewed_at):
+    """Queue (word_id, correct) rows for a session.
+
+    In group mode this returns once they are committed and raises the
+    committer's error if the transaction failed; in log mode it returns
+    once they are in the log.
+    """
+    if self._thread is None or self._closing:
+      raise RuntimeError('The review buffer is not running')
+    self._reserve(len(rows))
+    batch = PendingReviews(session_id, [list(row) for row in rows], reviewed_at)
+    try:
+      if self.mode == 'log':
+        # Log order is queue order, so a checkpoint covers every earlier entry
+        with self._log_lock:
+          batch.seq = self._seq + 1
+          line = json.dumps({"seq": batch.seq, "session_id": session_id,
+                             "reviewed_at": reviewed_at, "rows": batch.rows}, separators=(',', ':'))
+          self._log.write(line.encode('utf-8') + b'\n')
+          self._log.flush()
+          os.fsync(self._log.fileno())
+          self._seq = batch.seq
+          self._enqueue(batch)
+      else:
+        self._enqueue(batch)
+    except Exception:
+      self._release(len(rows))
+      raise
+
+    if self.mode == 'group':
+      if not batch.done.wait(self.commit_timeout):
+        raise CommitTimeout(f'Reviews were not committed within {self.commit_timeout:g}s')
+      if batch.error is not None:
+        raise batch.error
+    return batch
+
+  def _reserve(self, count):
+    with self._cond:
+      # A request larger than the whole queue still goes through on its own
+      fits = lambda: self._pending_items == 0 or self._pending_items + count <= self.max_items  # noqa: E731
+      if not self._cond.wait_for(fits, timeout=self.put_timeout):
+        self._stats['rejected'] += 1
+        raise BufferFull(f'Review queue is full ({self._pending_items} items pending)')
+      self._pending_items += count
+
+  def _release(self, count):
+    with self._cond:
+      self._pending_items -= count
+      self._cond.notify_all()
+
+  def _enqueue(self, batch):
+    with self._cond:
+      self._queue.append(batch)
+      self._queued_items += len(batch.rows)
+      self._submitted += 1
+      # The committer sleeps until the first item arrives or enough are waiting
+      if len(self._queue) == 1 or self._queued_items >= self.flush_items:
+        self._cond.notify_all()
+
+  def _ready(self):
+    if not self._queue:
+      return False
+    if self._flush_requested or self._closing or self._queued_items >= self.flush_items:
+      return True
+    return (time.monotonic() - self._queue[0].queued_at) * 1000 >= self.flush_ms
+
+  def _wait_time(self):
+    if not self._queue:
+      return None
+    return max(0.0, self.flush_ms / 1000 - (time.monotonic() - self._queue[0].queued_at))
+
+  def _run(self):
+    abandoned = []
+    while True:
+      with self._cond:
+        while not self._ready() and not (self._closing and not self._queue):
+          self._cond.wait(timeout=self._wait_time())
+        if self._closing and (not self._queue or not self._flush_on_close):
+          abandoned = list(self._queue) if self.mode == 'group' else []
+          break
+        batches = list(self._queue)
+        self._queue.clear()
+        self._queued_items = 0
+
+      count = len(batches)
+      items = sum(len(batch.rows) for batch in batches)
+      seq = batches[-1].seq if self.mode == 'log' else None
+      started = time.perf_counter()
+      try:
+        if self._failed_attempts >= MAX_FLUSH_ATTEMPTS:
+          self._write_separately(batches)
+        else:
+          write_batches(self._conn, batches, seq, self.slot)
+        self._failed_attempts = 0
+      except Exception as e:
+        logger.exception("Writing %d queued review items failed", items)
+        with self._cond:
+          self._stats['errors'] += 1
+          if self.mode == 'log':
+            self._failed_attempts += 1
+            # The items were acknowledged, so keep them and try again;
+            # requests written one by one before the failure are done
+            requeued = sum(len(batch.rows) for batch in batches)
+            self._queue.extendleft(reversed(batches))
+            self._queued_items += requeued
+            self._pending_items -= items - requeued
+            self._completed += count - len(batches)
+            self._cond.notify_all()
+          else:
+            self._pending_items -= items
+            self._completed += len(batches)
+            self._cond.notify_all()
+        if self.mode == 'log':
+          if self._closing:
+            break
+          time.sleep(RETRY_DELAY)
+        else:
+          for batch in batches:
+            batch.error = e
+            batch.done.set()
+        continue
+
+      milliseconds = (time.perf_counter() - started) * 1000
+      if seq is not None:
+        self._truncate_log(seq)
+      if self.on_flush is not None:
+        self.on_flush()
+      with self._cond:
+        self._pending_items -= items
+        self._completed += len(batches)
+        if not self._queue:
+          self._flush_requested = False
+        self._stats['flushes'] += 1
+        self._stats['batches_written'] += len(batches)
+        self._stats['items_written'] += items
+        self._stats['largest_flush'] = max(self._stats['largest_flush'], items)
+        self._stats['flush_time_ms'] += milliseconds
+        self._stats['last_flush_ms'] = milliseconds
+        self._cond.notify_all()
+      for batch in batches:
+        batch.done.set()
+
+    for batch in abandoned:
+      batch.error = RuntimeError('The review buffer was closed before the reviews were written')
+      batch.done.set()
+
+  def _write_separately(self, batches):
+    """Write one request at a time, dead-lettering those that cannot be written.
+
+    Each request commits with its own checkpoint. If the checkpoint cannot
+    be written either, the database is the problem rather than the items:
+    the error is raised and everything left is retried later.
+    """
+    for index, batch in enumerate(batches):
+      try:
+        write_batches(self._conn, [batch], batch.seq, self.slot)
+        continue
+      except Exception:
+        logger.exception("Review log entry %d cannot be written, dead-lettering it", batch.seq)
+      try:
+        write_batches(self._conn, [], batch.seq, self.slot)
+      except Exception:
+        # Drop what was written from the list the caller requeues
+        del batches[:index]
+        raise
+      line = json.dumps({"seq": batch.seq, "session_id": batch.session_id,
+                         "reviewed_at": batch.reviewed_at, "rows": batch.rows}, separators=(',', ':'))
+      with open(self.log_path + '.dead', 'ab') as dead:
+        dead.write(line.encode('utf-8') + b'\n')
+        dead.flush()
+        os.fsync(dead.fileno())
+      with self._cond:
+        self._stats['dead_lettered'] += len(batch.rows)
+
+  def _truncate_log(self, seq):
+    # Once everything logged is committed the log can start over; the
+    # checkpoint keeps a crash between the commit and this from replaying
+    with self._log_lock:
+      if self._seq == seq:
+        self._log.truncate(0)
+
+  def flush(self, timeout=None):
+    """Write everything queued so far; returns False if it did not finish in time."""
+    with self._cond:
+      target = self._submitted
+      self._flush_requested = True
+      self._cond.notify_all()
+      return self._cond.wait_for(
+        lambda: self._completed >= target or self._thread is None or not self._thread.is_alive(),
+        timeout=timeout
+      )
+
+  def close(self, flush=True):
+    """Stop the committer, by default after writing everything queued.
+
+    Items left in the queue by close(flush=False) are still in the log in
+    log mode and are replayed by the next start().
+    """
+    if self._thread is None:
+      return
+    with self._cond:
+      self._closing = True
+      self._flush_on_close = flush
+      self._cond.notify_all()
+    self._thread.join()
+    self._thread = None
+    if self._log is not None:
+      self._log.close()
+      self._log = None
+    self._conn.close()
+    # Wake requests still waiting for room in the queue
+    with self._cond:
+      self._cond.notify_all()
+
+  def stats(self):
+    with self._cond:
+      stats = dict(self._stats)
+      stats.update({
+        'mode': self.mode,
+        'running': self._thread is not None and self._thread.is_alive(),
+        'queued_items': self._queued_items,
+        'pending_items': self._pending_items,
+        'max_items': self.max_items,
+        'flush_ms': self.flush_ms,
+        'flush_items': self.flush_items,
+        'log_path': self.log_path,
+        'log_slot': self.slot,
+      })
+    stats['flush_time_ms'] = round(stats['flush_time_ms'], 3)
+    stats['last_flush_ms'] = round(stats['last_flush_ms'], 3)
+    stats['mean_flush_items'] = round(stats['items_written'] / stats['flushes'], 1) if stats['flushes'] else 0
+    if self.log_path and os.path.exists(self.log_path):
+      stats['log_bytes'] = os.path.getsize(self.log_path)
+    return stats
@@ -0,0 +1,130 @@
+import json
+from lib import scheduler
+
+# Review recording shared by the single and the batch review endpoints.
+#
+# Every valid item becomes a word_review_items row and bumps the per-word
+# counters in word_reviews. A batch is written with executemany inside one
+# transaction, so a whole flashcard round costs a single commit. The same
+# transaction moves each reviewed word along its spaced-repetition schedule.
+# With REVIEW_WRITES set to 'group' or 'log' the writes go through the
+# write-behind buffer in lib/review_buffer.py instead.
+
+class InvalidReviewBatch(ValueError):
+  """Raised when a request body cannot be read as a list of review items."""
+
+def parse_items(request):
+  """Read review items from a JSON array, {"items": [...]} or NDJSON body."""
+  if request.mimetype in ('application/x-ndjson', 'application/jsonlines', 'application/json-seq'):
+    items = []
+    for number, line in enumerate(request.stream, start=1):
+      line = line.strip().lstrip(b'\x1e')
+      if not line:
+        continue
+      try:
+        items.append(json.loads(line))
+      except ValueError:
+        raise InvalidReviewBatch(f"Line {number} is not valid JSON")
+    return items
+
+  data = request.get_json(silent=True)
+  if isinstance(data, dict) and 'items' in data:
+    data = data['items']
+  if not isinstance(data, list):
+    raise InvalidReviewBatch("Expected a JSON array of review items, an object with 'items' or NDJSON")
+  return data
+
+def validate_item(item):
+  """Return (word_id, correct) for a review item, or raise ValueError."""
+  if not isinstance(item, dict) or not all(key in item for key in ('word_id', 'correct')):
+    raise ValueError("Missing required fields")
+  word_id, correct = item['word_id'], item['correct']
+  if isinstance(word_id, bool) or not isinstance(word_id, int):
+    raise ValueError("word_id must be an integer")
+  if correct not in (True, False, 0, 1):
+    raise ValueError("correct must be a boolean")
+  return word_id, bool(correct)
+
+def session_exists(cursor, session_id):
+  cursor.execute('SELECT 1 FROM study_sessions WHERE id = ?', (session_id,))
+  return cursor.fetchone() is not None
+
+def check_items(cursor, items):
+  """Validate review items and look up their words.
+
+  Returns the per-item results, each {"index", "word_id", "status"} with
+  status "recorded" or "rejected" (with an "error"), and the
+  (word_id, correct) rows to write.
+  """
+  results = []
+  valid = []
+  for index, item in enumerate(items):
+    try:
+      word_id, correct = validate_item(item)
+    except ValueError as e:
+      results.append({"index": index, "word_id": item.get('word_id') if isinstance(item, dict) else None,
+                      "status": "rejected", "error": str(e)})
+      continue
+    results.append({"index": index, "word_id": word_id, "status": "recorded"})
+    valid.append((index, word_id, correct))
+
+  known = set()
+  word_ids = list({word_id for _, word_id, _ in valid})
+  # Stay well below SQLite's bound parameter limit
+  for start in range(0, len(word_ids), 500):
+    chunk = word_ids[start:start + 500]
+    cursor.execute(f"SELECT id FROM words WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+    known.update(row['id'] for row in cursor.fetchall())
+
+  rows = []
+  for index, word_id, correct in valid:
+    if word_id not in known:
+      results[index].update(status="rejected", error="Word not found")
+      continue
+    rows.append((word_id, correct))
+  return results, rows
+
+def write_reviews(cursor, session_id, rows, reviewed_at):
+  """Insert (word_id, correct) rows for a session inside the caller's transaction."""
+  counters = {}
+  for word_id, correct in rows:
+    correct_count, wrong_count = counters.get(word_id, (0, 0))
+    counters[word_id] = (correct_count + correct, wrong_count + (not correct))
+
+  cursor.executemany('''
+    INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
+    VALUES (?, ?, ?, ?)
+  ''', [(word_id, session_id, correct, reviewed_at) for word_id, correct in rows])
+  cursor.executemany('''
+    INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(word_id) DO UPDATE SET
+      correct_count = correct_count + excluded.correct_count,
+      wrong_count = wrong_count + excluded.wrong_count,
+      last_reviewed = excluded.last_reviewed
+  ''', [(word_id, c, w) for word_id, (c, w) in counters.items()])
+  scheduler.schedule_reviews(cursor, rows, reviewed_at)
+
+def record_reviews(db, session_id, items, buffer=None):
+  """Record review items for a session in one transaction.
+
+  With a ReviewBuffer (lib/review_buffer.py) the rows are handed to its
+  committer instead, which writes them together with other sessions'
+  reviews. Returns the per-item results of check_items.
+  """
+  results, rows = check_items(db.cursor(), items)
+  if not rows:
+    return results
+
+  reviewed_at = scheduler.now()
+  if buffer is not None:
+    buffer.submit(int(session_id), rows, reviewed_at)
+    return results
+
+  try:
+    write_reviews(db.cursor(), session_id, rows, reviewed_at)
+    db.commit()
+  except Exception:
+    db.get().rollback()
+    raise
+  return results
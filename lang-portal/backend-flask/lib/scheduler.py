@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta, timezone
+
+# Spaced-repetition scheduling (SM-2).
+#
+# Each reviewed word has a row in word_schedules with its ease factor,
+# interval, repetition count and the time it is next due; the due_at index
+# lets a study session ask for the next words to review without loading
+# the whole group. Reviews are binary (correct / wrong), so they are graded
+# as SM-2 quality 4 and 1. A wrong answer resets the repetitions and brings
+# the word back after a short relearning step instead of a full day.
+
+INITIAL_EASE = 2.5
+MINIMUM_EASE = 1.3
+CORRECT_QUALITY = 4
+WRONG_QUALITY = 1
+RELEARN_STEP = timedelta(minutes=10)
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def now():
+  """The current UTC time in SQLite's datetime('now') format."""
+  return datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+def new_schedule(word_id):
+  return {"word_id": word_id, "ease": INITIAL_EASE, "interval_days": 0.0,
+          "repetitions": 0, "lapses": 0, "due_at": None, "last_reviewed_at": None}
+
+def review(schedule, correct, reviewed_at):
+  """Return the schedule after one review at reviewed_at (a timestamp string)."""
+  quality = CORRECT_QUALITY if correct else WRONG_QUALITY
+  schedule = dict(schedule)
+  reviewed = datetime.strptime(reviewed_at, TIMESTAMP_FORMAT)
+
+  if quality >= 3:
+    if schedule["repetitions"] == 0:
+      interval = 1.0
+    elif schedule["repetitions"] == 1:
+      interval = 6.0
+    else:
+      interval = round(schedule["interval_days"] * schedule["ease"], 2)
+    schedule["repetitions"] += 1
+    schedule["interval_days"] = interval
+    due = reviewed + timedelta(days=interval)
+  else:
+    schedule["repetitions"] = 0
+    schedule["lapses"] += 1
+    schedule["interval_days"] = 0.0
+    due = reviewed + RELEARN_STEP
+
+  penalty = 5 - quality
+  schedule["ease"] = round(max(MINIMUM_EASE, schedule["ease"] + 0.1 - penalty * (0.08 + penalty * 0.02)), 4)
+  schedule["due_at"] = due.strftime(TIMESTAMP_FORMAT)
+  schedule["last_reviewed_at"] = reviewed_at
+  return schedule
+
+def load_schedules(cursor, word_ids, chunk_size=500):
+  """Map word_id to its stored schedule for the given words."""
+  schedules = {}
+  word_ids = list(word_ids)
+  for start in range(0, len(word_ids), chunk_size):
+    chunk = word_ids[start:start + chunk_size]
+    cursor.execute(f'''
+      SELECT word_id, ease, interval_days, repetitions, lapses, due_at, last_reviewed_at
+      FROM word_schedules
+      WHERE word_id IN ({','.join('?' * len(chunk))})
+    ''', chunk)
+    schedules.update((row["word_id"], dict(row)) for row in cursor.fetchall())
+  return schedules
+
+def schedule_reviews(cursor, reviews, reviewed_at=None):
+  """Apply (word_id, correct) reviews in order and store the new schedules.
+
+  Runs inside the caller's transaction.
+  """
+  reviewed_at = reviewed_at or now()
+  schedules = load_schedules(cursor, {word_id for word_id, _ in reviews})
+  for word_id, correct in reviews:
+    schedules[word_id] = review(schedules.get(word_id) or new_schedule(word_id), correct, reviewed_at)
+
+  cursor.executemany('''
+    INSERT INTO word_schedules (word_id, ease, interval_days, repetitions, lapses, due_at, last_reviewed_at)
+    VALUES (:word_id, :ease, :interval_days, :repetitions, :lapses, :due_at, :last_reviewed_at)
+    ON CONFLICT(word_id) DO UPDATE SET
+      ease = excluded.ease,
+      interval_days = excluded.interval_days,
+      repetitions = excluded.repetitions,
+      lapses = excluded.lapses,
+      due_at = excluded.due_at,
+      last_reviewed_at = excluded.last_reviewed_at
+  ''', list(schedules.values()))
+  return schedules
@@ -0,0 +1,117 @@
+import re
+
+# Word search over the FTS5 indexes in sql/setup/create_word_search.sql.
+#
+# Hanzi queries go to jiantizi: exact and prefix lookups use the words
+# index, substring lookups use the trigram index for three or more
+# characters and the word_characters table for one or two (trigrams cannot
+# match shorter strings). Latin queries go to words_fts, where tone marks
+# are stripped and English is stemmed; tone numbers ("xue2") and "v" for
+# "ü" are normalized here so all pinyin spellings meet the same tokens.
+# Pinyin is stored one syllable per token, so "xue xi" matches 学习 and
+# "xuexi" does not.
+
+FIELDS = ('auto', 'jiantizi', 'pinyin', 'english')
+MATCHES = ('prefix', 'contains', 'exact')
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+CJK = re.compile(r'[㐀-䶿一-鿿豈-﫿\U00020000-\U0002ffff]')
+TONE_NUMBER = re.compile(r'(?<=[^\W\d_])[1-5](?=\W|$)')
+
+SELECT_WORDS = '''
+  SELECT w.id, w.jiantizi, w.pinyin, w.english,
+         COALESCE(r.correct_count, 0) AS correct_count,
+         COALESCE(r.wrong_count, 0) AS wrong_count
+  FROM words w
+  LEFT JOIN word_reviews r ON w.id = r.word_id
+'''
+
+class InvalidSearch(ValueError):
+  """Raised for search parameters that cannot be turned into a query."""
+
+def is_hanzi(text):
+  return CJK.search(text) is not None
+
+def resolve_field(query, field):
+  if field not in FIELDS:
+    raise InvalidSearch(f"field must be one of {', '.join(FIELDS)}")
+  if field == 'auto':
+    return 'jiantizi' if is_hanzi(query) else 'latin'
+  return field
+
+def latin_tokens(query, field):
+  """Split a pinyin / English query into the tokens words_fts indexes."""
+  text = query.lower()
+  if field in ('latin', 'pinyin'):
+    text = TONE_NUMBER.sub('', text)
+  if field == 'pinyin':
+    text = text.replace('v', 'ü')
+  return re.findall(r'\w+', text)
+
+def column_query(column, tokens, match):
+  """Build the words_fts MATCH expression for one column."""
+  phrase = '"' + ' '.join(tokens) + '"'
+  if match == 'exact':
+    return f'{{{column}}}: {phrase}'
+  if match == 'prefix':
+    # Pinyin is anchored to the start of the reading; English glosses mostly
+    # start with "to" or "a", so there a prefix may start at any term
+    anchor = '^' if column == 'pinyin' else ''
+    return f'{{{column}}}: {anchor}{phrase}*'
+  return f'{{{column}}}: (' + ' '.join(f'"{token}"*' for token in tokens) + ')'
+
+def fts_query(query, field, match):
+  """Build a words_fts MATCH expression; tokens are \\w+ so quoting is safe.
+
+  Latin queries in auto mode search both columns, each with its own
+  tokens: "v" stands for "ü" in pinyin but not in English ("nv" finds
+  女 nǚ, "love" still finds "to love").
+  """
+  if field != 'latin':
+    tokens = latin_tokens(query, field)
+    return column_query(field, tokens, match) if tokens else None
+  pinyin, english = latin_tokens(query, 'pinyin'), latin_tokens(query, 'latin')
+  if not english:
+    return None
+  return column_query('pinyin', pinyin, match) + ' OR ' + column_query('english', english, match)
+
+def build(query, field='auto', match='prefix', limit=DEFAULT_LIMIT):
+  """Return (sql, params) selecting the words that match the query."""
+  query = (query or '').strip()
+  if not query:
+    raise InvalidSearch("q is required")
+  if match not in MATCHES:
+    raise InvalidSearch(f"match must be one of {', '.join(MATCHES)}")
+  field = resolve_field(query, field)
+
+  if field == 'jiantizi':
+    if match == 'exact':
+      return SELECT_WORDS + 'WHERE w.jiantizi = ? ORDER BY w.id LIMIT ?', (query, limit)
+    if match == 'prefix':
+      # A range on idx_words_jiantizi; U+10FFFF sorts after every character
+      return (SELECT_WORDS + 'WHERE w.jiantizi >= ? AND w.jiantizi < ? ORDER BY w.jiantizi, w.id LIMIT ?',
+              (query, query + '\U0010ffff', limit))
+    if len(query) >= 3:
+      return (SELECT_WORDS + '''
+        JOIN words_fts_cjk f ON f.rowid = w.id
+        WHERE words_fts_cjk MATCH ?
+        ORDER BY f.rank, w.id
+        LIMIT ?
+      ''', ('"' + query.replace('"', '""') + '"', limit))
+    return (SELECT_WORDS + '''
+      JOIN word_characters c ON c.word_id = w.id
+      WHERE c.character = ? AND instr(w.jiantizi, ?) > 0
+      ORDER BY length(w.jiantizi), w.id
+      LIMIT ?
+    ''', (query[0], query, limit))
+
+  expression = fts_query(query, field, match)
+  if expression is None:
+    raise InvalidSearch("q has no searchable terms")
+  return (SELECT_WORDS + '''
+    JOIN words_fts f ON f.rowid = w.id
+    WHERE words_fts MATCH ?
+    ORDER BY f.rank, w.id
+    LIMIT ?
+  ''', (expression, limit))
@@ -0,0 +1,179 @@
+# Dashboard statistics.
+#
+# The numbers behind /dashboard/stats are materialized in study_stats,
+# word_review_stats, study_days and group_activity, and maintained by the
+# triggers in sql/setup/create_dashboard_stats.sql whenever words, study
+# sessions or review items change. Reading them is a handful of primary key
+# and index lookups instead of aggregates over every review item.
+#
+# Review totals are recounted from the word_review_days view, which adds the
+# daily rollups of compacted review items (lib/compaction.py) to the review
+# items still in word_review_items.
+
+REBUILD_SQL = '''
+  DELETE FROM word_review_stats;
+  INSERT INTO word_review_stats (word_id, attempts, correct, mastered)
+  SELECT
+    word_id,
+    SUM(correct + wrong),
+    SUM(correct),
+    SUM(correct + wrong) >= 5 AND SUM(correct) * 1.0 / SUM(correct + wrong) >= 0.8
+  FROM word_review_days
+  GROUP BY word_id;
+
+  DELETE FROM study_days;
+  INSERT INTO study_days (day, sessions)
+  SELECT date(created_at), COUNT(*)
+  FROM study_sessions
+  GROUP BY date(created_at);
+
+  DELETE FROM group_activity;
+  INSERT INTO group_activity (group_id, last_session_at)
+  SELECT group_id, MAX(created_at)
+  FROM study_sessions
+  GROUP BY group_id;
+
+  INSERT OR IGNORE INTO study_stats (id) VALUES (1);
+  UPDATE study_stats SET
+    total_vocabulary = (SELECT COUNT(*) FROM words),
+    total_sessions = (SELECT COUNT(*) FROM study_sessions),
+    total_reviews = (SELECT COALESCE(SUM(attempts), 0) FROM word_review_stats),
+    correct_reviews = (SELECT COALESCE(SUM(correct), 0) FROM word_review_stats),
+    words_studied = (SELECT COUNT(*) FROM word_review_stats),
+    mastered_words = (SELECT COUNT(*) FROM word_review_stats WHERE mastered),
+    study_days = (SELECT COUNT(*) FROM study_days),
+    consecutive_days = (
+      SELECT COUNT(*)
+      FROM study_days d
+      WHERE EXISTS (SELECT 1 FROM study_days p WHERE p.day = date(d.day, '-1 day'))
+    )
+  WHERE id = 1;
+'''
+
+def read_stats(cursor):
+  """Read the dashboard statistics from the materialized tables."""
+  cursor.execute('SELECT * FROM study_stats WHERE id = 1')
+  row = cursor.fetchone()
+
+  # Activity in the last 30 days depends on the current date, so it is
+  # counted from the small per-group table through its index
+  cursor.execute('''
+    SELECT COUNT(*) as active_groups
+    FROM group_activity
+    WHERE last_session_at >= date('now', '-30 days')
+  ''')
+  active_groups = cursor.fetchone()["active_groups"]
+
+  return {
+    "total_vocabulary": row["total_vocabulary"],
+    "total_words_studied": row["words_studied"],
+    "mastered_words": row["mastered_words"],
+    "success_rate": row["correct_reviews"] * 1.0 / row["total_reviews"] if row["total_reviews"] else 0,
+    "total_sessions": row["total_sessions"],
+    "active_groups": active_groups,
+    # The first study day plus every day that continues the previous one
+    "current_streak": row["consecutive_days"] + (1 if row["study_days"] else 0)
+  }
+
+def compute_stats(cursor):
+  """Compute the dashboard statistics from scratch over the base tables."""
+  # Get total vocabulary count
+  cursor.execute('SELECT COUNT(*) as total_vocabulary FROM words')
+  total_vocabulary = cursor.fetchone()["total_vocabulary"]
+
+  # Get total unique words studied
+  cursor.execute('''
+    SELECT COUNT(DISTINCT word_id) as total_words
+    FROM word_review_days
+  ''')
+  total_words = cursor.fetchone()["total_words"]
+
+  # Get mastered words (words with >80% success rate and at least 5 attempts)
+  cursor.execute('''
+    WITH word_stats AS (
+      SELECT
+        word_id,
+        SUM(correct + wrong) as total_attempts,
+        SUM(correct) * 1.0 / SUM(correct + wrong) as success_rate
+      FROM word_review_days
+      GROUP BY word_id
+      HAVING total_attempts >= 5
+    )
+    SELECT COUNT(*) as mastered_words
+    FROM word_stats
+    WHERE success_rate >= 0.8
+  ''')
+  mastered_words = cursor.fetchone()["mastered_words"]
+
+  # Get overall success rate
+  cursor.execute('''
+    SELECT
+      SUM(correct) * 1.0 / SUM(correct + wrong) as success_rate
+    FROM word_review_days
+  ''')
+  success_rate = cursor.fetchone()["success_rate"] or 0
+
+  # Get total number of study sessions
+  cursor.execute('SELECT COUNT(*) as total_sessions FROM study_sessions')
+  total_sessions = cursor.fetchone()["total_sessions"]
+
+  # Get number of groups with activity in the last 30 days
+  cursor.execute('''
+    SELECT COUNT(DISTINCT group_id) as active_groups
+    FROM study_sessions
+    WHERE created_at >= date('now', '-30 days')
+  ''')
+  active_groups = cursor.fetchone()["active_groups"]
+
+  # Calculate current streak (consecutive days with at least one study session)
+  cursor.execute('''
+    WITH daily_sessions AS (
+      SELECT
+        date(created_at) as study_date,
+        COUNT(*) as session_count
+      FROM study_sessions
+      GROUP BY date(created_at)
+    ),
+    streak_calc AS (
+      SELECT
+        study_date,
+        julianday(study_date) - julianday(lag(study_date, 1) over (order by study_date)) as days_diff
+      FROM daily_sessions
+    )
+    SELECT COUNT(*) as streak
+    FROM (
+      SELECT study_date
+      FROM streak_calc
+      WHERE days_diff = 1 OR days_diff IS NULL
+      ORDER BY study_date DESC
+    )
+  ''')
+  current_streak = cursor.fetchone()["streak"]
+
+  return {
+    "total_vocabulary": total_vocabulary,
+    "total_words_studied": total_words,
+    "mastered_words": mastered_words,
+    "success_rate": success_rate,
+    "total_sessions": total_sessions,
+    "active_groups": active_groups,
+    "current_streak": current_streak
+  }
+
+def rebuild_stats(cursor):
+  """Recompute every materialized table from the base tables."""
+  cursor.executescript('BEGIN;' + REBUILD_SQL + 'COMMIT;')
+
+def verify_stats(cursor):
+  """Return {stat: (materialized, computed)} for every stat that drifted."""
+  materialized = read_stats(cursor)
+  computed = compute_stats(cursor)
+  mismatches = {}
+  for key, value in computed.items():
+    if key == 'success_rate':
+      drifted = abs(materialized[key] - value) > 1e-9
+    else:
+      drifted = materialized[key] != value
+    if drifted:
+      mismatches[key] = (materialized[key], value)
+  return mismatches
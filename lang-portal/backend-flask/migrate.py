@@ -1,31 +1,73 @@
 import sqlite3
 import os
+import sys
 
-def run_migrations():
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'sql', 'migrations')
+
+# Migrations that ran before applied versions were recorded. A database whose
+# words table already has the jiantizi column has been through them.
+LEGACY_MIGRATIONS = ['001_rename_japanese_columns.sql', '002_update_existing_data.sql']
+
+def migration_files():
+    return sorted([f for f in os.listdir(MIGRATIONS_DIR) if f.endswith('.sql')])
+
+def ensure_migrations_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version TEXT PRIMARY KEY,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def applied_migrations(conn):
+    return {row[0] for row in conn.execute('SELECT version FROM schema_migrations')}
+
+def mark_applied(conn, versions):
+    conn.executemany('INSERT OR IGNORE INTO schema_migrations (version) VALUES (?)', [(v,) for v in versions])
+
+def mark_all_applied(conn):
+    # A database built from sql/setup already has the latest schema
+    ensure_migrations_table(conn)
+    mark_applied(conn, migration_files())
+    conn.commit()
+
+def baseline_legacy_migrations(conn):
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(words)')]
+    if 'jiantizi' in columns:
+        mark_applied(conn, LEGACY_MIGRATIONS)
+        conn.commit()
+
+def run_migrations(db_path=None):
     # Connect to the database
-    db_path = os.path.join(os.path.dirname(__file__), 'word_bank.db')
+    db_path = db_path or os.environ.get('DATABASE') or os.path.join(os.path.dirname(__file__), 'words.db')
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
-    
+
     try:
-        # Get list of migration files
-        migrations_dir = os.path.join(os.path.dirname(__file__), 'sql', 'migrations')
-        migration_files = sorted([f for f in os.listdir(migrations_dir) if f.endswith('.sql')])
-        
-        # Run each migration
-        for migration_file in migration_files:
+        ensure_migrations_table(conn)
+        if not applied_migrations(conn):
+            baseline_legacy_migrations(conn)
+        applied = applied_migrations(conn)
+
+        # Run each pending migration and record it in the same transaction
+        for migration_file in migration_files():
+            if migration_file in applied:
+                continue
             print(f"Running migration: {migration_file}")
-            with open(os.path.join(migrations_dir, migration_file)) as f:
+            with open(os.path.join(MIGRATIONS_DIR, migration_file)) as f:
                 migration_sql = f.read()
-                conn.executescript(migration_sql)
-                conn.commit()
-        
+            conn.executescript(
+                'BEGIN;\n' + migration_sql +
+                f"\n;INSERT INTO schema_migrations (version) VALUES ('{migration_file}');\nCOMMIT;"
+            )
+
         print("Migrations completed successfully")
     except Exception as e:
         print(f"Error running migrations: {str(e)}")
-        conn.rollback()
+        if conn.in_transaction:
+            conn.rollback()
     finally:
         conn.close()
 
 if __name__ == '__main__':
-    run_migrations()
+    run_migrations(sys.argv[1] if len(sys.argv) > 1 else None)
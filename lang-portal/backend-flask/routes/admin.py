@@ -0,0 +1,182 @@
+from flask import request, jsonify, Response
+from flask_cors import cross_origin
+from lib import cache, compaction, distractors, importer, membership, stats
+
+def load(app):
+  # Endpoint: GET /metrics for Prometheus to scrape
+  @app.route('/metrics', methods=['GET'])
+  def get_metrics():
+    return Response(app.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+  # Endpoint: GET /api/admin/slow-requests for the latest requests over SLOW_REQUEST_MS
+  @app.route('/api/admin/slow-requests', methods=['GET'])
+  @cross_origin()
+  def get_slow_requests():
+    return jsonify({
+      "threshold_ms": app.metrics.slow_request_ms,
+      "requests": list(reversed(app.metrics.slow_requests))
+    })
+
+  # Endpoint: GET /api/admin/db/pool to inspect the database connection pool
+  @app.route('/api/admin/db/pool', methods=['GET'])
+  @cross_origin()
+  def get_db_pool_stats():
+    try:
+      return jsonify(app.db.pool_stats())
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: GET /api/admin/db/queries for execution counts and timings per statement
+  @app.route('/api/admin/db/queries', methods=['GET'])
+  @cross_origin()
+  def get_db_query_stats():
+    return jsonify(app.db.query_stats())
+
+  # Endpoint: POST /api/admin/db/queries/reset to start a new measurement
+  @app.route('/api/admin/db/queries/reset', methods=['POST'])
+  @cross_origin()
+  def reset_db_query_stats():
+    app.db.statement_stats.reset()
+    return jsonify(app.db.query_stats())
+
+  # Endpoint: GET /api/admin/reviews/buffer to inspect the write-behind review buffer
+  @app.route('/api/admin/reviews/buffer', methods=['GET'])
+  @cross_origin()
+  def get_review_buffer_stats():
+    if app.review_buffer is None:
+      return jsonify({"mode": app.config['REVIEW_WRITES']})
+    return jsonify(app.review_buffer.stats())
+
+  # Endpoint: POST /api/admin/reviews/flush to write every queued review now
+  @app.route('/api/admin/reviews/flush', methods=['POST'])
+  @cross_origin()
+  def flush_review_buffer():
+    if app.review_buffer is None:
+      return jsonify({"mode": app.config['REVIEW_WRITES']})
+    if not app.review_buffer.flush(timeout=app.config['DB_POOL_TIMEOUT']):
+      return jsonify({"error": "Queued reviews were not written in time"}), 503
+    return jsonify(app.review_buffer.stats())
+
+  # Endpoint: POST /api/admin/reviews/compact to roll old review items up into daily totals
+  # ?days= overrides REVIEW_RETENTION_DAYS; with REVIEW_ARCHIVE set the items are archived there first
+  @app.route('/api/admin/reviews/compact', methods=['POST'])
+  @cross_origin()
+  @cache.invalidates('word_review_items', 'word_review_daily')
+  def compact_reviews():
+    try:
+      days = request.args.get('days', app.config['REVIEW_RETENTION_DAYS'], type=int)
+      if days < 0:
+        return jsonify({"error": "days must not be negative"}), 400
+      report = compaction.compact_reviews(app.db.get(), days=days, archive_path=app.config['REVIEW_ARCHIVE'])
+      return jsonify(report)
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: POST /api/admin/distractors/rebuild to recompute the quiz distractor index
+  # ?pending=true only indexes the words queued since the last build
+  @app.route('/api/admin/distractors/rebuild', methods=['POST'])
+  @cross_origin()
+  def rebuild_distractors():
+    try:
+      if request.args.get('pending', 'false').lower() in ('true', '1', 'yes'):
+        return jsonify(distractors.refresh(app.db.get()))
+      return jsonify(distractors.build_index(app.db.get()))
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: POST /api/admin/stats/rebuild to recompute the dashboard statistics
+  @app.route('/api/admin/stats/rebuild', methods=['POST'])
+  @cross_origin()
+  def rebuild_dashboard_stats():
+    try:
+      cursor = app.db.cursor()
+      stats.rebuild_stats(cursor)
+      return jsonify(stats.read_stats(cursor))
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: GET /api/admin/stats/verify to compare them with a full recount
+  @app.route('/api/admin/stats/verify', methods=['GET'])
+  @cross_origin()
+  def verify_dashboard_stats():
+    try:
+      mismatches = stats.verify_stats(app.db.cursor())
+      return jsonify({
+        "consistent": not mismatches,
+        "mismatches": {key: {"materialized": m, "computed": c} for key, (m, c) in mismatches.items()}
+      })
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: GET /api/admin/groups/counts/verify to compare groups.words_count with a recount
+  @app.route('/api/admin/groups/counts/verify', methods=['GET'])
+  @cross_origin()
+  def verify_group_counts():
+    try:
+      mismatches = membership.verify_counts(app.db.cursor())
+      return jsonify({
+        "consistent": not mismatches,
+        "mismatches": {group_id: {"stored": s, "counted": c} for group_id, (s, c) in mismatches.items()}
+      })
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: POST /api/admin/groups/counts/repair to fix only the groups that drifted
+  @app.route('/api/admin/groups/counts/repair', methods=['POST'])
+  @cross_origin()
+  @cache.invalidates('groups')
+  def repair_group_counts():
+    try:
+      mismatches = membership.repair_counts(app.db.get())
+      return jsonify({
+        "repaired": len(mismatches),
+        "mismatches": {group_id: {"stored": s, "counted": c} for group_id, (s, c) in mismatches.items()}
+      })
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: POST /api/admin/import to bulk import a vocabulary file
+  # Accepts a multipart 'file' upload or the raw body; ?group= links the words to a group
+  @app.route('/api/admin/import', methods=['POST'])
+  @cross_origin()
+  @cache.invalidates('words', 'groups', 'word_groups')
+  def import_vocabulary():
+    try:
+      upload = request.files.get('file')
+      if upload is not None:
+        stream, filename, mimetype = upload.stream, upload.filename, upload.mimetype
+      else:
+        stream, filename, mimetype = request.stream, None, request.mimetype
+
+      fmt = request.args.get('format') or importer.detect_format(filename, mimetype)
+      if fmt not in importer.FORMATS:
+        return jsonify({"error": f"Unsupported format '{fmt}'"}), 400
+      batch_size = request.args.get('batch_size', importer.DEFAULT_BATCH_SIZE, type=int)
+      if batch_size < 1:
+        return jsonify({"error": "batch_size must be positive"}), 400
+
+      report = importer.import_words(
+        app.db.get(),
+        importer.read_records(importer.text_stream(stream), fmt),
+        group_name=request.args.get('group') or None,
+        batch_size=batch_size
+      )
+      return jsonify(report), 201
+    # InvalidImport, malformed JSON and undecodable input are all ValueErrors
+    except ValueError as e:
+      return jsonify({"error": str(e)}), 400
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: GET /api/admin/cache to inspect the response cache
+  @app.route('/api/admin/cache', methods=['GET'])
+  @cross_origin()
+  def get_response_cache_stats():
+    return jsonify(app.response_cache.stats())
+
+  # Endpoint: POST /api/admin/cache/clear after writing to the database outside the API
+  @app.route('/api/admin/cache/clear', methods=['POST'])
+  @cross_origin()
+  def clear_response_cache():
+    app.response_cache.clear()
+    return jsonify(app.response_cache.stats())
@@ -0,0 +1,36 @@
+from flask import request, jsonify, Response
+from flask_cors import cross_origin
+from lib import exports
+
+def load(app):
+  # Endpoint: GET /api/export/<words|study-sessions|review-items>?format=ndjson|csv
+  # Streams every matching row; gzip-compressed when the client accepts it
+  @app.route('/api/export/<name>', methods=['GET'])
+  @cross_origin()
+  def export(name):
+    if name not in exports.QUERIES:
+      return jsonify({"error": f"Unknown export, expected one of {', '.join(exports.QUERIES)}"}), 404
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in exports.FORMATS:
+      return jsonify({"error": f"format must be one of {', '.join(exports.FORMATS)}"}), 400
+    try:
+      sql, params = exports.build(name, request.args)
+    except exports.InvalidExport as e:
+      return jsonify({"error": str(e)}), 400
+    gzip = request.accept_encodings['gzip'] > 0
+
+    def generate():
+      # The connection is taken when the first chunk is wanted and goes
+      # back to the pool when the stream ends or the client goes away
+      conn = app.db.pool.acquire()
+      try:
+        yield from exports.stream(conn, sql, params, fmt, gzip=gzip)
+      finally:
+        app.db.pool.release(conn)
+
+    response = Response(generate(), mimetype=exports.MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{name}.{fmt}"'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if gzip:
+      response.headers['Content-Encoding'] = 'gzip'
+    return response
@@ -1,14 +1,83 @@
 from flask import request, jsonify, g
 from flask_cors import cross_origin
 import json
+import random
+from lib import cache, membership, pagination, queries, quiz, scheduler
+from routes.words import format_word, parse_word_ids
+
+def format_group(group):
+  return {
+    "id": group["id"],
+    "group_name": group["name"],
+    "word_count": group["words_count"]
+  }
+
+def format_group_session(session):
+  return {
+    "id": session["id"],
+    "group_id": session["group_id"],
+    "group_name": session["group_name"],
+    "study_activity_id": session["study_activity_id"],
+    "activity_name": session["activity_name"],
+    "start_time": session["start_time"],
+    "end_time": session["end_time"],
+    "review_items_count": session["review_count"]
+  }
+
+# Upper bound for GET /api/groups/<id>/due?limit=N
+MAX_DUE_LIMIT = 200
+
+def format_due_word(word, new):
+  due = {
+    "id": word["id"],
+    "jiantizi": word["jiantizi"],
+    "pinyin": word["pinyin"],
+    "english": word["english"],
+    "new": new
+  }
+  if not new:
+    due.update(
+      due_at=word["due_at"],
+      interval_days=word["interval_days"],
+      ease=word["ease"],
+      repetitions=word["repetitions"],
+      lapses=word["lapses"]
+    )
+  return due
+
+# Select list for a group's study sessions. Review counts and end times are
+# kept on the session row (sql/setup/create_session_tracking.sql); a session
+# without reviews that was never closed ends 30 minutes after it started.
+GROUP_SESSION_COLUMNS = '''
+  s.id,
+  s.group_id,
+  s.study_activity_id,
+  s.created_at as start_time,
+  s.last_activity_at as last_activity_time,
+  COALESCE(s.ended_at, datetime(s.created_at, '+30 minutes')) as end_time,
+  a.name as activity_name,
+  g.name as group_name,
+  s.review_items_count as review_count
+'''
+
+# Sort expressions for the sort columns. Sessions without reviews have no
+# last activity and sort as '' (where NULL would sort) so the keyset seek
+# can compare them. The review count and last activity expressions match
+# indexes on (group_id, ...), so those sorts do not visit every session.
+GROUP_SESSION_SORT_EXPRESSIONS = {
+  'created_at': 's.created_at',
+  'last_activity_time': "COALESCE(s.last_activity_at, '')",
+  'a.name': 'a.name',
+  'g.name': 'g.name',
+  'review_count': 's.review_items_count'
+}
 
 def load(app):
   @app.route('/groups', methods=['GET'])
   @cross_origin()
+  @cache.cached('groups')
   def get_groups():
     try:
-      cursor = app.db.cursor()
-
       # Get the current page number from query parameters (default is 1)
       page = int(request.args.get('page', 1))
       groups_per_page = 10
@@ -19,35 +88,40 @@ def load(app):
       order = request.args.get('order', 'asc')  # Default to ascending order
 
       # Validate sort_by and order
-      valid_columns = ['name', 'words_count']
-      if sort_by not in valid_columns:
+      if sort_by not in queries.GROUP_SORT_COLUMNS:
         sort_by = 'name'
-      if order not in ['asc', 'desc']:
+      if order not in queries.ORDERS:
         order = 'asc'
 
-      # Query to fetch groups with sorting and the cached word count
-      cursor.execute(f'''
-        SELECT id, name, words_count
-        FROM groups
-        ORDER BY {sort_by} {order}
-        LIMIT ? OFFSET ?
-      ''', (groups_per_page, offset))
+      # Opt-in keyset pagination: ?after=<cursor> seeks past the last group seen
+      if pagination.cursor_requested(request.args):
+        _, params = pagination.seek(request.args, sort_by, order, queries.GROUP_SORT_COLUMNS[sort_by])
+        rows = app.db.query(queries.GROUP_SEEKS[sort_by, order, bool(params)], (*params, groups_per_page + 1))
 
-      groups = cursor.fetchall()
+        groups, next_cursor, has_more = pagination.page(
+          rows, groups_per_page, sort_by, order,
+          lambda group: [group[sort_by], group["id"]]
+        )
+        response = {
+          'groups': [format_group(group) for group in groups],
+          'next_cursor': next_cursor,
+          'has_more': has_more
+        }
+        if pagination.wants_total(request.args, default=False):
+          response['total_groups'] = app.db.query_one(queries.GROUP_COUNT)["count"]
+        return jsonify(response)
 
-      # Query the total number of groups
-      cursor.execute('SELECT COUNT(*) FROM groups')
-      total_groups = cursor.fetchone()[0]
-      total_pages = (total_groups + groups_per_page - 1) // groups_per_page
+      # Query to fetch groups with sorting and the cached word count
+      groups = app.db.query(queries.GROUP_PAGES[sort_by, order], (groups_per_page, offset))
+
+      # Query the total number of groups unless the client opted out
+      total_pages = None
+      if pagination.wants_total(request.args):
+        total_groups = app.db.query_one(queries.GROUP_COUNT)["count"]
+        total_pages = (total_groups + groups_per_page - 1) // groups_per_page
 
       # Format the response
-      groups_data = []
-      for group in groups:
-        groups_data.append({
-          "id": group["id"],
-          "group_name": group["name"],
-          "word_count": group["words_count"]
-        })
+      groups_data = [format_group(group) for group in groups]
 
       # Return groups and pagination metadata
       return jsonify({
@@ -55,23 +129,18 @@ def load(app):
         'total_pages': total_pages,
         'current_page': page
       })
+    except pagination.InvalidCursor as e:
+      return jsonify({"error": str(e)}), 400
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
   @app.route('/groups/<int:id>', methods=['GET'])
   @cross_origin()
+  @cache.cached('groups')
   def get_group(id):
     try:
-      cursor = app.db.cursor()
-
       # Get group details
-      cursor.execute('''
-        SELECT id, name, words_count
-        FROM groups
-        WHERE id = ?
-      ''', (id,))
-      
-      group = cursor.fetchone()
+      group = app.db.query_one(queries.GROUP_BY_ID, (id,))
       if not group:
         return jsonify({"error": "Group not found"}), 404
 
@@ -87,8 +156,6 @@ def load(app):
   @cross_origin()
   def get_group_words(id):
     try:
-      cursor = app.db.cursor()
-      
       # Get pagination parameters
       page = int(request.args.get('page', 1))
       words_per_page = 10
@@ -99,59 +166,95 @@ def load(app):
       order = request.args.get('order', 'asc')
 
       # Validate sort parameters
-      valid_columns = ['jiantizi', 'pinyin', 'english', 'correct_count', 'wrong_count']
-      if sort_by not in valid_columns:
+      if sort_by not in queries.GROUP_WORD_SORT_COLUMNS:
         sort_by = 'jiantizi'
-      if order not in ['asc', 'desc']:
+      if order not in queries.ORDERS:
         order = 'asc'
 
       # First, check if the group exists
-      cursor.execute('SELECT name FROM groups WHERE id = ?', (id,))
-      group = cursor.fetchone()
-      if not group:
+      if not app.db.query_one(queries.GROUP_BY_ID, (id,)):
         return jsonify({"error": "Group not found"}), 404
 
+      # Opt-in keyset pagination over the group's words
+      if pagination.cursor_requested(request.args):
+        _, params = pagination.seek(request.args, sort_by, order, queries.GROUP_WORD_SORT_COLUMNS[sort_by])
+        rows = app.db.query(queries.GROUP_WORD_SEEKS[sort_by, order, bool(params)],
+                            (id, *params, words_per_page + 1))
+
+        words, next_cursor, has_more = pagination.page(
+          rows, words_per_page, sort_by, order,
+          lambda word: [word[sort_by], word["id"]]
+        )
+        response = {
+          'words': [format_word(word) for word in words],
+          'next_cursor': next_cursor,
+          'has_more': has_more
+        }
+        if pagination.wants_total(request.args, default=False):
+          response['total_words'] = app.db.query_one(queries.GROUP_WORD_COUNT, (id,))["count"]
+        return jsonify(response)
+
       # Query to fetch words with pagination and sorting
-      cursor.execute(f'''
-        SELECT w.*, 
-               COALESCE(wr.correct_count, 0) as correct_count,
-               COALESCE(wr.wrong_count, 0) as wrong_count
-        FROM words w
-        JOIN word_groups wg ON w.id = wg.word_id
-        LEFT JOIN word_reviews wr ON w.id = wr.word_id
-        WHERE wg.group_id = ?
-        ORDER BY {sort_by} {order}
-        LIMIT ? OFFSET ?
-      ''', (id, words_per_page, offset))
-      
-      words = cursor.fetchall()
+      words = app.db.query(queries.GROUP_WORD_PAGES[sort_by, order], (id, words_per_page, offset))
 
-      # Get total words count for pagination
-      cursor.execute('''
-        SELECT COUNT(*) 
-        FROM word_groups 
-        WHERE group_id = ?
-      ''', (id,))
-      total_words = cursor.fetchone()[0]
-      total_pages = (total_words + words_per_page - 1) // words_per_page
+      # Get total words count for pagination unless the client opted out
+      total_pages = None
+      if pagination.wants_total(request.args):
+        total_words = app.db.query_one(queries.GROUP_WORD_COUNT, (id,))["count"]
+        total_pages = (total_words + words_per_page - 1) // words_per_page
 
       # Format the response
-      words_data = []
-      for word in words:
-        words_data.append({
-          "id": word["id"],
-          "jiantizi": word["jiantizi"],
-          "pinyin": word["pinyin"],
-          "english": word["english"],
-          "correct_count": word["correct_count"],
-          "wrong_count": word["wrong_count"]
-        })
+      words_data = [format_word(word) for word in words]
 
       return jsonify({
         'words': words_data,
         'total_pages': total_pages,
         'current_page': page
       })
+    except pagination.InvalidCursor as e:
+      return jsonify({"error": str(e)}), 400
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  def change_group_words(id, change):
+    """Apply membership.add_words or remove_words to the word ids in the request body."""
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+      data = data.get('word_ids')
+    if not isinstance(data, list):
+      return jsonify({"error": "Expected a JSON array of word ids or an object with 'word_ids'"}), 400
+    try:
+      word_ids = parse_word_ids(data)
+    except ValueError as e:
+      return jsonify({"error": str(e)}), 400
+    max_ids = app.config['MAX_WORD_IDS']
+    if len(word_ids) > max_ids:
+      return jsonify({"error": f"At most {max_ids} word ids per request"}), 413
+
+    cursor = app.db.cursor()
+    if not membership.group_exists(cursor, id):
+      return jsonify({"error": "Group not found"}), 404
+    result = change(app.db.get(), id, word_ids)
+    return jsonify({"group_id": id, **result, "word_count": membership.words_count(cursor, id)})
+
+  # Endpoint: POST /groups/<id>/words with {"word_ids": [...]} to add words to a group
+  # Words already in the group are left alone; unknown ids are reported as missing
+  @app.route('/groups/<int:id>/words', methods=['POST'])
+  @cross_origin()
+  @cache.invalidates('groups', 'word_groups')
+  def add_group_words(id):
+    try:
+      return change_group_words(id, membership.add_words)
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: DELETE /groups/<id>/words with {"word_ids": [...]} to remove words from a group
+  @app.route('/groups/<int:id>/words', methods=['DELETE'])
+  @cross_origin()
+  @cache.invalidates('groups', 'word_groups')
+  def remove_group_words(id):
+    try:
+      return change_group_words(id, membership.remove_words)
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
@@ -178,6 +281,81 @@ def load(app):
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
+  # Endpoint: GET /api/groups/<id>/due?limit=N for the next words to study
+  # Words whose review is due come first (oldest due first), then words never
+  # reviewed unless ?new=false
+  @app.route('/api/groups/<int:id>/due', methods=['GET'])
+  @cross_origin()
+  def get_group_due_words(id):
+    try:
+      limit = request.args.get('limit', 20, type=int)
+      if limit < 1 or limit > MAX_DUE_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {MAX_DUE_LIMIT}"}), 400
+      include_new = request.args.get('new', 'true').lower() not in ('false', '0', 'no')
+
+      cursor = app.db.cursor()
+      cursor.execute('SELECT id FROM groups WHERE id = ?', (id,))
+      if not cursor.fetchone():
+        return jsonify({"error": "Group not found"}), 404
+
+      now = scheduler.now()
+      # Start from the group's words and sort only their due schedules. The
+      # global due index would also walk every due word of the other groups,
+      # which for a small group is nearly all of them. CROSS JOIN keeps
+      # word_groups as the outer loop.
+      cursor.execute('''
+        SELECT w.id, w.jiantizi, w.pinyin, w.english,
+               ws.due_at, ws.interval_days, ws.ease, ws.repetitions, ws.lapses
+        FROM word_groups wg
+        CROSS JOIN word_schedules ws ON ws.word_id = wg.word_id
+        JOIN words w ON w.id = wg.word_id
+        WHERE wg.group_id = ? AND ws.due_at <= ?
+        ORDER BY ws.due_at, ws.word_id
+        LIMIT ?
+      ''', (id, now, limit))
+      words = [format_due_word(word, new=False) for word in cursor.fetchall()]
+
+      if include_new and len(words) < limit:
+        cursor.execute('''
+          SELECT w.id, w.jiantizi, w.pinyin, w.english
+          FROM word_groups wg
+          JOIN words w ON w.id = wg.word_id
+          WHERE wg.group_id = ?
+            AND NOT EXISTS (SELECT 1 FROM word_schedules ws WHERE ws.word_id = wg.word_id)
+          ORDER BY wg.word_id
+          LIMIT ?
+        ''', (id, limit - len(words)))
+        words.extend(format_due_word(word, new=True) for word in cursor.fetchall())
+
+      return jsonify({"group_id": id, "as_of": now, "words": words})
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: GET /api/groups/<id>/quiz?n=20&choices=4 for multiple-choice items
+  # Distractors come from the precomputed neighbour index; ?seed= repeats a quiz
+  @app.route('/api/groups/<int:id>/quiz', methods=['GET'])
+  @cross_origin()
+  def get_group_quiz(id):
+    try:
+      n = request.args.get('n', quiz.DEFAULT_ITEMS, type=int)
+      if n < 1 or n > quiz.MAX_ITEMS:
+        return jsonify({"error": f"n must be between 1 and {quiz.MAX_ITEMS}"}), 400
+      choices = request.args.get('choices', quiz.DEFAULT_CHOICES, type=int)
+      if choices < quiz.MIN_CHOICES or choices > quiz.MAX_CHOICES:
+        return jsonify({"error": f"choices must be between {quiz.MIN_CHOICES} and {quiz.MAX_CHOICES}"}), 400
+      seed = request.args.get('seed', type=int)
+
+      cursor = app.db.cursor()
+      cursor.execute('SELECT words_count FROM groups WHERE id = ?', (id,))
+      group = cursor.fetchone()
+      if not group:
+        return jsonify({"error": "Group not found"}), 404
+
+      items = quiz.build_quiz(cursor, id, group["words_count"] or 0, n, choices, random.Random(seed))
+      return jsonify({"group_id": id, "items": items})
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
   @app.route('/groups/<int:id>/study_sessions', methods=['GET'])
   @cross_origin()
   def get_group_study_sessions(id):
@@ -204,67 +382,79 @@ def load(app):
 
       # Use mapped sort column or default to created_at
       sort_column = sort_mapping.get(sort_by, 'created_at')
+      if order not in ['asc', 'desc']:
+        order = 'desc'
 
-      # Get total count for pagination
-      cursor.execute('''
-        SELECT COUNT(*)
-        FROM study_sessions
-        WHERE group_id = ?
-      ''', (id,))
-      total_sessions = cursor.fetchone()[0]
-      total_pages = (total_sessions + sessions_per_page - 1) // sessions_per_page
+      # Opt-in keyset pagination over the group's sessions
+      if pagination.cursor_requested(request.args):
+        seek_column = GROUP_SESSION_SORT_EXPRESSIONS[sort_column]
+        row_keys = {
+          'created_at': 'start_time',
+          'last_activity_time': 'last_activity_time',
+          'a.name': 'activity_name',
+          'g.name': 'group_name',
+          'review_count': 'review_count'
+        }
+        predicate, params = pagination.seek(request.args, sort_column, order, [seek_column, 's.id'])
+        cursor.execute(f'''
+          SELECT {GROUP_SESSION_COLUMNS}
+          FROM study_sessions s
+          JOIN study_activities a ON s.study_activity_id = a.id
+          JOIN groups g ON s.group_id = g.id
+          WHERE s.group_id = ? AND {predicate}
+          ORDER BY {seek_column} {order}, s.id {order}
+          LIMIT ?
+        ''', (id, *params, sessions_per_page + 1))
+
+        def session_key(session):
+          value = session[row_keys[sort_column]]
+          return [value if value is not None else '', session["id"]]
+
+        sessions, next_cursor, has_more = pagination.page(
+          cursor.fetchall(), sessions_per_page, sort_column, order, session_key
+        )
+        response = {
+          'study_sessions': [format_group_session(session) for session in sessions],
+          'next_cursor': next_cursor,
+          'has_more': has_more
+        }
+        if pagination.wants_total(request.args, default=False):
+          cursor.execute('SELECT COUNT(*) FROM study_sessions WHERE group_id = ?', (id,))
+          response['total_sessions'] = cursor.fetchone()[0]
+        return jsonify(response)
 
-      # Get study sessions for this group with dynamic calculations
+      # Get total count for pagination unless the client opted out
+      total_pages = None
+      if pagination.wants_total(request.args):
+        cursor.execute('''
+          SELECT COUNT(*)
+          FROM study_sessions
+          WHERE group_id = ?
+        ''', (id,))
+        total_sessions = cursor.fetchone()[0]
+        total_pages = (total_sessions + sessions_per_page - 1) // sessions_per_page
+
+      # Get study sessions for this group with their review counts and end
+      # times in a single query
       cursor.execute(f'''
-        SELECT 
-          s.id,
-          s.group_id,
-          s.study_activity_id,
-          s.created_at as start_time,
-          (
-            SELECT MAX(created_at)
-            FROM word_review_items
-            WHERE study_session_id = s.id
-          ) as last_activity_time,
-          a.name as activity_name,
-          g.name as group_name,
-          (
-            SELECT COUNT(*)
-            FROM word_review_items
-            WHERE study_session_id = s.id
-          ) as review_count
+        SELECT {GROUP_SESSION_COLUMNS}
         FROM study_sessions s
         JOIN study_activities a ON s.study_activity_id = a.id
         JOIN groups g ON s.group_id = g.id
         WHERE s.group_id = ?
-        ORDER BY {sort_column} {order}
+        ORDER BY {GROUP_SESSION_SORT_EXPRESSIONS[sort_column]} {order}, s.id {order}
         LIMIT ? OFFSET ?
       ''', (id, sessions_per_page, offset))
       
       sessions = cursor.fetchall()
-      sessions_data = []
-      
-      for session in sessions:
-        # If there's no last_activity_time, use start_time + 30 minutes
-        end_time = session["last_activity_time"]
-        if not end_time:
-            end_time = cursor.execute('SELECT datetime(?, "+30 minutes")', (session["start_time"],)).fetchone()[0]
-        
-        sessions_data.append({
-          "id": session["id"],
-          "group_id": session["group_id"],
-          "group_name": session["group_name"],
-          "study_activity_id": session["study_activity_id"],
-          "activity_name": session["activity_name"],
-          "start_time": session["start_time"],
-          "end_time": end_time,
-          "review_items_count": session["review_count"]
-        })
+      sessions_data = [format_group_session(session) for session in sessions]
 
       return jsonify({
         'study_sessions': sessions_data,
         'total_pages': total_pages,
         'current_page': page
       })
+    except pagination.InvalidCursor as e:
+      return jsonify({"error": str(e)}), 400
     except Exception as e:
       return jsonify({"error": str(e)}), 500
\ No newline at end of file
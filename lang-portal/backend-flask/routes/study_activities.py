@@ -1,11 +1,17 @@
 from flask import Blueprint, jsonify, request, current_app
 from flask_cors import cross_origin
 import math
+from lib import cache, pagination
+from routes.study_sessions import format_session, SESSION_COLUMNS, SESSION_COUNT
 
 study_activities_bp = Blueprint('study_activities', __name__)
 
+# Sessions of one activity the listing can return, for keyset and offset pages alike
+ACTIVITY_SESSION_COUNT = SESSION_COUNT + 'WHERE ss.study_activity_id = ?'
+
 @study_activities_bp.route('/api/study-activities', methods=['GET'])
 @cross_origin()
+@cache.cached('study_activities')
 def get_study_activities():
     cursor = current_app.db.cursor()
     cursor.execute('SELECT id, name, url, preview_url FROM study_activities')
@@ -47,54 +53,67 @@ def get_study_activity_sessions(id):
 
     # Get pagination parameters
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
+    per_page = pagination.per_page(request.args)
     offset = (page - 1) * per_page
 
-    # Get total count
-    cursor.execute('''
-        SELECT COUNT(*) as count 
-        FROM study_sessions ss
-        JOIN groups g ON g.id = ss.group_id
-        WHERE ss.study_activity_id = ?
-    ''', (id,))
-    total_count = cursor.fetchone()['count']
+    # Opt-in keyset pagination: newest first, seeking on (created_at, id)
+    if pagination.cursor_requested(request.args):
+        try:
+            predicate, params = pagination.seek(request.args, 'created_at', 'desc', ['ss.created_at', 'ss.id'])
+        except pagination.InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+
+        cursor.execute(f'''
+            SELECT {SESSION_COLUMNS}
+            FROM study_sessions ss
+            JOIN groups g ON g.id = ss.group_id
+            JOIN study_activities sa ON sa.id = ss.study_activity_id
+            WHERE ss.study_activity_id = ? AND {predicate}
+            ORDER BY ss.created_at DESC, ss.id DESC
+            LIMIT ?
+        ''', (id, *params, per_page + 1))
+
+        sessions, next_cursor, has_more = pagination.page(
+            cursor.fetchall(), per_page, 'created_at', 'desc',
+            lambda session: [session['created_at'], session['id']]
+        )
+        response = {
+            'items': [format_session(session) for session in sessions],
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_more': has_more
+        }
+        if pagination.wants_total(request.args, default=False):
+            cursor.execute(ACTIVITY_SESSION_COUNT, (id,))
+            response['total'] = cursor.fetchone()['count']
+        return jsonify(response)
+
+    # Get total count unless the client opted out
+    total_count = None
+    total_pages = None
+    if pagination.wants_total(request.args):
+        cursor.execute(ACTIVITY_SESSION_COUNT, (id,))
+        total_count = cursor.fetchone()['count']
+        total_pages = math.ceil(total_count / per_page)
 
     # Get paginated sessions
-    cursor.execute('''
-        SELECT 
-            ss.id,
-            ss.group_id,
-            g.name as group_name,
-            sa.name as activity_name,
-            ss.created_at,
-            ss.study_activity_id as activity_id,
-            COUNT(wri.id) as review_items_count
+    cursor.execute(f'''
+        SELECT {SESSION_COLUMNS}
         FROM study_sessions ss
         JOIN groups g ON g.id = ss.group_id
         JOIN study_activities sa ON sa.id = ss.study_activity_id
-        LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
         WHERE ss.study_activity_id = ?
-        GROUP BY ss.id, ss.group_id, g.name, sa.name, ss.created_at, ss.study_activity_id
         ORDER BY ss.created_at DESC
         LIMIT ? OFFSET ?
     ''', (id, per_page, offset))
     sessions = cursor.fetchall()
 
     return jsonify({
-        'items': [{
-            'id': session['id'],
-            'group_id': session['group_id'],
-            'group_name': session['group_name'],
-            'activity_id': session['activity_id'],
-            'activity_name': session['activity_name'],
-            'start_time': session['created_at'],
-            'end_time': session['created_at'],  # For now, just use the same time since we don't track end time
-            'review_items_count': session['review_items_count']
-        } for session in sessions],
+        'items': [format_session(session) for session in sessions],
         'total': total_count,
         'page': page,
         'per_page': per_page,
-        'total_pages': math.ceil(total_count / per_page)
+        'total_pages': total_pages
     })
 
 @study_activities_bp.route('/api/study-activities/<int:id>/launch', methods=['GET'])
@@ -2,10 +2,52 @@ from flask import request, jsonify, g
 from flask_cors import cross_origin
 from datetime import datetime
 import math
+from lib import cache, pagination, reviews, stats
+from lib.review_buffer import BufferFull
+
+def format_session(session):
+  return {
+    'id': session['id'],
+    'group_id': session['group_id'],
+    'group_name': session['group_name'],
+    'activity_id': session['activity_id'],
+    'activity_name': session['activity_name'],
+    'start_time': session['created_at'],
+    # Sessions without reviews that were never closed have no end yet
+    'end_time': session['ended_at'] or session['created_at'],
+    'duration_ms': session['duration_ms'],
+    'closed': session['closed_at'] is not None,
+    'review_items_count': session['review_items_count']
+  }
+
+# Columns format_session needs; the review counters and end time are kept
+# on the session row by the triggers in sql/setup/create_session_tracking.sql
+SESSION_COLUMNS = '''
+  ss.id,
+  ss.group_id,
+  g.name as group_name,
+  sa.id as activity_id,
+  sa.name as activity_name,
+  ss.created_at,
+  ss.ended_at,
+  ss.duration_ms,
+  ss.closed_at,
+  ss.review_items_count
+'''
+
+# Sessions the listing can return; keyset and offset pages share it so
+# both report the same total
+SESSION_COUNT = '''
+  SELECT COUNT(*) as count
+  FROM study_sessions ss
+  JOIN groups g ON g.id = ss.group_id
+  JOIN study_activities sa ON sa.id = ss.study_activity_id
+'''
 
 def load(app):
   @app.route('/api/study-sessions', methods=['POST'])
   @cross_origin()
+  @cache.invalidates('study_sessions')
   def create_study_session():
     try:
       data = request.get_json()
@@ -40,54 +82,65 @@ def load(app):
       
       # Get pagination parameters
       page = request.args.get('page', 1, type=int)
-      per_page = request.args.get('per_page', 10, type=int)
+      per_page = pagination.per_page(request.args)
       offset = (page - 1) * per_page
 
-      # Get total count
-      cursor.execute('''
-        SELECT COUNT(*) as count 
-        FROM study_sessions ss
-        JOIN groups g ON g.id = ss.group_id
-        JOIN study_activities sa ON sa.id = ss.study_activity_id
-      ''')
-      total_count = cursor.fetchone()['count']
+      # Opt-in keyset pagination: newest first, seeking on (created_at, id)
+      if pagination.cursor_requested(request.args):
+        predicate, params = pagination.seek(request.args, 'created_at', 'desc', ['ss.created_at', 'ss.id'])
+        cursor.execute(f'''
+          SELECT {SESSION_COLUMNS}
+          FROM study_sessions ss
+          JOIN groups g ON g.id = ss.group_id
+          JOIN study_activities sa ON sa.id = ss.study_activity_id
+          WHERE {predicate}
+          ORDER BY ss.created_at DESC, ss.id DESC
+          LIMIT ?
+        ''', (*params, per_page + 1))
 
-      # Get paginated sessions
-      cursor.execute('''
-        SELECT 
-          ss.id,
-          ss.group_id,
-          g.name as group_name,
-          sa.id as activity_id,
-          sa.name as activity_name,
-          ss.created_at,
-          COUNT(wri.id) as review_items_count
+        sessions, next_cursor, has_more = pagination.page(
+          cursor.fetchall(), per_page, 'created_at', 'desc',
+          lambda session: [session['created_at'], session['id']]
+        )
+        response = {
+          'items': [format_session(session) for session in sessions],
+          'per_page': per_page,
+          'next_cursor': next_cursor,
+          'has_more': has_more
+        }
+        if pagination.wants_total(request.args, default=False):
+          cursor.execute(SESSION_COUNT)
+          response['total'] = cursor.fetchone()['count']
+        return jsonify(response)
+
+      # Get total count unless the client opted out
+      total_count = None
+      total_pages = None
+      if pagination.wants_total(request.args):
+        cursor.execute(SESSION_COUNT)
+        total_count = cursor.fetchone()['count']
+        total_pages = math.ceil(total_count / per_page)
+
+      # Get paginated sessions from the created_at index
+      cursor.execute(f'''
+        SELECT {SESSION_COLUMNS}
         FROM study_sessions ss
         JOIN groups g ON g.id = ss.group_id
         JOIN study_activities sa ON sa.id = ss.study_activity_id
-        LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
-        GROUP BY ss.id
         ORDER BY ss.created_at DESC
         LIMIT ? OFFSET ?
       ''', (per_page, offset))
       sessions = cursor.fetchall()
 
       return jsonify({
-        'items': [{
-          'id': session['id'],
-          'group_id': session['group_id'],
-          'group_name': session['group_name'],
-          'activity_id': session['activity_id'],
-          'activity_name': session['activity_name'],
-          'start_time': session['created_at'],
-          'end_time': session['created_at'],  # For now, just use the same time since we don't track end time
-          'review_items_count': session['review_items_count']
-        } for session in sessions],
+        'items': [format_session(session) for session in sessions],
         'total': total_count,
         'page': page,
         'per_page': per_page,
-        'total_pages': math.ceil(total_count / per_page)
+        'total_pages': total_pages
       })
+    except pagination.InvalidCursor as e:
+      return jsonify({"error": str(e)}), 400
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
@@ -98,21 +151,12 @@ def load(app):
       cursor = app.db.cursor()
       
       # Get session details
-      cursor.execute('''
-        SELECT 
-          ss.id,
-          ss.group_id,
-          g.name as group_name,
-          sa.id as activity_id,
-          sa.name as activity_name,
-          ss.created_at,
-          COUNT(wri.id) as review_items_count
+      cursor.execute(f'''
+        SELECT {SESSION_COLUMNS}
         FROM study_sessions ss
         JOIN groups g ON g.id = ss.group_id
         JOIN study_activities sa ON sa.id = ss.study_activity_id
-        LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
         WHERE ss.id = ?
-        GROUP BY ss.id
       ''', (id,))
       
       session = cursor.fetchone()
@@ -121,7 +165,7 @@ def load(app):
 
       # Get pagination parameters
       page = request.args.get('page', 1, type=int)
-      per_page = request.args.get('per_page', 10, type=int)
+      per_page = pagination.per_page(request.args)
       offset = (page - 1) * per_page
 
       # Get the words reviewed in this session with their review status
@@ -151,16 +195,7 @@ def load(app):
       total_count = cursor.fetchone()['count']
 
       return jsonify({
-        'session': {
-          'id': session['id'],
-          'group_id': session['group_id'],
-          'group_name': session['group_name'],
-          'activity_id': session['activity_id'],
-          'activity_name': session['activity_name'],
-          'start_time': session['created_at'],
-          'end_time': session['created_at'],  # For now, just use the same time
-          'review_items_count': session['review_items_count']
-        },
+        'session': format_session(session),
         'words': [{
           'id': word['id'],
           'jiantizi': word['jiantizi'],  # Previously kanji
@@ -181,6 +216,7 @@ def load(app):
 
   @app.route('/api/study-sessions/reset', methods=['POST'])
   @cross_origin()
+  @cache.invalidates('study_sessions', 'word_review_items', 'word_review_daily')
   def reset_study_sessions():
     try:
       cursor = app.db.cursor()
@@ -190,8 +226,16 @@ def load(app):
       
       # Then delete all study sessions
       cursor.execute('DELETE FROM study_sessions')
+
+      # And the daily totals of compacted review items
+      cursor.execute('DELETE FROM word_review_daily')
+      compacted = cursor.rowcount > 0
       
       app.db.commit()
+
+      # The triggers only took back the review items that were still kept
+      if compacted:
+        stats.rebuild_stats(cursor)
       
       return jsonify({"message": "Study history cleared successfully"}), 200
     except Exception as e:
@@ -200,17 +244,102 @@ def load(app):
   # Fix API for Bootcamp Week 1: Add review endpoint for recording study results
   @app.route('/api/study-sessions/<id>/review', methods=['POST'])
   @cross_origin()
+  @cache.invalidates('word_review_items', 'word_reviews')
   def create_study_session_review(id):
     try:
       data = request.get_json()
-      if not data or not all(key in data for key in ('word_id', 'correct')):
-        return jsonify({"error": "Missing required fields"}), 400
+      try:
+        reviews.validate_item(data)
+      except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+      cursor = app.db.cursor()
+      if not reviews.session_exists(cursor, id):
+        return jsonify({"error": "Study session not found"}), 404
+      result = reviews.record_reviews(app.db, id, [data], app.review_buffer)[0]
+      if result['status'] != 'recorded':
+        return jsonify({"error": result['error']}), 404
+      if app.review_buffer is not None and app.review_buffer.deferred:
+        return jsonify({"message": "Review accepted"}), 202
+      return jsonify({"message": "Review recorded successfully"}), 201
+    except BufferFull as e:
+      return jsonify({"error": str(e)}), 503, {'Retry-After': '1'}
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: POST /api/study-sessions/<id>/reviews to record a whole round of reviews at once
+  @app.route('/api/study-sessions/<id>/reviews', methods=['POST'])
+  @cross_origin()
+  @cache.invalidates('word_review_items', 'word_reviews')
+  def create_study_session_reviews(id):
+    try:
+      try:
+        items = reviews.parse_items(request)
+      except reviews.InvalidReviewBatch as e:
+        return jsonify({"error": str(e)}), 400
+      max_items = app.config['MAX_REVIEW_BATCH']
+      if len(items) > max_items:
+        return jsonify({"error": f"At most {max_items} review items per request"}), 413
+
       cursor = app.db.cursor()
+      if not reviews.session_exists(cursor, id):
+        return jsonify({"error": "Study session not found"}), 404
+
+      results = reviews.record_reviews(app.db, id, items, app.review_buffer)
+      recorded = sum(1 for result in results if result['status'] == 'recorded')
+      # With REVIEW_WRITES='log' the items are in the review log but not yet committed
+      created = 202 if app.review_buffer is not None and app.review_buffer.deferred else 201
+      return jsonify({
+        "session_id": int(id),
+        "recorded": recorded,
+        "rejected": len(results) - recorded,
+        "items": results
+      }), created if recorded or not results else 400
+    except BufferFull as e:
+      return jsonify({"error": str(e)}), 503, {'Retry-After': '1'}
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: POST /api/study-sessions/<id>/close to end a session
+  # An optional {"ended_at": "YYYY-MM-DD HH:MM:SS"} overrides the current time;
+  # closing an already closed session leaves it unchanged
+  @app.route('/api/study-sessions/<id>/close', methods=['POST'])
+  @cross_origin()
+  @cache.invalidates('study_sessions')
+  def close_study_session(id):
+    try:
+      data = request.get_json(silent=True) or {}
+      ended_at = data.get('ended_at')
+      if ended_at is not None:
+        try:
+          ended_at = datetime.fromisoformat(ended_at).strftime('%Y-%m-%d %H:%M:%S')
+        except (TypeError, ValueError):
+          return jsonify({"error": "ended_at must be a 'YYYY-MM-DD HH:MM:SS' timestamp"}), 400
+
+      cursor = app.db.cursor()
+      # A session never ends before its last review item
+      cursor.execute('''
+        UPDATE study_sessions SET
+          closed_at = datetime('now'),
+          ended_at = MAX(COALESCE(?, datetime('now')), COALESCE(last_activity_at, ''))
+        WHERE id = ? AND closed_at IS NULL
+      ''', (ended_at, id))
       cursor.execute('''
-          INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
-          VALUES (?, ?, ?, datetime('now'))
-      ''', (data['word_id'], id, data['correct']))
+        UPDATE study_sessions
+        SET duration_ms = MAX(0, CAST(ROUND((julianday(ended_at) - julianday(created_at)) * 86400000) AS INTEGER))
+        WHERE id = ?
+      ''', (id,))
       app.db.commit()
-      return jsonify({"message": "Review recorded successfully"}), 201
+
+      cursor.execute(f'''
+        SELECT {SESSION_COLUMNS}
+        FROM study_sessions ss
+        JOIN groups g ON g.id = ss.group_id
+        JOIN study_activities sa ON sa.id = ss.study_activity_id
+        WHERE ss.id = ?
+      ''', (id,))
+      session = cursor.fetchone()
+      if not session:
+        return jsonify({"error": "Study session not found"}), 404
+      return jsonify(format_session(session))
     except Exception as e:
-      return jsonify({"error": str(e)}), 500
\ No newline at end of file
+      return jsonify({"error": str(e)}), 500
@@ -1,14 +1,69 @@
 from flask import request, jsonify, g
 from flask_cors import cross_origin
 import json
+from datetime import datetime, timedelta, timezone
+from lib import cache, pagination, queries, search
+
+# GET /words/<id>/history?days=N
+DEFAULT_HISTORY_DAYS = 30
+MAX_HISTORY_DAYS = 3650
+
+def format_word(word):
+  return {
+    "id": word["id"],
+    "jiantizi": word["jiantizi"],
+    "pinyin": word["pinyin"],
+    "english": word["english"],
+    "correct_count": word["correct_count"],
+    "wrong_count": word["wrong_count"]
+  }
+
+def format_word_details(word):
+  return {**format_word(word), "groups": json.loads(word["groups"])}
+
+def parse_word_ids(values):
+  """Return the distinct word ids in request order, or raise ValueError."""
+  ids = []
+  for value in values:
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+      raise ValueError("ids must be integers")
+    try:
+      ids.append(int(value))
+    except ValueError:
+      raise ValueError("ids must be integers")
+  return list(dict.fromkeys(ids))
+
+def fetch_word_details(db, word_ids):
+  """Return the words for the given ids (one round trip) and the ids not found."""
+  words = [format_word_details(word) for word in db.query(queries.WORD_DETAILS, (json.dumps(word_ids),))]
+  found = {word["id"] for word in words}
+  return words, [word_id for word_id in word_ids if word_id not in found]
 
 def load(app):
-  # Endpoint: GET /words with pagination (50 words per page)
+  def words_by_id(ids):
+    """Respond with several words at once for GET /words?ids= and POST /words/batch."""
+    try:
+      word_ids = parse_word_ids(ids)
+    except ValueError as e:
+      return jsonify({"error": str(e)}), 400
+    if not word_ids:
+      return jsonify({"error": "ids is required"}), 400
+    max_ids = app.config['MAX_WORD_IDS']
+    if len(word_ids) > max_ids:
+      return jsonify({"error": f"At most {max_ids} word ids per request"}), 413
+
+    words, missing = fetch_word_details(app.db, word_ids)
+    return jsonify({"words": words, "missing": missing})
+
+  # Endpoint: GET /words with pagination (50 words per page), or GET /words?ids=1,2,3
   @app.route('/words', methods=['GET'])
   @cross_origin()
   def get_words():
     try:
-      cursor = app.db.cursor()
+      # Multi-get: ?ids=1,2,3 (or repeated ?ids=) returns those words with their groups
+      if 'ids' in request.args:
+        ids = [value for arg in request.args.getlist('ids') for value in arg.split(',') if value.strip()]
+        return words_by_id(ids)
 
       # Get the current page number from query parameters (default is 1)
       page = int(request.args.get('page', 1))
@@ -22,41 +77,42 @@ def load(app):
       order = request.args.get('order', 'asc')  # Default to ascending order
 
       # Validate sort_by and order
-      valid_columns = ['jiantizi', 'pinyin', 'english', 'correct_count', 'wrong_count']
-      if sort_by not in valid_columns:
+      if sort_by not in queries.WORD_SORT_COLUMNS:
         sort_by = 'jiantizi'
-      if order not in ['asc', 'desc']:
+      if order not in queries.ORDERS:
         order = 'asc'
 
+      # Opt-in keyset pagination: ?after=<cursor> seeks past the last row seen
+      if pagination.cursor_requested(request.args):
+        _, params = pagination.seek(request.args, sort_by, order, queries.WORD_SORT_COLUMNS[sort_by])
+        rows = app.db.query(queries.WORD_SEEKS[sort_by, order, bool(params)], (*params, words_per_page + 1))
+
+        words, next_cursor, has_more = pagination.page(
+          rows, words_per_page, sort_by, order,
+          lambda word: [word[sort_by], word["id"]]
+        )
+        response = {
+          "words": [format_word(word) for word in words],
+          "next_cursor": next_cursor,
+          "has_more": has_more
+        }
+        # Counting is optional in cursor mode since it costs a full scan
+        if pagination.wants_total(request.args, default=False):
+          response["total_words"] = app.db.query_one(queries.WORD_COUNT)["count"]
+        return jsonify(response)
+
       # Query to fetch words with sorting
-      cursor.execute(f'''
-        SELECT w.id, w.jiantizi, w.pinyin, w.english, 
-            COALESCE(r.correct_count, 0) AS correct_count,
-            COALESCE(r.wrong_count, 0) AS wrong_count
-        FROM words w
-        LEFT JOIN word_reviews r ON w.id = r.word_id
-        ORDER BY {sort_by} {order}
-        LIMIT ? OFFSET ?
-      ''', (words_per_page, offset))
-
-      words = cursor.fetchall()
-
-      # Query the total number of words
-      cursor.execute('SELECT COUNT(*) FROM words')
-      total_words = cursor.fetchone()[0]
-      total_pages = (total_words + words_per_page - 1) // words_per_page
+      words = app.db.query(queries.WORD_PAGES[sort_by, order], (words_per_page, offset))
+
+      # Query the total number of words unless the client opted out
+      total_words = None
+      total_pages = None
+      if pagination.wants_total(request.args):
+        total_words = app.db.query_one(queries.WORD_COUNT)["count"]
+        total_pages = (total_words + words_per_page - 1) // words_per_page
 
       # Format the response
-      words_data = []
-      for word in words:
-        words_data.append({
-          "id": word["id"],
-          "jiantizi": word["jiantizi"],
-          "pinyin": word["pinyin"],
-          "english": word["english"],
-          "correct_count": word["correct_count"],
-          "wrong_count": word["wrong_count"]
-        })
+      words_data = [format_word(word) for word in words]
 
       return jsonify({
         "words": words_data,
@@ -65,6 +121,55 @@ def load(app):
         "total_words": total_words
       })
 
+    except pagination.InvalidCursor as e:
+      return jsonify({"error": str(e)}), 400
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+    finally:
+      app.db.close()
+
+  # Endpoint: POST /words/batch with {"ids": [...]} for id lists too long for a query string
+  @app.route('/words/batch', methods=['POST'])
+  @cross_origin()
+  def get_words_batch():
+    try:
+      data = request.get_json(silent=True)
+      if isinstance(data, dict):
+        data = data.get('ids')
+      if not isinstance(data, list):
+        return jsonify({"error": "Expected a JSON array of word ids or an object with 'ids'"}), 400
+      return words_by_id(data)
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+    finally:
+      app.db.close()
+
+  # Endpoint: GET /words/search?q=... to look words up by hanzi, pinyin or English
+  @app.route('/words/search', methods=['GET'])
+  @cross_origin()
+  def search_words():
+    try:
+      cursor = app.db.cursor()
+
+      limit = request.args.get('limit', search.DEFAULT_LIMIT, type=int)
+      limit = min(max(1, limit), search.MAX_LIMIT)
+      sql, params = search.build(
+        request.args.get('q'),
+        field=request.args.get('field', 'auto'),
+        match=request.args.get('match', 'prefix'),
+        limit=limit
+      )
+      cursor.execute(sql, params)
+      words = [format_word(word) for word in cursor.fetchall()]
+
+      return jsonify({
+        "query": request.args.get('q'),
+        "words": words,
+        "count": len(words)
+      })
+
+    except search.InvalidSearch as e:
+      return jsonify({"error": str(e)}), 400
     except Exception as e:
       return jsonify({"error": str(e)}), 500
     finally:
@@ -73,50 +178,39 @@ def load(app):
   # Endpoint: GET /words/:id to get a single word with its details
   @app.route('/words/<int:word_id>', methods=['GET'])
   @cross_origin()
+  @cache.cached('words', 'word_reviews', 'word_groups', 'groups')
   def get_word(word_id):
     try:
-      cursor = app.db.cursor()
-      
-      # Query to fetch the word and its details
-      cursor.execute('''
-        SELECT w.id, w.jiantizi, w.pinyin, w.english,
-               COALESCE(r.correct_count, 0) AS correct_count,
-               COALESCE(r.wrong_count, 0) AS wrong_count,
-               GROUP_CONCAT(DISTINCT g.id || '::' || g.name) as groups
-        FROM words w
-        LEFT JOIN word_reviews r ON w.id = r.word_id
-        LEFT JOIN word_groups wg ON w.id = wg.word_id
-        LEFT JOIN groups g ON wg.group_id = g.id
-        WHERE w.id = ?
-        GROUP BY w.id
-      ''', (word_id,))
-      
-      word = cursor.fetchone()
-      
-      if not word:
+      words, _ = fetch_word_details(app.db, [word_id])
+      if not words:
         return jsonify({"error": "Word not found"}), 404
-      
-      # Parse the groups string into a list of group objects
-      groups = []
-      if word["groups"]:
-        for group_str in word["groups"].split(','):
-          group_id, group_name = group_str.split('::')
-          groups.append({
-            "id": int(group_id),
-            "name": group_name
-          })
-      
+
+      return jsonify({"word": words[0]})
+
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: GET /words/<id>/history?days=N for the word's daily review totals
+  # Covers compacted history (word_review_daily) as well as recent review items
+  @app.route('/words/<int:word_id>/history', methods=['GET'])
+  @cross_origin()
+  @cache.cached('words', 'word_review_items', 'word_review_daily')
+  def get_word_history(word_id):
+    try:
+      days = request.args.get('days', DEFAULT_HISTORY_DAYS, type=int)
+      if not 1 <= days <= MAX_HISTORY_DAYS:
+        return jsonify({"error": f"days must be between 1 and {MAX_HISTORY_DAYS}"}), 400
+      if not app.db.query_one(queries.WORD_EXISTS, (word_id,)):
+        return jsonify({"error": "Word not found"}), 404
+
+      since = (datetime.now(timezone.utc).date() - timedelta(days=days - 1)).isoformat()
+      history = app.db.query(queries.WORD_HISTORY, (word_id, since))
       return jsonify({
-        "word": {
-          "id": word["id"],
-          "jiantizi": word["jiantizi"],
-          "pinyin": word["pinyin"],
-          "english": word["english"],
-          "correct_count": word["correct_count"],
-          "wrong_count": word["wrong_count"],
-          "groups": groups
-        }
+        "word_id": word_id,
+        "since": since,
+        "days": history,
+        "correct": sum(day["correct"] for day in history),
+        "wrong": sum(day["wrong"] for day in history)
       })
-      
     except Exception as e:
-      return jsonify({"error": str(e)}), 500
\ No newline at end of file
+      return jsonify({"error": str(e)}), 500
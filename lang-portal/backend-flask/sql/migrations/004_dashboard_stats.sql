@@ -0,0 +1,182 @@
+-- Materialize the dashboard statistics for existing databases
+
+CREATE TABLE IF NOT EXISTS study_stats (
+  id INTEGER PRIMARY KEY CHECK (id = 1),  -- Single row
+  total_vocabulary INTEGER NOT NULL DEFAULT 0,
+  total_sessions INTEGER NOT NULL DEFAULT 0,
+  total_reviews INTEGER NOT NULL DEFAULT 0,     -- Review items that belong to an existing session
+  correct_reviews INTEGER NOT NULL DEFAULT 0,
+  words_studied INTEGER NOT NULL DEFAULT 0,
+  mastered_words INTEGER NOT NULL DEFAULT 0,    -- At least 5 attempts and >= 80% correct
+  study_days INTEGER NOT NULL DEFAULT 0,        -- Distinct days with a study session
+  consecutive_days INTEGER NOT NULL DEFAULT 0   -- Study days whose previous day also has a session
+);
+
+INSERT OR IGNORE INTO study_stats (id) VALUES (1);
+
+CREATE TABLE IF NOT EXISTS word_review_stats (
+  word_id INTEGER PRIMARY KEY,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  correct INTEGER NOT NULL DEFAULT 0,
+  mastered INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS study_days (
+  day TEXT PRIMARY KEY,  -- date(study_sessions.created_at)
+  sessions INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS group_activity (
+  group_id INTEGER PRIMARY KEY,
+  last_session_at DATETIME  -- MAX(study_sessions.created_at) for the group
+);
+
+CREATE INDEX IF NOT EXISTS idx_group_activity_last_session ON group_activity(last_session_at);
+
+-- Vocabulary size
+
+CREATE TRIGGER IF NOT EXISTS trg_words_stats_insert AFTER INSERT ON words
+BEGIN
+  UPDATE study_stats SET total_vocabulary = total_vocabulary + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_stats_delete AFTER DELETE ON words
+BEGIN
+  UPDATE study_stats SET total_vocabulary = total_vocabulary - 1 WHERE id = 1;
+END;
+
+-- Review totals, words studied and mastered words
+
+CREATE TRIGGER IF NOT EXISTS trg_word_review_items_stats_insert AFTER INSERT ON word_review_items
+WHEN EXISTS (SELECT 1 FROM study_sessions WHERE id = NEW.study_session_id)
+BEGIN
+  -- Take the word out of the mastered total; it is added back below if still mastered
+  UPDATE study_stats SET
+    mastered_words = mastered_words - COALESCE((SELECT mastered FROM word_review_stats WHERE word_id = NEW.word_id), 0),
+    words_studied = words_studied + NOT EXISTS (SELECT 1 FROM word_review_stats WHERE word_id = NEW.word_id),
+    total_reviews = total_reviews + 1,
+    correct_reviews = correct_reviews + (NEW.correct = 1)
+  WHERE id = 1;
+
+  INSERT INTO word_review_stats (word_id, attempts, correct) VALUES (NEW.word_id, 1, NEW.correct = 1)
+  ON CONFLICT(word_id) DO UPDATE SET attempts = attempts + 1, correct = correct + excluded.correct;
+
+  UPDATE word_review_stats
+  SET mastered = (attempts >= 5 AND correct * 1.0 / attempts >= 0.8)
+  WHERE word_id = NEW.word_id;
+
+  UPDATE study_stats
+  SET mastered_words = mastered_words + (SELECT mastered FROM word_review_stats WHERE word_id = NEW.word_id)
+  WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_review_items_stats_delete AFTER DELETE ON word_review_items
+WHEN EXISTS (SELECT 1 FROM study_sessions WHERE id = OLD.study_session_id)
+BEGIN
+  UPDATE study_stats SET
+    mastered_words = mastered_words - COALESCE((SELECT mastered FROM word_review_stats WHERE word_id = OLD.word_id), 0),
+    total_reviews = total_reviews - 1,
+    correct_reviews = correct_reviews - (OLD.correct = 1)
+  WHERE id = 1;
+
+  UPDATE word_review_stats
+  SET attempts = attempts - 1, correct = correct - (OLD.correct = 1)
+  WHERE word_id = OLD.word_id;
+
+  UPDATE word_review_stats
+  SET mastered = (attempts >= 5 AND correct * 1.0 / attempts >= 0.8)
+  WHERE word_id = OLD.word_id;
+
+  UPDATE study_stats SET
+    mastered_words = mastered_words + COALESCE((SELECT mastered FROM word_review_stats WHERE word_id = OLD.word_id), 0),
+    words_studied = words_studied - EXISTS (SELECT 1 FROM word_review_stats WHERE word_id = OLD.word_id AND attempts = 0)
+  WHERE id = 1;
+
+  DELETE FROM word_review_stats WHERE word_id = OLD.word_id AND attempts = 0;
+END;
+
+-- Sessions, study days (for the streak) and active groups
+
+CREATE TRIGGER IF NOT EXISTS trg_study_sessions_stats_insert AFTER INSERT ON study_sessions
+BEGIN
+  -- A new study day links up with the day before and the day after it
+  UPDATE study_stats SET
+    total_sessions = total_sessions + 1,
+    study_days = study_days + NOT EXISTS (SELECT 1 FROM study_days WHERE day = date(NEW.created_at)),
+    consecutive_days = consecutive_days + CASE
+      WHEN EXISTS (SELECT 1 FROM study_days WHERE day = date(NEW.created_at)) THEN 0
+      ELSE EXISTS (SELECT 1 FROM study_days WHERE day = date(NEW.created_at, '-1 day'))
+         + EXISTS (SELECT 1 FROM study_days WHERE day = date(NEW.created_at, '+1 day'))
+    END
+  WHERE id = 1;
+
+  INSERT INTO study_days (day, sessions) VALUES (date(NEW.created_at), 1)
+  ON CONFLICT(day) DO UPDATE SET sessions = sessions + 1;
+
+  INSERT INTO group_activity (group_id, last_session_at) VALUES (NEW.group_id, NEW.created_at)
+  ON CONFLICT(group_id) DO UPDATE SET last_session_at = MAX(last_session_at, excluded.last_session_at);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_study_sessions_stats_delete AFTER DELETE ON study_sessions
+BEGIN
+  UPDATE study_days SET sessions = sessions - 1 WHERE day = date(OLD.created_at);
+
+  UPDATE study_stats SET
+    total_sessions = total_sessions - 1,
+    study_days = study_days - EXISTS (SELECT 1 FROM study_days WHERE day = date(OLD.created_at) AND sessions = 0),
+    consecutive_days = consecutive_days - CASE
+      WHEN EXISTS (SELECT 1 FROM study_days WHERE day = date(OLD.created_at) AND sessions = 0)
+      THEN EXISTS (SELECT 1 FROM study_days WHERE day = date(OLD.created_at, '-1 day'))
+         + EXISTS (SELECT 1 FROM study_days WHERE day = date(OLD.created_at, '+1 day'))
+      ELSE 0
+    END
+  WHERE id = 1;
+
+  DELETE FROM study_days WHERE day = date(OLD.created_at) AND sessions = 0;
+
+  UPDATE group_activity
+  SET last_session_at = (SELECT MAX(created_at) FROM study_sessions WHERE group_id = OLD.group_id)
+  WHERE group_id = OLD.group_id;
+
+  DELETE FROM group_activity WHERE group_id = OLD.group_id AND last_session_at IS NULL;
+END;
+
+-- Populate them from the existing data
+DELETE FROM word_review_stats;
+INSERT INTO word_review_stats (word_id, attempts, correct, mastered)
+SELECT
+  word_id,
+  COUNT(*),
+  SUM(correct = 1),
+  COUNT(*) >= 5 AND SUM(correct = 1) * 1.0 / COUNT(*) >= 0.8
+FROM word_review_items wri
+JOIN study_sessions ss ON wri.study_session_id = ss.id
+GROUP BY word_id;
+
+DELETE FROM study_days;
+INSERT INTO study_days (day, sessions)
+SELECT date(created_at), COUNT(*)
+FROM study_sessions
+GROUP BY date(created_at);
+
+DELETE FROM group_activity;
+INSERT INTO group_activity (group_id, last_session_at)
+SELECT group_id, MAX(created_at)
+FROM study_sessions
+GROUP BY group_id;
+
+INSERT OR IGNORE INTO study_stats (id) VALUES (1);
+UPDATE study_stats SET
+  total_vocabulary = (SELECT COUNT(*) FROM words),
+  total_sessions = (SELECT COUNT(*) FROM study_sessions),
+  total_reviews = (SELECT COALESCE(SUM(attempts), 0) FROM word_review_stats),
+  correct_reviews = (SELECT COALESCE(SUM(correct), 0) FROM word_review_stats),
+  words_studied = (SELECT COUNT(*) FROM word_review_stats),
+  mastered_words = (SELECT COUNT(*) FROM word_review_stats WHERE mastered),
+  study_days = (SELECT COUNT(*) FROM study_days),
+  consecutive_days = (
+    SELECT COUNT(*)
+    FROM study_days d
+    WHERE EXISTS (SELECT 1 FROM study_days p WHERE p.day = date(d.day, '-1 day'))
+  )
+WHERE id = 1;
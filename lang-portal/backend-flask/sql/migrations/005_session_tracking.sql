@@ -0,0 +1,60 @@
+-- Track review counters, end time and duration on each study session
+
+ALTER TABLE study_sessions ADD COLUMN review_items_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE study_sessions ADD COLUMN correct_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE study_sessions ADD COLUMN last_activity_at DATETIME;
+ALTER TABLE study_sessions ADD COLUMN ended_at DATETIME;
+ALTER TABLE study_sessions ADD COLUMN duration_ms INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE study_sessions ADD COLUMN closed_at DATETIME;
+
+UPDATE study_sessions SET
+  review_items_count = (SELECT COUNT(*) FROM word_review_items WHERE study_session_id = study_sessions.id),
+  correct_count = (SELECT COUNT(*) FROM word_review_items WHERE study_session_id = study_sessions.id AND correct = 1),
+  last_activity_at = (SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = study_sessions.id),
+  ended_at = (SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = study_sessions.id);
+
+UPDATE study_sessions
+SET duration_ms = COALESCE(MAX(0, CAST(ROUND((julianday(ended_at) - julianday(created_at)) * 86400000) AS INTEGER)), 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_word_review_items_session_insert AFTER INSERT ON word_review_items
+BEGIN
+  UPDATE study_sessions SET
+    review_items_count = review_items_count + 1,
+    correct_count = correct_count + (NEW.correct = 1),
+    last_activity_at = MAX(COALESCE(last_activity_at, NEW.created_at), NEW.created_at),
+    ended_at = CASE
+      WHEN closed_at IS NULL THEN MAX(COALESCE(last_activity_at, NEW.created_at), NEW.created_at)
+      ELSE ended_at
+    END
+  WHERE id = NEW.study_session_id;
+
+  UPDATE study_sessions
+  SET duration_ms = MAX(0, CAST(ROUND((julianday(ended_at) - julianday(created_at)) * 86400000) AS INTEGER))
+  WHERE id = NEW.study_session_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_review_items_session_delete AFTER DELETE ON word_review_items
+BEGIN
+  UPDATE study_sessions SET
+    review_items_count = review_items_count - 1,
+    correct_count = correct_count - (OLD.correct = 1),
+    last_activity_at = (
+      SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = OLD.study_session_id
+    )
+  WHERE id = OLD.study_session_id;
+
+  UPDATE study_sessions SET
+    ended_at = CASE WHEN closed_at IS NULL THEN last_activity_at ELSE ended_at END
+  WHERE id = OLD.study_session_id;
+
+  UPDATE study_sessions
+  SET duration_ms = COALESCE(MAX(0, CAST(ROUND((julianday(ended_at) - julianday(created_at)) * 86400000) AS INTEGER)), 0)
+  WHERE id = OLD.study_session_id;
+END;
+
+-- Group session listings sorted by review count or by last activity
+-- (sessions without reviews sort as '')
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_reviews ON study_sessions(group_id, review_items_count);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_activity ON study_sessions(group_id, COALESCE(last_activity_at, ''));
+
+ANALYZE;
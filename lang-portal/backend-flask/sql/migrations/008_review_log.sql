@@ -0,0 +1,6 @@
+-- Checkpoint of the write-behind review log
+
+CREATE TABLE IF NOT EXISTS review_log_checkpoint (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  seq INTEGER NOT NULL
+);
@@ -0,0 +1,21 @@
+-- Keep groups.words_count up to date with triggers on word_groups
+
+CREATE TRIGGER IF NOT EXISTS trg_word_groups_count_insert AFTER INSERT ON word_groups
+BEGIN
+  UPDATE groups SET words_count = COALESCE(words_count, 0) + 1 WHERE id = NEW.group_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_groups_count_delete AFTER DELETE ON word_groups
+BEGIN
+  UPDATE groups SET words_count = COALESCE(words_count, 0) - 1 WHERE id = OLD.group_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_groups_count_update AFTER UPDATE OF group_id ON word_groups
+WHEN NEW.group_id IS NOT OLD.group_id
+BEGIN
+  UPDATE groups SET words_count = COALESCE(words_count, 0) - 1 WHERE id = OLD.group_id;
+  UPDATE groups SET words_count = COALESCE(words_count, 0) + 1 WHERE id = NEW.group_id;
+END;
+
+-- Start from an exact count
+UPDATE groups SET words_count = (SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id);
@@ -0,0 +1,27 @@
+-- Daily review rollups for compacted review items
+
+CREATE TABLE IF NOT EXISTS word_review_daily (
+  word_id INTEGER NOT NULL,
+  day DATE NOT NULL,  -- date(created_at) of the rolled up review items
+  correct INTEGER NOT NULL DEFAULT 0,
+  wrong INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (word_id, day),
+  FOREIGN KEY (word_id) REFERENCES words(id)
+) WITHOUT ROWID;
+
+-- Compaction picks the oldest review items first
+CREATE INDEX IF NOT EXISTS idx_word_review_items_created ON word_review_items(created_at);
+
+-- Per word and day review totals over the rollups and the recent review
+-- items. Like the dashboard statistics, only reviews of existing study
+-- sessions count.
+CREATE VIEW IF NOT EXISTS word_review_days AS
+SELECT word_id, day, SUM(correct) AS correct, SUM(wrong) AS wrong
+FROM (
+  SELECT word_id, day, correct, wrong FROM word_review_daily
+  UNION ALL
+  SELECT wri.word_id, date(wri.created_at), wri.correct = 1, wri.correct != 1
+  FROM word_review_items wri
+  JOIN study_sessions ss ON ss.id = wri.study_session_id
+)
+GROUP BY word_id, day;
@@ -0,0 +1,45 @@
+-- Distractor index for quizzes; existing words are queued for indexing
+
+CREATE TABLE IF NOT EXISTS word_features (
+  feature TEXT NOT NULL,
+  word_id INTEGER NOT NULL,
+  PRIMARY KEY (feature, word_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_word_features_word ON word_features(word_id);
+
+CREATE TABLE IF NOT EXISTS word_neighbours (
+  word_id INTEGER NOT NULL,
+  neighbour_id INTEGER NOT NULL,
+  score INTEGER NOT NULL,
+  PRIMARY KEY (word_id, neighbour_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_word_neighbours_neighbour ON word_neighbours(neighbour_id);
+
+-- Words waiting to be (re)indexed
+CREATE TABLE IF NOT EXISTS word_neighbour_queue (
+  word_id INTEGER PRIMARY KEY
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_words_neighbours_insert AFTER INSERT ON words
+BEGIN
+  INSERT OR IGNORE INTO word_neighbour_queue (word_id) VALUES (NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_neighbours_update AFTER UPDATE OF jiantizi, pinyin, english ON words
+BEGIN
+  DELETE FROM word_features WHERE word_id = OLD.id;
+  DELETE FROM word_neighbours WHERE word_id = OLD.id OR neighbour_id = OLD.id;
+  INSERT OR IGNORE INTO word_neighbour_queue (word_id) VALUES (NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_neighbours_delete AFTER DELETE ON words
+BEGIN
+  DELETE FROM word_features WHERE word_id = OLD.id;
+  DELETE FROM word_neighbours WHERE word_id = OLD.id OR neighbour_id = OLD.id;
+  DELETE FROM word_neighbour_queue WHERE word_id = OLD.id;
+END;
+
+-- Queue every existing word (invoke build-distractors indexes them)
+INSERT OR IGNORE INTO word_neighbour_queue (word_id) SELECT id FROM words;
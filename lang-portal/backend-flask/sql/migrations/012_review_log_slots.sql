@@ -0,0 +1,11 @@
+-- One review log checkpoint per log slot: every process writes its own
+-- log (lib/review_buffer.py) and checkpoints it under id = slot + 1, so
+-- the single-row CHECK goes. SQLite cannot drop a constraint in place.
+
+CREATE TABLE review_log_checkpoint_slots (
+  id INTEGER PRIMARY KEY,
+  seq INTEGER NOT NULL
+);
+INSERT INTO review_log_checkpoint_slots (id, seq) SELECT id, seq FROM review_log_checkpoint;
+DROP TABLE review_log_checkpoint;
+ALTER TABLE review_log_checkpoint_slots RENAME TO review_log_checkpoint;
@@ -0,0 +1,20 @@
+-- groups.words_count, the counter cache behind the /groups listing and its
+-- words_count sort, kept exact by triggers as word_groups changes.
+-- lib/membership.py can verify it against a recount and repair drift.
+
+CREATE TRIGGER IF NOT EXISTS trg_word_groups_count_insert AFTER INSERT ON word_groups
+BEGIN
+  UPDATE groups SET words_count = COALESCE(words_count, 0) + 1 WHERE id = NEW.group_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_groups_count_delete AFTER DELETE ON word_groups
+BEGIN
+  UPDATE groups SET words_count = COALESCE(words_count, 0) - 1 WHERE id = OLD.group_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_groups_count_update AFTER UPDATE OF group_id ON word_groups
+WHEN NEW.group_id IS NOT OLD.group_id
+BEGIN
+  UPDATE groups SET words_count = COALESCE(words_count, 0) - 1 WHERE id = OLD.group_id;
+  UPDATE groups SET words_count = COALESCE(words_count, 0) + 1 WHERE id = NEW.group_id;
+END;
@@ -0,0 +1,27 @@
+-- Indexes backing the joins, filters and sort orders used in routes/
+
+-- Word listing sort orders (also used as seek keys for cursor pagination)
+CREATE INDEX IF NOT EXISTS idx_words_jiantizi ON words(jiantizi);
+CREATE INDEX IF NOT EXISTS idx_words_pinyin ON words(pinyin);
+CREATE INDEX IF NOT EXISTS idx_words_english ON words(english);
+
+-- Group listing sort orders
+CREATE INDEX IF NOT EXISTS idx_groups_name ON groups(name);
+CREATE INDEX IF NOT EXISTS idx_groups_words_count ON groups(words_count);
+
+-- Group membership in both directions
+CREATE INDEX IF NOT EXISTS idx_word_groups_group_word ON word_groups(group_id, word_id);
+CREATE INDEX IF NOT EXISTS idx_word_groups_word_group ON word_groups(word_id, group_id);
+
+-- One counter row per word
+CREATE UNIQUE INDEX IF NOT EXISTS idx_word_reviews_word_id ON word_reviews(word_id);
+
+-- Per-session review lookups (covers COUNT and MAX(created_at) per session)
+CREATE INDEX IF NOT EXISTS idx_word_review_items_session ON word_review_items(study_session_id, created_at);
+-- Per-word review statistics (covers the dashboard aggregates)
+CREATE INDEX IF NOT EXISTS idx_word_review_items_word ON word_review_items(word_id, study_session_id, correct);
+
+-- Session listings by group, by activity and by recency
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_created ON study_sessions(group_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_activity_created ON study_sessions(study_activity_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_created ON study_sessions(created_at, group_id);
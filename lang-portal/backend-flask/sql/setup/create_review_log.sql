@@ -0,0 +1,8 @@
+-- Last review log entry written to the database (lib/review_buffer.py),
+-- one row per log slot (id = slot + 1). Updated in the same transaction
+-- as the reviews, so replaying the log after a crash skips the entries
+-- that were already committed.
+CREATE TABLE IF NOT EXISTS review_log_checkpoint (
+  id INTEGER PRIMARY KEY,
+  seq INTEGER NOT NULL
+);
@@ -0,0 +1,44 @@
+-- Per-session review counters, end time and duration, kept up to date by
+-- triggers as review items arrive. An open session ends at its latest
+-- review item; closing it fixes ended_at.
+
+CREATE TRIGGER IF NOT EXISTS trg_word_review_items_session_insert AFTER INSERT ON word_review_items
+BEGIN
+  UPDATE study_sessions SET
+    review_items_count = review_items_count + 1,
+    correct_count = correct_count + (NEW.correct = 1),
+    last_activity_at = MAX(COALESCE(last_activity_at, NEW.created_at), NEW.created_at),
+    ended_at = CASE
+      WHEN closed_at IS NULL THEN MAX(COALESCE(last_activity_at, NEW.created_at), NEW.created_at)
+      ELSE ended_at
+    END
+  WHERE id = NEW.study_session_id;
+
+  UPDATE study_sessions
+  SET duration_ms = MAX(0, CAST(ROUND((julianday(ended_at) - julianday(created_at)) * 86400000) AS INTEGER))
+  WHERE id = NEW.study_session_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_review_items_session_delete AFTER DELETE ON word_review_items
+BEGIN
+  UPDATE study_sessions SET
+    review_items_count = review_items_count - 1,
+    correct_count = correct_count - (OLD.correct = 1),
+    last_activity_at = (
+      SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = OLD.study_session_id
+    )
+  WHERE id = OLD.study_session_id;
+
+  UPDATE study_sessions SET
+    ended_at = CASE WHEN closed_at IS NULL THEN last_activity_at ELSE ended_at END
+  WHERE id = OLD.study_session_id;
+
+  UPDATE study_sessions
+  SET duration_ms = COALESCE(MAX(0, CAST(ROUND((julianday(ended_at) - julianday(created_at)) * 86400000) AS INTEGER)), 0)
+  WHERE id = OLD.study_session_id;
+END;
+
+-- Group session listings sorted by review count or by last activity
+-- (sessions without reviews sort as '')
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_reviews ON study_sessions(group_id, review_items_count);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_activity ON study_sessions(group_id, COALESCE(last_activity_at, ''));
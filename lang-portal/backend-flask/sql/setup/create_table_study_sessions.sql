@@ -3,6 +3,12 @@ CREATE TABLE IF NOT EXISTS study_sessions (
   group_id INTEGER NOT NULL,  -- The group of words being studied
   study_activity_id INTEGER NOT NULL,  -- The activity performed
   created_at DATETIME DEFAULT CURRENT_TIMESTAMP,  -- Timestamp of the session
+  review_items_count INTEGER NOT NULL DEFAULT 0,  -- Maintained by the session tracking triggers
+  correct_count INTEGER NOT NULL DEFAULT 0,
+  last_activity_at DATETIME,  -- Timestamp of the latest review item
+  ended_at DATETIME,  -- Latest review item, or the time the session was closed
+  duration_ms INTEGER NOT NULL DEFAULT 0,  -- ended_at - created_at
+  closed_at DATETIME,  -- Set by POST /api/study-sessions/:id/close
   FOREIGN KEY (group_id) REFERENCES groups(id),
   FOREIGN KEY (study_activity_id) REFERENCES study_activities(id)
 );
\ No newline at end of file
@@ -0,0 +1,13 @@
+CREATE TABLE IF NOT EXISTS word_schedules (
+  word_id INTEGER PRIMARY KEY,  -- One spaced-repetition schedule per word
+  ease REAL NOT NULL DEFAULT 2.5,  -- SM-2 ease factor
+  interval_days REAL NOT NULL DEFAULT 0,  -- Days between the last review and due_at
+  repetitions INTEGER NOT NULL DEFAULT 0,  -- Correct reviews in a row
+  lapses INTEGER NOT NULL DEFAULT 0,  -- Times the word was forgotten
+  due_at DATETIME NOT NULL,  -- When the word should be reviewed next
+  last_reviewed_at DATETIME,
+  FOREIGN KEY (word_id) REFERENCES words(id)
+);
+
+-- Due queue: the next words to review, oldest due first
+CREATE INDEX IF NOT EXISTS idx_word_schedules_due ON word_schedules(due_at, word_id);
\ No newline at end of file
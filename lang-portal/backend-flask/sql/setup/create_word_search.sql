@@ -0,0 +1,67 @@
+-- Full-text word search (see routes/words.py, GET /words/search).
+--
+-- words_fts indexes pinyin and english; remove_diacritics strips the tone
+-- marks and porter stems the English. words_fts_cjk indexes jiantizi as
+-- trigrams for substring queries of three or more characters, and
+-- word_characters maps each of the first 16 characters of a word to the
+-- word for one and two character queries. All three are kept in sync with
+-- words by the triggers below.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS words_fts USING fts5(
+  pinyin,
+  english,
+  content='words',
+  content_rowid='id',
+  tokenize='porter unicode61 remove_diacritics 2'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS words_fts_cjk USING fts5(
+  jiantizi,
+  content='words',
+  content_rowid='id',
+  tokenize='trigram'
+);
+
+CREATE TABLE IF NOT EXISTS word_characters (
+  character TEXT NOT NULL,
+  word_id INTEGER NOT NULL,
+  PRIMARY KEY (character, word_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_search_insert AFTER INSERT ON words
+BEGIN
+  INSERT INTO words_fts (rowid, pinyin, english) VALUES (NEW.id, NEW.pinyin, NEW.english);
+  INSERT INTO words_fts_cjk (rowid, jiantizi) VALUES (NEW.id, NEW.jiantizi);
+  INSERT OR IGNORE INTO word_characters (character, word_id)
+  SELECT substr(NEW.jiantizi, p.column1, 1), NEW.id
+  FROM (VALUES (1), (2), (3), (4), (5), (6), (7), (8), (9), (10), (11), (12), (13), (14), (15), (16)) p
+  WHERE p.column1 <= length(NEW.jiantizi);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_search_delete AFTER DELETE ON words
+BEGIN
+  INSERT INTO words_fts (words_fts, rowid, pinyin, english) VALUES ('delete', OLD.id, OLD.pinyin, OLD.english);
+  INSERT INTO words_fts_cjk (words_fts_cjk, rowid, jiantizi) VALUES ('delete', OLD.id, OLD.jiantizi);
+  DELETE FROM word_characters
+  WHERE word_id = OLD.id AND character IN (
+    SELECT substr(OLD.jiantizi, p.column1, 1)
+    FROM (VALUES (1), (2), (3), (4), (5), (6), (7), (8), (9), (10), (11), (12), (13), (14), (15), (16)) p
+  );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_search_update AFTER UPDATE OF jiantizi, pinyin, english ON words
+BEGIN
+  INSERT INTO words_fts (words_fts, rowid, pinyin, english) VALUES ('delete', OLD.id, OLD.pinyin, OLD.english);
+  INSERT INTO words_fts_cjk (words_fts_cjk, rowid, jiantizi) VALUES ('delete', OLD.id, OLD.jiantizi);
+  DELETE FROM word_characters
+  WHERE word_id = OLD.id AND character IN (
+    SELECT substr(OLD.jiantizi, p.column1, 1)
+    FROM (VALUES (1), (2), (3), (4), (5), (6), (7), (8), (9), (10), (11), (12), (13), (14), (15), (16)) p
+  );
+  INSERT INTO words_fts (rowid, pinyin, english) VALUES (NEW.id, NEW.pinyin, NEW.english);
+  INSERT INTO words_fts_cjk (rowid, jiantizi) VALUES (NEW.id, NEW.jiantizi);
+  INSERT OR IGNORE INTO word_characters (character, word_id)
+  SELECT substr(NEW.jiantizi, p.column1, 1), NEW.id
+  FROM (VALUES (1), (2), (3), (4), (5), (6), (7), (8), (9), (10), (11), (12), (13), (14), (15), (16)) p
+  WHERE p.column1 <= length(NEW.jiantizi);
+END;
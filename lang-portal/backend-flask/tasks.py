@@ -1,9 +1,107 @@
 from invoke import task
 from lib.db import db
+from lib import importer
 
 @task
 def init_db(c):
   from flask import Flask
   app = Flask(__name__)
   db.init(app)
-  print("Database initialized successfully.")
\ No newline at end of file
+  print("Database initialized successfully.")
+
+@task(help={
+  'path': "JSON, NDJSON or CSV file of words (jiantizi, pinyin, english, parts)",
+  'group': "Group to link the imported words to",
+  'format': "json, ndjson or csv (guessed from the file extension by default)",
+  'batch_size': "Rows per executemany batch"
+})
+def import_words(c, path, group=None, format=None, batch_size=importer.DEFAULT_BATCH_SIZE):
+  """Bulk import a vocabulary file in a single transaction."""
+  from flask import Flask
+  app = Flask(__name__)
+  with app.app_context():
+    with open(path, 'r', encoding='utf-8-sig', newline='') as file:
+      report = importer.import_words(
+        db.get(),
+        importer.read_records(file, format or importer.detect_format(path)),
+        group_name=group,
+        batch_size=int(batch_size)
+      )
+    db.close()
+  print(f"Read {report['read']} words: {report['inserted']} inserted, "
+        f"{report['duplicates']} duplicates, {report['rejected']} rejected, "
+        f"{report['linked']} linked to {group or 'no group'} "
+        f"in {report['seconds']}s ({report['words_per_second']} words/s), "
+        f"indexed for quizzes in {report['index_seconds']}s.")
+
+@task
+def rebuild_stats(c, check=False):
+  """Recompute the dashboard statistics, or only compare them with --check."""
+  from flask import Flask
+  from lib import stats
+  app = Flask(__name__)
+  with app.app_context():
+    cursor = db.cursor()
+    if not check:
+      stats.rebuild_stats(cursor)
+      print("Dashboard statistics rebuilt.")
+    mismatches = stats.verify_stats(cursor)
+    for key, (materialized, computed) in mismatches.items():
+      print(f"{key}: materialized={materialized} computed={computed}")
+    if not mismatches:
+      print("Dashboard statistics are consistent.")
+    db.close()
+
+@task
+def repair_group_counts(c, check=False):
+  """Fix groups.words_count where it drifted from word_groups, or only report it with --check."""
+  from flask import Flask
+  from lib import membership
+  app = Flask(__name__)
+  with app.app_context():
+    if check:
+      mismatches = membership.verify_counts(db.cursor())
+    else:
+      mismatches = membership.repair_counts(db.get())
+    for group_id, (stored, counted) in mismatches.items():
+      print(f"group {group_id}: words_count={stored} counted={counted}")
+    if not mismatches:
+      print("Group word counts are consistent.")
+    elif not check:
+      print(f"Repaired {len(mismatches)} group word counts.")
+    db.close()
+
+@task(help={
+  'days': "Keep review items of the last N days (REVIEW_RETENTION_DAYS by default)",
+  'archive': "SQLite file to copy the compacted review items into"
+})
+def compact_reviews(c, days=None, archive=None):
+  """Roll review items older than the retention horizon up into daily totals."""
+  from flask import Flask
+  from lib import compaction
+  app = Flask(__name__)
+  with app.app_context():
+    report = compaction.compact_reviews(
+      db.get(),
+      days=int(days) if days is not None else compaction.DEFAULT_RETENTION_DAYS,
+      archive_path=archive
+    )
+    db.close()
+  print(f"Compacted {report['compacted']} review items before {report['cutoff']} "
+        f"into {report['daily_rows']} daily rows ({report['archived']} archived) "
+        f"in {report['seconds']}s.")
+
+@task
+def build_distractors(c, pending=False):
+  """Rebuild the quiz distractor index, or only index the queued words with --pending."""
+  from flask import Flask
+  from lib import distractors
+  app = Flask(__name__)
+  with app.app_context():
+    if pending:
+      report = distractors.refresh(db.get())
+      print(f"Indexed {report['words']} queued words in {report['seconds']}s.")
+    else:
+      report = distractors.build_index(db.get())
+      print(f"Indexed {report['words']} words with {report['neighbours']} neighbours in {report['seconds']}s.")
+    db.close()
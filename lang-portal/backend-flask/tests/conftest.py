@@ -35,9 +35,12 @@ def app():
 
     yield test_app
 
-    # Clean up the temporary file
+    # Clean up the temporary file and its WAL side files
+    test_app.db.dispose()
     os.close(db_fd)
-    os.unlink(db_path)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.unlink(db_path + suffix)
 
 @pytest.fixture
 def client(app):
@@ -47,4 +50,28 @@ def client(app):
 @pytest.fixture
 def runner(app):
     """A test CLI runner for the app."""
-    return app.test_cli_runner() 
\ No newline at end of file
+    return app.test_cli_runner() 
+
+@pytest.fixture
+def portal_app():
+    """An app with the full sql/setup schema and every route registered."""
+    db_fd, db_path = tempfile.mkstemp()
+    # Leaving TESTING unset at creation registers the real routes
+    test_app = create_app({'DATABASE': db_path})
+    test_app.testing = True
+
+    with test_app.app_context():
+        test_app.db.setup_tables(test_app.db.cursor())
+
+    yield test_app
+
+    test_app.db.dispose()
+    os.close(db_fd)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.unlink(db_path + suffix)
+
+@pytest.fixture
+def portal_client(portal_app):
+    """A test client for the fully routed app."""
+    return portal_app.test_client()
@@ -0,0 +1,70 @@
+# Test the trigger-maintained dashboard statistics against a full recount
+
+import random
+from lib import stats
+
+def seed(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute("INSERT INTO study_activities (name, url) VALUES ('Typing Tutor', 'http://localhost:8080')")
+        cursor.execute("INSERT INTO groups (name) VALUES ('Core Verbs'), ('Core Adjectives')")
+        for i in range(8):
+            cursor.execute('''
+                INSERT INTO words (jiantizi, pinyin, english, parts) VALUES (?, ?, ?, '[]')
+            ''', (f'字{i}', f'zi{i}', f'word {i}'))
+        app.db.commit()
+
+def record_history(client):
+    rng = random.Random(7)
+    for day in (1, 2, 3, 5, 5, 9):
+        response = client.post('/api/study-sessions', json={
+            'group_id': day % 2 + 1,
+            'study_activity_id': 1,
+            'created_at': f'2025-01-{day:02d} 10:00:00'
+        })
+        session_id = response.get_json()['id']
+        for _ in range(12):
+            client.post(f'/api/study-sessions/{session_id}/review', json={
+                'word_id': rng.randint(1, 8),
+                'correct': rng.random() < 0.85
+            })
+
+def check(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        assert stats.verify_stats(cursor) == {}
+        return stats.read_stats(cursor)
+
+def test_stats_follow_sessions_and_reviews(portal_app, portal_client):
+    seed(portal_app)
+    record_history(portal_client)
+
+    result = check(portal_app)
+    assert result['total_vocabulary'] == 8
+    assert result['total_sessions'] == 6
+    assert result['current_streak'] == 3
+    assert portal_client.get('/dashboard/stats').get_json() == result
+
+def test_stats_follow_reset(portal_app, portal_client):
+    seed(portal_app)
+    record_history(portal_client)
+    portal_client.post('/api/study-sessions/reset')
+
+    result = check(portal_app)
+    assert result['total_sessions'] == 0
+    assert result['total_words_studied'] == 0
+    assert result['mastered_words'] == 0
+    assert result['current_streak'] == 0
+
+def test_rebuild_repairs_drift(portal_app, portal_client):
+    seed(portal_app)
+    record_history(portal_client)
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        cursor.execute('UPDATE study_stats SET mastered_words = 99, total_reviews = 1')
+        portal_app.db.commit()
+        assert set(stats.verify_stats(cursor)) >= {'mastered_words', 'success_rate'}
+
+    assert portal_client.get('/api/admin/stats/verify').get_json()['consistent'] is False
+    portal_client.post('/api/admin/stats/rebuild')
+    assert portal_client.get('/api/admin/stats/verify').get_json()['consistent'] is True
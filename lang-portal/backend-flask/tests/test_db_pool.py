@@ -0,0 +1,69 @@
+# Test the pooled, WAL-mode connection manager behind Db
+
+import os
+import tempfile
+import pytest
+from lib.pool import ConnectionPool, PoolTimeout
+
+@pytest.fixture
+def db_path():
+    db_fd, path = tempfile.mkstemp()
+    yield path
+    os.close(db_fd)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+
+def test_pool_reuses_connections(db_path):
+    pool = ConnectionPool(db_path, max_size=2)
+    first = pool.acquire()
+    pool.release(first)
+    second = pool.acquire()
+    assert second is first
+
+    stats = pool.stats()
+    assert stats['created'] == 1
+    assert stats['reused'] == 1
+    assert stats['in_use'] == 1
+    pool.close()
+
+def test_pool_applies_pragmas(db_path):
+    pool = ConnectionPool(db_path, pragmas={'busy_timeout': 1234})
+    conn = pool.acquire()
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == 1234
+    assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+    pool.release(conn)
+    pool.close()
+
+def test_readers_are_not_blocked_by_writer(db_path):
+    pool = ConnectionPool(db_path, max_size=2)
+    writer = pool.acquire()
+    writer.execute('CREATE TABLE words (id INTEGER PRIMARY KEY, jiantizi TEXT)')
+    writer.commit()
+
+    # Hold an open write transaction while another connection reads
+    writer.execute('INSERT INTO words (jiantizi) VALUES (?)', ('你好',))
+    reader = pool.acquire()
+    assert reader.execute('SELECT COUNT(*) FROM words').fetchone()[0] == 0
+
+    # Releasing rolls back the unfinished transaction
+    pool.release(writer)
+    assert reader.execute('SELECT COUNT(*) FROM words').fetchone()[0] == 0
+    pool.release(reader)
+    pool.close()
+
+def test_pool_times_out_when_exhausted(db_path):
+    pool = ConnectionPool(db_path, max_size=1, timeout=0.05)
+    conn = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+    pool.release(conn)
+    pool.close()
+
+def test_app_returns_connection_on_teardown(app):
+    with app.app_context():
+        app.db.cursor().execute('SELECT 1')
+        assert app.db.pool_stats()['in_use'] == 1
+    assert app.db.pool_stats()['in_use'] == 0
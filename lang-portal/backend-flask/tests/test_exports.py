@@ -0,0 +1,105 @@
+# Test the streaming NDJSON / CSV exports
+
+import csv
+import gzip
+import io
+import json
+from lib import exports
+
+def seed(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute("INSERT INTO study_activities (name, url) VALUES ('Typing Tutor', 'http://localhost:8080')")
+        cursor.execute("INSERT INTO study_activities (name, url) VALUES ('Flashcards', 'http://localhost:8081')")
+        cursor.execute("INSERT INTO groups (name) VALUES ('Core Verbs')")
+        cursor.execute("INSERT INTO groups (name) VALUES ('HSK 1')")
+        for i in range(5):
+            cursor.execute("INSERT INTO words (jiantizi, pinyin, english, parts) VALUES (?, ?, ?, ?)",
+                           (f'字{i}', f'zi{i}', f'word {i}', json.dumps([{'jiantizi': f'字{i}'}])))
+        cursor.executemany('INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)', [(1, 1), (2, 1), (3, 2)])
+        cursor.execute("INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (1, 1, '2025-01-01 10:00:00')")
+        cursor.execute("INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (2, 2, '2025-01-02 10:00:00')")
+        cursor.execute("INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (1, 2, '2025-01-03 10:00:00')")
+        cursor.executemany('''
+            INSERT INTO word_review_items (word_id, study_session_id, correct, created_at) VALUES (?, ?, ?, ?)
+        ''', [
+            (1, 1, 1, '2025-01-01 10:01:00'), (2, 1, 0, '2025-01-01 10:02:00'),
+            (3, 2, 1, '2025-01-02 10:01:00'),
+            (1, 3, 1, '2025-01-03 10:01:00'), (2, 3, 1, '2025-01-01 09:00:00'),
+        ])
+        app.db.commit()
+
+def ndjson(response):
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+def test_words_export(portal_app, portal_client):
+    seed(portal_app)
+    portal_client.post('/api/study-sessions/1/review', json={'word_id': 1, 'correct': False})
+    words = ndjson(portal_client.get('/api/export/words'))
+    assert [word['id'] for word in words] == [1, 2, 3, 4, 5]
+    assert words[0] == {'id': 1, 'jiantizi': '字0', 'pinyin': 'zi0', 'english': 'word 0',
+                        'parts': [{'jiantizi': '字0'}], 'correct_count': 0, 'wrong_count': 1}
+
+    words = ndjson(portal_client.get('/api/export/words?group_id=1'))
+    assert [word['id'] for word in words] == [1, 2]
+
+def test_sessions_export_as_csv(portal_app, portal_client):
+    seed(portal_app)
+    response = portal_client.get('/api/export/study-sessions?format=csv&since=2025-01-02&activity_id=2')
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename="study-sessions.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [(row['id'], row['created_at'], row['review_items_count']) for row in rows] == [
+        ('2', '2025-01-02 10:00:00', '1'), ('3', '2025-01-03 10:00:00', '2')]
+
+    # Time zones are converted to UTC, as timestamps are stored
+    response = portal_client.get('/api/export/study-sessions?format=csv&until=2025-01-02T11:00:00%2B02:00')
+    assert response.get_data(as_text=True).splitlines()[1:] == [
+        '1,1,1,2025-01-01 10:00:00,2025-01-01 10:02:00,,120000,2,1']
+
+    # No rows still gives the header
+    response = portal_client.get('/api/export/study-sessions?format=csv&group_id=9')
+    assert response.get_data(as_text=True).splitlines() == [
+        'id,group_id,study_activity_id,created_at,ended_at,closed_at,duration_ms,review_items_count,correct_count']
+
+def test_review_items_export(portal_app, portal_client):
+    seed(portal_app)
+    items = ndjson(portal_client.get('/api/export/review-items'))
+    assert [item['created_at'] for item in items] == sorted(item['created_at'] for item in items)
+    assert items[0] == {'id': 5, 'word_id': 2, 'study_session_id': 3, 'correct': True, 'created_at': '2025-01-01 09:00:00'}
+
+    # Filtered by group, the items come session by session
+    items = ndjson(portal_client.get('/api/export/review-items?group_id=1'))
+    assert [item['id'] for item in items] == [1, 2, 5, 4]
+    items = ndjson(portal_client.get('/api/export/review-items?group_id=1&activity_id=2&since=2025-01-02'))
+    assert [item['id'] for item in items] == [4]
+    assert [item['id'] for item in ndjson(portal_client.get('/api/export/review-items?session_id=2'))] == [3]
+
+def test_export_is_streamed_in_batches(portal_app, portal_client, monkeypatch):
+    seed(portal_app)
+    monkeypatch.setattr(exports, 'BATCH_SIZE', 2)
+    response = portal_client.get('/api/export/review-items', buffered=False)
+    chunks = list(response.response)
+    response.close()
+    assert [chunk.count(b'\n') for chunk in chunks] == [2, 2, 1]
+    # The connection went back to the pool with the end of the stream
+    assert portal_app.db.pool_stats()['in_use'] == 0
+
+def test_gzip_export(portal_app, portal_client):
+    seed(portal_app)
+    response = portal_client.get('/api/export/words?format=csv', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    lines = gzip.decompress(response.data).decode('utf-8').splitlines()
+    assert len(lines) == 6
+    assert lines[1].startswith('1,字0,zi0,word 0,')
+
+def test_export_errors(portal_app, portal_client):
+    seed(portal_app)
+    assert portal_client.get('/api/export/groups').status_code == 404
+    assert portal_client.get('/api/export/words?format=xml').status_code == 400
+    assert portal_client.get('/api/export/words?since=2025-01-01').status_code == 400
+    assert portal_client.get('/api/export/review-items?since=yesterday').status_code == 400
+    assert portal_client.get('/api/export/study-sessions?group_id=one').status_code == 400
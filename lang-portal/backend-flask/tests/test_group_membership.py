@@ -0,0 +1,80 @@
+# Test bulk group membership changes and the trigger-maintained groups.words_count
+
+def seed(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute("INSERT INTO groups (name) VALUES ('Core Verbs')")
+        cursor.execute("INSERT INTO groups (name) VALUES ('HSK 1')")
+        for i in range(5):
+            cursor.execute("INSERT INTO words (jiantizi, pinyin, english, parts) VALUES (?, ?, ?, '[]')",
+                           (f'字{i}', f'zi{i}', f'word {i}'))
+        app.db.commit()
+
+def stored_counts(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT id, words_count FROM groups ORDER BY id')
+        return [tuple(row) for row in cursor.fetchall()]
+
+def test_bulk_add_and_remove(portal_app, portal_client):
+    seed(portal_app)
+    response = portal_client.post('/groups/1/words', json={'word_ids': [1, 2, 3, 3, 99]})
+    assert response.status_code == 200
+    assert response.get_json() == {'group_id': 1, 'added': 3, 'already_in_group': 0, 'missing': [99], 'word_count': 3}
+
+    # Adding words already in the group changes nothing
+    response = portal_client.post('/groups/1/words', json=[2, 4])
+    assert (response.get_json()['added'], response.get_json()['already_in_group']) == (1, 1)
+
+    response = portal_client.delete('/groups/1/words', json={'word_ids': [1, 4, 5]})
+    assert response.get_json() == {'group_id': 1, 'removed': 2, 'not_in_group': 1, 'word_count': 2}
+    assert stored_counts(portal_app) == [(1, 2), (2, 0)]
+
+    # The listing, sorted by the counter, sees the change at once
+    groups = portal_client.get('/groups?sort_by=words_count&order=desc').get_json()['groups']
+    assert [(group['group_name'], group['word_count']) for group in groups] == [('Core Verbs', 2), ('HSK 1', 0)]
+
+def test_membership_errors(portal_app, portal_client):
+    seed(portal_app)
+    assert portal_client.post('/groups/9/words', json=[1]).status_code == 404
+    assert portal_client.post('/groups/1/words', json={'ids': [1]}).status_code == 400
+    assert portal_client.post('/groups/1/words', json=['x']).status_code == 400
+    portal_app.config['MAX_WORD_IDS'] = 2
+    assert portal_client.delete('/groups/1/words', json=[1, 2, 3]).status_code == 413
+
+def test_remove_counts_words_linked_twice_once(portal_app, portal_client):
+    seed(portal_app)
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        cursor.executemany('INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)', [(1, 1), (1, 1), (2, 1)])
+        portal_app.db.commit()
+
+    response = portal_client.delete('/groups/1/words', json={'word_ids': [1, 3]})
+    assert response.get_json() == {'group_id': 1, 'removed': 1, 'not_in_group': 1, 'word_count': 1}
+
+def test_triggers_follow_direct_writes(portal_app):
+    seed(portal_app)
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        cursor.executemany('INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)', [(1, 1), (2, 1), (3, 2)])
+        cursor.execute('UPDATE word_groups SET group_id = 2 WHERE word_id = 2')
+        cursor.execute('DELETE FROM word_groups WHERE word_id = 3')
+        portal_app.db.commit()
+    assert stored_counts(portal_app) == [(1, 1), (2, 1)]
+
+def test_verify_and_repair_drift(portal_app, portal_client):
+    seed(portal_app)
+    portal_client.post('/groups/1/words', json=[1, 2, 3])
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        cursor.execute('UPDATE groups SET words_count = 7 WHERE id = 1')
+        cursor.execute('UPDATE groups SET words_count = NULL WHERE id = 2')
+        portal_app.db.commit()
+
+    data = portal_client.get('/api/admin/groups/counts/verify').get_json()
+    assert data['consistent'] is False
+    assert data['mismatches'] == {'1': {'stored': 7, 'counted': 3}, '2': {'stored': None, 'counted': 0}}
+
+    assert portal_client.post('/api/admin/groups/counts/repair').get_json()['repaired'] == 2
+    assert stored_counts(portal_app) == [(1, 3), (2, 0)]
+    assert portal_client.get('/api/admin/groups/counts/verify').get_json()['consistent'] is True
@@ -0,0 +1,53 @@
+# Test the set-based study session listing for a group
+
+import pytest
+
+def seed(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute("INSERT INTO study_activities (name, url) VALUES ('Typing Tutor', 'http://localhost:8080')")
+        cursor.execute("INSERT INTO groups (name) VALUES ('Core Verbs')")
+        cursor.execute("INSERT INTO words (jiantizi, pinyin, english, parts) VALUES ('学习', 'xué xí', 'to study', '[]')")
+        for day in range(1, 16):
+            cursor.execute('''
+                INSERT INTO study_sessions (group_id, study_activity_id, created_at)
+                VALUES (1, 1, ?)
+            ''', (f'2025-01-{day:02d} 10:00:00',))
+            session_id = cursor.lastrowid
+            # Every third session has no reviews
+            for minute in range(day % 3 and day):
+                cursor.execute('''
+                    INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
+                    VALUES (1, ?, 1, ?)
+                ''', (session_id, f'2025-01-{day:02d} 10:{minute + 1:02d}:00'))
+        app.db.commit()
+
+def capture_statements(app):
+    statements = []
+    with app.app_context():
+        app.db.get().set_trace_callback(statements.append)
+    return statements
+
+@pytest.mark.parametrize('sort_by', ['startTime', 'endTime', 'activityName', 'groupName', 'reviewItemsCount'])
+def test_sessions_in_one_query(portal_app, portal_client, sort_by):
+    seed(portal_app)
+    statements = capture_statements(portal_app)
+    response = portal_client.get(f'/groups/1/study_sessions?sort_by={sort_by}&with_total=false')
+
+    sessions = response.get_json()['study_sessions']
+    assert len(sessions) == 10
+    assert len([sql for sql in statements if sql.lstrip().startswith('SELECT')]) == 1
+    for session in sessions:
+        day = int(session['start_time'][8:10])
+        if day % 3:
+            assert session['review_items_count'] == day
+            assert session['end_time'] == f'2025-01-{day:02d} 10:{day:02d}:00'
+        else:
+            assert session['review_items_count'] == 0
+            assert session['end_time'] == f'2025-01-{day:02d} 10:30:00'
+
+def test_sort_by_review_count(portal_app, portal_client):
+    seed(portal_app)
+    response = portal_client.get('/groups/1/study_sessions?sort_by=reviewItemsCount&order=desc')
+    counts = [session['review_items_count'] for session in response.get_json()['study_sessions']]
+    assert counts == [14, 13, 11, 10, 8, 7, 5, 4, 2, 1]
@@ -0,0 +1,109 @@
+# Test the bulk vocabulary importer and its admin endpoint
+
+import io
+import json
+from lib import distractors, importer
+
+WORDS = [
+    {'jiantizi': '学习', 'pinyin': 'xué xí', 'english': 'to study', 'parts': [{'jiantizi': '学', 'pinyin': ['xué']}]},
+    {'jiantizi': '说', 'pinyin': 'shuō', 'english': 'to speak', 'parts': []},
+    {'jiantizi': '学习', 'pinyin': 'xué xí', 'english': 'to learn', 'parts': []},
+    {'jiantizi': '', 'pinyin': 'kōng', 'english': 'missing characters'},
+]
+
+def group_rows(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT COUNT(*) FROM words')
+        words = cursor.fetchone()[0]
+        cursor.execute('''
+            SELECT g.name, g.words_count, COUNT(wg.word_id)
+            FROM groups g LEFT JOIN word_groups wg ON wg.group_id = g.id
+            GROUP BY g.id ORDER BY g.id
+        ''')
+        return words, [tuple(row) for row in cursor.fetchall()]
+
+def test_import_deduplicates_and_links(portal_app):
+    with portal_app.app_context():
+        report = importer.import_words(portal_app.db.get(), iter(WORDS), group_name='Core Verbs', batch_size=2)
+        assert (report['read'], report['inserted'], report['duplicates'], report['rejected'], report['linked']) == (4, 2, 1, 1, 2)
+
+        # Re-importing into another group links the stored words instead of copying them
+        report = importer.import_words(portal_app.db.get(), iter(WORDS[:2]), group_name='HSK 1')
+        assert (report['inserted'], report['duplicates'], report['linked']) == (0, 2, 2)
+
+        cursor = portal_app.db.cursor()
+        cursor.execute("SELECT parts FROM words WHERE jiantizi = '学习'")
+        assert json.loads(cursor.fetchone()[0]) == WORDS[0]['parts']
+
+    assert group_rows(portal_app) == (2, [('Core Verbs', 2, 2), ('HSK 1', 2, 2)])
+
+def test_import_rejects_non_string_fields(portal_app):
+    records = [
+        {'jiantizi': 5, 'pinyin': 'wǔ', 'english': 'five'},
+        {'jiantizi': '六', 'pinyin': ['liù'], 'english': 'six'},
+        {'jiantizi': '七', 'pinyin': 'qī', 'english': 'seven'},
+    ]
+    with portal_app.app_context():
+        report = importer.import_words(portal_app.db.get(), iter(records), group_name='Numbers')
+        assert (report['read'], report['inserted'], report['rejected']) == (3, 1, 2)
+
+    assert group_rows(portal_app) == (1, [('Numbers', 1, 1)])
+
+def test_bulk_import_indexes_after_committing(portal_app, monkeypatch):
+    monkeypatch.setattr(importer, 'INDEX_INLINE_LIMIT', 1)
+    monkeypatch.setattr(distractors, 'REFRESH_BATCH', 2)
+    with portal_app.app_context():
+        report = importer.import_words(portal_app.db.get(), iter(WORDS), group_name='Core Verbs')
+        assert report['inserted'] == 2 and report['index_seconds'] is not None
+        cursor = portal_app.db.cursor()
+        assert distractors.pending(cursor) == 0
+        cursor.execute('SELECT COUNT(DISTINCT word_id) FROM word_features')
+        assert cursor.fetchone()[0] == 2
+
+def test_refresh_commits_in_batches(portal_app, monkeypatch):
+    monkeypatch.setattr(distractors, 'REFRESH_BATCH', 1)
+    monkeypatch.setattr(distractors, 'REBUILD_RATIO', 0)
+    with portal_app.app_context():
+        conn = portal_app.db.get()
+        conn.executemany("INSERT INTO words (jiantizi, pinyin, english, parts) VALUES (?, ?, ?, '[]')",
+                         [(word['jiantizi'], word['pinyin'], word['english']) for word in WORDS[:2]])
+        conn.commit()
+        report = distractors.refresh(conn)
+        assert (report['words'], report['rebuilt']) == (2, False)
+
+        # A queue that is a large share of the words is settled with one rebuild
+        monkeypatch.setattr(distractors, 'REBUILD_RATIO', 20)
+        conn.execute("UPDATE words SET english = 'to say' WHERE jiantizi = '说'")
+        conn.commit()
+        assert distractors.refresh(conn)['rebuilt']
+        assert distractors.pending(conn.cursor()) == 0
+
+def test_read_records_formats():
+    ndjson = '\n'.join(json.dumps(word, ensure_ascii=False) for word in WORDS[:2]) + '\n\n'
+    csv_text = 'jiantizi,pinyin,english,parts\n学习,xué xí,to study,"[{""jiantizi"": ""学""}]"\n说,shuō,to speak,\n'
+
+    assert list(importer.read_records(io.StringIO(json.dumps({'words': WORDS[:2]})), 'json')) == WORDS[:2]
+    assert list(importer.read_records(io.StringIO(ndjson), 'ndjson')) == WORDS[:2]
+    rows = list(importer.read_records(io.StringIO(csv_text), 'csv'))
+    assert [(row['jiantizi'], row['parts']) for row in rows] == [('学习', [{'jiantizi': '学'}]), ('说', [])]
+    assert importer.detect_format('hsk1.jsonl') == 'ndjson'
+    assert importer.detect_format('hsk1.csv') == 'csv'
+
+def test_import_endpoint(portal_app, portal_client):
+    ndjson = '\n'.join(json.dumps(word, ensure_ascii=False) for word in WORDS)
+    response = portal_client.post('/api/admin/import?group=Core+Verbs', data=ndjson.encode('utf-8'),
+                                  content_type='application/x-ndjson')
+    assert response.status_code == 201
+    assert response.get_json()['inserted'] == 2
+
+    upload = 'jiantizi,pinyin,english\n去,qù,to go\n说,shuō,to speak\n'.encode('utf-8')
+    response = portal_client.post('/api/admin/import?group=Core+Verbs',
+                                  data={'file': (io.BytesIO(upload), 'verbs.csv')},
+                                  content_type='multipart/form-data')
+    assert response.status_code == 201
+    assert (response.get_json()['inserted'], response.get_json()['linked']) == (1, 1)
+    assert group_rows(portal_app) == (3, [('Core Verbs', 3, 3)])
+
+    response = portal_client.post('/api/admin/import', data='{"words": 1}', content_type='application/json')
+    assert response.status_code == 400
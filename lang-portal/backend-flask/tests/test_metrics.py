@@ -0,0 +1,60 @@
+# Test request / SQL metrics and the slow request log
+
+import re
+
+def seed(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute("INSERT INTO groups (name) VALUES ('Core Verbs')")
+        cursor.execute("INSERT INTO words (jiantizi, pinyin, english, parts) VALUES ('学习', 'xué xí', 'to study', '[]')")
+        app.db.commit()
+
+def sample(text, name, **labels):
+    """The value of one sample in the Prometheus text output."""
+    label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = re.escape(name + ('{' + label_text + '}' if labels else '')) + r' (\S+)'
+    match = re.search('^' + pattern + '$', text, re.MULTILINE)
+    assert match, f'{name} {labels} not in metrics'
+    return float(match.group(1))
+
+def test_metrics_per_route(portal_app, portal_client):
+    seed(portal_app)
+    for word_id in (1, 2):
+        portal_client.get(f'/words/{word_id}')
+    portal_client.get('/words?sort_by=pinyin')
+
+    response = portal_client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+
+    # Requests are labelled with the route rule, not the raw path
+    route = dict(method='GET', endpoint='/words/<int:word_id>')
+    assert sample(text, 'http_requests_total', **route, status=200) == 1
+    assert sample(text, 'http_requests_total', **route, status=404) == 1
+    assert sample(text, 'http_request_duration_seconds_count', **route) == 2
+    assert sample(text, 'http_request_duration_seconds_bucket', **route, le='+Inf') == 2
+
+    # GET /words runs the page and the count statement
+    listing = dict(method='GET', endpoint='/words')
+    assert sample(text, 'db_statements_per_request_sum', **listing) == 2
+    assert sample(text, 'db_time_per_request_seconds_sum', **listing) > 0
+    assert sample(text, 'http_response_size_bytes_sum', **listing) > 0
+    # Only the /metrics request itself is being served
+    assert sample(text, 'http_requests_in_flight') == 1
+
+def test_slow_request_log_captures_plans(portal_app, portal_client):
+    seed(portal_app)
+    portal_app.metrics.slow_request_ms = 0.000001
+    portal_client.get('/groups/1/words?sort_by=english')
+
+    slow = portal_client.get('/api/admin/slow-requests').get_json()['requests']
+    assert slow[0]['endpoint'] == '/groups/<int:id>/words'
+    plans = [statement['plan'] for statement in slow[0]['statements'] if 'plan' in statement]
+    assert plans and all(isinstance(step, str) for plan in plans for step in plan)
+
+    # Without a threshold nothing more is logged
+    portal_app.metrics.slow_request_ms = None
+    logged = len(portal_client.get('/api/admin/slow-requests').get_json()['requests'])
+    portal_client.get('/groups/1/words')
+    assert len(portal_client.get('/api/admin/slow-requests').get_json()['requests']) == logged
@@ -0,0 +1,123 @@
+# Test opt-in keyset (cursor) pagination on the list endpoints
+
+import pytest
+from lib import pagination
+
+def seed_words(app, count):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute("INSERT INTO groups (name) VALUES ('Core Verbs')")
+        for i in range(count):
+            cursor.execute('''
+                INSERT INTO words (jiantizi, pinyin, english, parts)
+                VALUES (?, ?, ?, '[]')
+            ''', (f'字{i % 7}', f'zi{i:03d}', f'word {i % 3}'))
+            cursor.execute('INSERT INTO word_groups (word_id, group_id) VALUES (?, 1)', (cursor.lastrowid,))
+            if i % 2:
+                cursor.execute('''
+                    INSERT INTO word_reviews (word_id, correct_count, wrong_count) VALUES (?, ?, ?)
+                ''', (cursor.lastrowid, i % 5, i % 4))
+        app.db.commit()
+
+def walk(client, url, key):
+    items = []
+    response = client.get(url + '&after=').get_json()
+    while True:
+        items.extend(response[key])
+        if not response['has_more']:
+            return items
+        response = client.get(url + '&after=' + response['next_cursor']).get_json()
+
+@pytest.mark.parametrize('sort_by', ['jiantizi', 'pinyin', 'english', 'correct_count', 'wrong_count'])
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_words_cursor_visits_every_row_once(portal_app, portal_client, sort_by, order):
+    seed_words(portal_app, 120)
+    words = walk(portal_client, f'/words?sort_by={sort_by}&order={order}', 'words')
+
+    assert len(words) == 120
+    assert len({word['id'] for word in words}) == 120
+    keys = [word[sort_by] for word in words]
+    assert keys == sorted(keys, reverse=(order == 'desc'))
+
+def test_group_words_cursor_matches_offset_pages(portal_app, portal_client):
+    seed_words(portal_app, 25)
+    by_cursor = walk(portal_client, '/groups/1/words?sort_by=pinyin', 'words')
+    by_offset = []
+    for page in (1, 2, 3):
+        by_offset.extend(portal_client.get(f'/groups/1/words?sort_by=pinyin&page={page}').get_json()['words'])
+    assert by_cursor == by_offset
+
+def test_cursor_mode_skips_total_unless_requested(portal_app, portal_client):
+    seed_words(portal_app, 3)
+    assert 'total_words' not in portal_client.get('/words?after=').get_json()
+    assert portal_client.get('/words?after=&with_total=1').get_json()['total_words'] == 3
+    assert portal_client.get('/words?with_total=false').get_json()['total_pages'] is None
+
+def test_invalid_or_mismatched_cursor_is_rejected(portal_app, portal_client):
+    seed_words(portal_app, 60)
+    next_cursor = portal_client.get('/words?after=').get_json()['next_cursor']
+
+    assert portal_client.get('/words?after=not-a-cursor').status_code == 400
+    assert portal_client.get('/words?sort_by=pinyin&after=' + next_cursor).status_code == 400
+
+def test_study_sessions_cursor(portal_app, portal_client):
+    seed_words(portal_app, 1)
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        cursor.execute("INSERT INTO study_activities (name, url) VALUES ('Typing Tutor', 'http://localhost:8080')")
+        for day in range(1, 26):
+            cursor.execute('''
+                INSERT INTO study_sessions (group_id, study_activity_id, created_at)
+                VALUES (1, 1, ?)
+            ''', (f'2025-01-{day % 12 + 1:02d} 10:00:00',))
+        portal_app.db.commit()
+
+    sessions = walk(portal_client, '/api/study-sessions?per_page=10', 'items')
+    assert len({session['id'] for session in sessions}) == 25
+    assert [s['start_time'] for s in sessions] == sorted((s['start_time'] for s in sessions), reverse=True)
+
+    activity_sessions = walk(portal_client, '/api/study-activities/1/sessions?per_page=7', 'items')
+    assert [s['id'] for s in activity_sessions] == [s['id'] for s in sessions]
+
+    group_sessions = walk(portal_client, '/groups/1/study_sessions?sort_by=endTime&order=asc', 'study_sessions')
+    assert len({session['id'] for session in group_sessions}) == 25
+
+def test_study_sessions_total_matches_in_both_modes(portal_app, portal_client):
+    seed_words(portal_app, 1)
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        cursor.execute("INSERT INTO study_activities (name, url) VALUES ('Typing Tutor', 'http://localhost:8080')")
+        # The second session's group is gone, so neither listing returns it
+        cursor.executemany('''
+            INSERT INTO study_sessions (group_id, study_activity_id, created_at)
+            VALUES (?, 1, '2025-01-01 10:00:00')
+        ''', [(1,), (99,)])
+        portal_app.db.commit()
+
+    for url in ('/api/study-sessions', '/api/study-activities/1/sessions'):
+        assert portal_client.get(url).get_json()['total'] == 1
+        assert portal_client.get(url + '?after=&with_total=1').get_json()['total'] == 1
+
+@pytest.mark.parametrize('per_page', [0, -5])
+def test_study_sessions_cursor_clamps_per_page(portal_app, portal_client, per_page):
+    seed_words(portal_app, 1)
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        cursor.execute("INSERT INTO study_activities (name, url) VALUES ('Typing Tutor', 'http://localhost:8080')")
+        for day in range(1, 4):
+            cursor.execute('''
+                INSERT INTO study_sessions (group_id, study_activity_id, created_at)
+                VALUES (1, 1, ?)
+            ''', (f'2025-01-{day:02d} 10:00:00',))
+        portal_app.db.commit()
+
+    response = portal_client.get(f'/api/study-sessions?after=&per_page={per_page}')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['per_page'] == 1
+    assert len(body['items']) == 1
+    assert body['has_more']
+    assert portal_client.get(f'/api/study-sessions?per_page={per_page}').status_code == 200
+
+def test_page_with_no_limit():
+    assert pagination.page([{'id': 1}], 0, 'id', 'asc', lambda row: [row['id']]) == ([], None, False)
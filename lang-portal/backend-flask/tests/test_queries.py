@@ -0,0 +1,39 @@
+# Test the statement repository behind Db.query
+
+from lib import queries
+from lib.pool import DEFAULT_STATEMENT_CACHE
+
+def test_statement_set_fits_the_statement_cache():
+    assert len(queries.STATEMENTS) <= DEFAULT_STATEMENT_CACHE
+    assert len({statement.sql for statement in queries.STATEMENTS.values()}) == len(queries.STATEMENTS)
+    # Every sort and order has its own precompiled variant
+    assert queries.WORD_PAGES['pinyin', 'desc'].sql.rstrip().endswith('ORDER BY pinyin desc\n  LIMIT ? OFFSET ?')
+    assert '(w.pinyin, w.id) < (?, ?)' in queries.WORD_SEEKS['pinyin', 'desc', True].sql
+    assert '<' not in queries.WORD_SEEKS['pinyin', 'desc', False].sql
+
+def test_to_dicts():
+    description = (('id', None), ('name', None))
+    assert queries.to_dicts(description, [(1, 'a'), (2, 'b')]) == [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}]
+
+def test_routes_record_statement_stats(portal_app, portal_client):
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        cursor.execute("INSERT INTO groups (name) VALUES ('Core Verbs')")
+        cursor.execute("INSERT INTO words (jiantizi, pinyin, english, parts) VALUES ('学习', 'xué xí', 'to study', '[]')")
+        portal_app.db.commit()
+
+    for _ in range(3):
+        assert portal_client.get('/words?sort_by=pinyin&order=desc').status_code == 200
+    # Unknown sort columns fall back to a known statement instead of new SQL
+    assert portal_client.get('/words?sort_by=parts&order=sideways').get_json()['words'][0]['jiantizi'] == '学习'
+    assert portal_client.get('/groups?after=').get_json()['groups'][0]['group_name'] == 'Core Verbs'
+
+    stats = portal_client.get('/api/admin/db/queries').get_json()
+    by_name = {entry['name']: entry for entry in stats['queries']}
+    assert by_name['words.page.pinyin.desc']['calls'] == 3
+    assert by_name['words.page.jiantizi.asc']['calls'] == 1
+    assert by_name['words.count']['rows'] == 4
+    assert by_name['groups.first.name.asc']['calls'] == 1
+    assert stats['statements'] == len(queries.STATEMENTS)
+
+    assert portal_client.post('/api/admin/db/queries/reset').get_json()['queries'] == []
@@ -0,0 +1,260 @@
+# Query-plan regression suite: every statement the routes issue must be
+# answerable from an index on a large database, not a full table scan.
+#
+# Statements are captured from the real routes against a small fixture
+# database, then run through EXPLAIN QUERY PLAN on a seeded database
+# with QUERY_PLAN_REVIEWS review items (1M by default).
+
+import os
+import re
+import tempfile
+import pytest
+from app import create_app
+from lib.pagination import encode_cursor
+
+REVIEWS = int(os.environ.get('QUERY_PLAN_REVIEWS', 1_000_000))
+WORDS = max(REVIEWS // 50, 100)
+GROUPS = max(REVIEWS // 5000, 5)
+SESSIONS = max(REVIEWS // 20, 10)
+
+# Tiny lookup tables that are fine to scan
+SMALL_TABLES = {'study_activities', 'schema_migrations'}
+
+# Statements whose full scan is inherent to the request, with the reason
+KNOWN_SCANS = {
+    # Review counters live in word_reviews, so ordering every word by them
+    # needs every word; there is no index that can serve the LEFT JOIN order
+    'ORDER BY COALESCE(r.correct_count, 0)': 'sort by review counters',
+    'ORDER BY COALESCE(r.wrong_count, 0)': 'sort by review counters',
+    'ORDER BY correct_count': 'sort by review counters',
+    'ORDER BY wrong_count': 'sort by review counters',
+}
+
+def route_requests():
+    requests = [
+        '/dashboard/stats',
+        '/dashboard/recent-session',
+        '/api/study-activities',
+        '/api/study-activities/1',
+        '/api/study-activities/1/launch',
+        '/api/study-activities/1/sessions',
+        '/api/study-activities/1/sessions?after=' + encode_cursor('created_at', 'desc', ['2024-06-01', 100]),
+        '/api/study-sessions',
+        '/api/study-sessions?after=' + encode_cursor('created_at', 'desc', ['2024-06-01', 100]),
+        '/api/study-sessions?after=&with_total=1',
+        '/api/study-sessions/1',
+        '/groups/1',
+        '/api/groups/1/words/raw',
+        '/api/groups/1/due',
+        '/api/groups/1/due?new=false&limit=5',
+        '/api/groups/1/quiz?n=5',
+        '/api/export/words?group_id=1',
+        '/api/export/study-sessions?group_id=1&since=2025-01-01',
+        '/api/export/review-items?since=2025-01-01',
+        '/api/export/review-items?activity_id=1',
+        '/words/1',
+        '/words?ids=1,2,3',
+        '/words/1/history?days=3650',
+        '/words/search?q=m',
+        '/words/search?q=ma3 ren&field=pinyin&match=contains',
+        '/words/search?q=word&field=english&match=exact',
+        '/words/search?q=字',
+        '/words/search?q=字1&match=contains',
+        '/words/search?q=字12&match=contains',
+        '/words/search?q=字1&match=exact',
+    ]
+    for order in ('asc', 'desc'):
+        for sort_by in ('jiantizi', 'pinyin', 'english', 'correct_count', 'wrong_count'):
+            key = [0 if sort_by.endswith('_count') else 'm', 10]
+            requests.append(f'/words?sort_by={sort_by}&order={order}')
+            requests.append(f'/words?sort_by={sort_by}&order={order}&after=' + encode_cursor(sort_by, order, key))
+            requests.append(f'/groups/1/words?sort_by={sort_by}&order={order}')
+            requests.append(f'/groups/1/words?sort_by={sort_by}&order={order}&after=' + encode_cursor(sort_by, order, key))
+        for sort_by in ('name', 'words_count'):
+            key = ['m' if sort_by == 'name' else 0, 10]
+            requests.append(f'/groups?sort_by={sort_by}&order={order}')
+            requests.append(f'/groups?sort_by={sort_by}&order={order}&after=' + encode_cursor(sort_by, order, key))
+        for sort_by, column, key in (
+            ('startTime', 'created_at', '2024-06-01'),
+            ('endTime', 'last_activity_time', '2024-06-01'),
+            ('activityName', 'a.name', 'm'),
+            ('groupName', 'g.name', 'm'),
+            ('reviewItemsCount', 'review_count', 3),
+        ):
+            requests.append(f'/groups/1/study_sessions?sort_by={sort_by}&order={order}')
+            requests.append(f'/groups/1/study_sessions?sort_by={sort_by}&order={order}&after=' + encode_cursor(column, order, [key, 10]))
+    return requests
+
+def route_writes():
+    return [
+        ('/api/study-sessions', {'group_id': 1, 'study_activity_id': 1, 'created_at': '2025-01-01 10:00:00'}),
+        ('/api/study-sessions/1/review', {'word_id': 1, 'correct': True}),
+        ('/api/study-sessions/1/reviews', [{'word_id': 1, 'correct': True}, {'word_id': 1, 'correct': False}]),
+        ('/api/study-sessions/1/close', {}),
+        ('/words/batch', {'ids': [1, 2, 3]}),
+        ('/groups/1/words', {'word_ids': [1, 2, 3]}),
+    ]
+
+def seed_small(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute("INSERT INTO study_activities (name, url) VALUES ('Typing Tutor', 'http://localhost:8080')")
+        cursor.execute("INSERT INTO groups (name) VALUES ('Core Verbs')")
+        cursor.execute("INSERT INTO words (jiantizi, pinyin, english, parts) VALUES ('学习', 'xué xí', 'to study', '[]')")
+        cursor.execute('INSERT INTO word_groups (word_id, group_id) VALUES (1, 1)')
+        cursor.execute("INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (1, 1, '2025-01-01 09:00:00')")
+        cursor.execute('INSERT INTO word_review_items (word_id, study_session_id, correct) VALUES (1, 1, 1)')
+        app.db.commit()
+
+def seed_large(conn):
+    conn.executescript(f'''
+        INSERT INTO study_activities (name, url)
+        VALUES ('Typing Tutor', 'http://localhost:8080'), ('Flashcards', 'http://localhost:8081');
+
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {GROUPS})
+        INSERT INTO groups (name) SELECT 'Group ' || i FROM n;
+
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {WORDS})
+        INSERT INTO words (jiantizi, pinyin, english, parts)
+        SELECT 'w' || i, 'p' || (i * 7 % {WORDS}), 'e' || (i * 13 % {WORDS}), '[]' FROM n;
+
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {WORDS * 2})
+        INSERT INTO word_groups (word_id, group_id) SELECT (i - 1) % {WORDS} + 1, (i - 1) % {GROUPS} + 1 FROM n;
+
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {WORDS // 2})
+        INSERT INTO word_reviews (word_id, correct_count, wrong_count) SELECT i * 2, i % 11, i % 5 FROM n;
+
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {WORDS // 3})
+        INSERT INTO word_schedules (word_id, interval_days, repetitions, due_at)
+        SELECT i * 3, i % 30, i % 6, datetime('2024-01-01', '+' || (i % 800) || ' days') FROM n;
+
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {SESSIONS})
+        INSERT INTO study_sessions (group_id, study_activity_id, created_at)
+        SELECT i % {GROUPS} + 1, i % 2 + 1, datetime('2024-01-01', '+' || (i % 400) || ' days') FROM n;
+
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {REVIEWS})
+        INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
+        SELECT (i * 7919) % {WORDS} + 1, i % {SESSIONS} + 1, i % 5 != 0,
+               datetime('2024-01-01', '+' || (i % 400) || ' days')
+        FROM n;
+
+        ANALYZE;
+    ''')
+
+@pytest.fixture(scope='module')
+def large_db():
+    db_fd, db_path = tempfile.mkstemp()
+    large_app = create_app({'DATABASE': db_path})
+    with large_app.app_context():
+        conn = large_app.db.get()
+        large_app.db.setup_tables(conn.cursor())
+        seed_large(conn)
+    yield large_app
+
+    large_app.db.dispose()
+    os.close(db_fd)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.unlink(db_path + suffix)
+
+@pytest.fixture(scope='module')
+def captured_statements():
+    db_fd, db_path = tempfile.mkstemp()
+    app = create_app({'DATABASE': db_path, 'DB_POOL_SIZE': 1})
+    app.testing = True
+    with app.app_context():
+        app.db.setup_tables(app.db.cursor())
+    seed_small(app)
+
+    statements = []
+    conn = app.db.pool.acquire()
+    conn.set_trace_callback(statements.append)
+    app.db.pool.release(conn)
+
+    client = app.test_client()
+    for url in route_requests():
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.get_json())
+    for url, body in route_writes():
+        response = client.post(url, json=body)
+        assert response.status_code < 300, (url, response.get_json())
+
+    app.db.dispose()
+    os.close(db_fd)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.unlink(db_path + suffix)
+    return list(dict.fromkeys(statements))
+
+def table_aliases(sql):
+    aliases = {}
+    for table, alias in re.findall(r'(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', sql, re.IGNORECASE):
+        aliases[table] = table
+        if alias and alias.upper() not in ('WHERE', 'JOIN', 'LEFT', 'ON', 'GROUP', 'ORDER', 'LIMIT', 'INNER', 'SET'):
+            aliases[alias] = table
+    return aliases
+
+def full_scans(conn, sql):
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    aliases = table_aliases(sql)
+    plan = conn.execute('EXPLAIN QUERY PLAN ' + sql).fetchall()
+    # Subqueries show up as 'CO-ROUTINE ss' or 'MATERIALIZE ss'; a SCAN of that
+    # name outside the subquery reads its (already limited) result rows
+    subqueries = {}
+    for row in plan:
+        match = re.match(r'(?:CO-ROUTINE|MATERIALIZE) (\w+)', row['detail'])
+        if match:
+            subqueries[match.group(1)] = row['id']
+    scans = []
+    for row in plan:
+        match = re.match(r'SCAN (?:TABLE )?(\w+)(?: AS (\w+))?(.*)$', row['detail'])
+        if not match or 'INDEX' in match.group(3):
+            continue
+        name = match.group(2) or match.group(1)
+        if name in subqueries and row['parent'] != subqueries[name]:
+            continue
+        table = aliases.get(name, match.group(1))
+        if table in tables and table not in SMALL_TABLES and not table.startswith('sqlite_'):
+            scans.append(row['detail'])
+    return scans
+
+def explainable(sql):
+    return re.match(r'\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b', sql, re.IGNORECASE) is not None
+
+def test_statements_were_captured(captured_statements):
+    assert len([sql for sql in captured_statements if explainable(sql)]) > 20
+
+def test_no_full_table_scans(large_db, captured_statements):
+    failures = []
+    with large_db.app_context():
+        conn = large_db.db.get()
+        for sql in captured_statements:
+            if not explainable(sql):
+                continue
+            if any(marker in sql for marker in KNOWN_SCANS):
+                continue
+            scans = full_scans(conn, sql)
+            if scans:
+                failures.append(f"{' '.join(sql.split())}\n    -> {scans}")
+    assert not failures, 'Full table scans found:\n' + '\n'.join(failures)
+
+def test_due_words_start_from_the_group(large_db, captured_statements):
+    # A group of three words among thousands of due schedules: the plan must
+    # read the group's links, not walk the global due index
+    with large_db.app_context():
+        conn = large_db.db.get()
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO groups (name) VALUES ('Sparse')")
+        group_id = cursor.lastrowid
+        cursor.executemany('INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)',
+                           [(word_id, group_id) for word_id in (3, 6, 9)])
+        conn.commit()
+
+    response = large_db.test_client().get(f'/api/groups/{group_id}/due?new=false')
+    assert [word['id'] for word in response.get_json()['words']] == [3, 6, 9]
+
+    due_query = next(sql for sql in captured_statements if 'ws.due_at <=' in sql)
+    with large_db.app_context():
+        plan = [row['detail'] for row in large_db.db.get().execute('EXPLAIN QUERY PLAN ' + due_query)]
+    assert 'idx_word_groups_group_word' in plan[0]
+    assert not any('idx_word_schedules_due' in detail for detail in plan)
@@ -0,0 +1,114 @@
+# Test the quiz endpoint and the distractor index behind it
+
+import random
+from lib import distractors, importer, quiz
+
+WORDS = [
+    {'jiantizi': '学习', 'pinyin': 'xué xí', 'english': 'to study'},
+    {'jiantizi': '学生', 'pinyin': 'xué sheng', 'english': 'student'},
+    {'jiantizi': '大学生', 'pinyin': 'dà xué sheng', 'english': 'university student'},
+    {'jiantizi': '复习', 'pinyin': 'fù xí', 'english': 'to review'},
+    {'jiantizi': '练习', 'pinyin': 'liàn xí', 'english': 'to practice'},
+    {'jiantizi': '绿色', 'pinyin': 'lǜ sè', 'english': 'green'},
+    {'jiantizi': '红色', 'pinyin': 'hóng sè', 'english': 'red'},
+    {'jiantizi': '跑步', 'pinyin': 'pǎo bù', 'english': 'to run'},
+]
+
+def seed(app, words=WORDS, group='Core Verbs'):
+    with app.app_context():
+        return importer.import_words(app.db.get(), iter(words), group_name=group)
+
+def neighbour_rows(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT word_id, neighbour_id, score FROM word_neighbours ORDER BY word_id, neighbour_id')
+        return [tuple(row) for row in cursor.fetchall()]
+
+def test_features():
+    assert distractors.features('绿色', 'lǜ sè', 'the colour green') == {'c:绿', 'c:色', 's:lu', 's:se', 'e:colour', 'e:green'}
+
+def test_imported_words_are_indexed(portal_app):
+    seed(portal_app)
+    rows = neighbour_rows(portal_app)
+    neighbours = {}
+    for word_id, neighbour_id, score in rows:
+        neighbours.setdefault(word_id, {})[neighbour_id] = score
+    # 学生 shares two characters, two syllables and a word of its gloss with 大学生
+    assert neighbours[2][3] == 3 * 2 + 1 * 2 + 2
+    # ...and only a syllable with 红色
+    assert 7 not in neighbours[2]
+    assert neighbours[6] == {7: 4}
+
+    # Indexing word by word gives the same lists as a full build
+    with portal_app.app_context():
+        assert distractors.pending(portal_app.db.cursor()) == 0
+        distractors.build_index(portal_app.db.get())
+    assert neighbour_rows(portal_app) == rows
+
+def test_edits_and_deletes_follow_the_index(portal_app, portal_client):
+    seed(portal_app)
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        cursor.execute("UPDATE words SET jiantizi = '蓝色', pinyin = 'lán sè', english = 'blue' WHERE id = 6")
+        cursor.execute('DELETE FROM words WHERE id = 3')
+        portal_app.db.commit()
+        assert distractors.pending(cursor) == 1
+    rows = neighbour_rows(portal_app)
+    assert all(3 not in row[:2] and 6 not in row[:2] for row in rows)
+
+    response = portal_client.post('/api/admin/distractors/rebuild?pending=true')
+    assert response.get_json()['words'] == 1
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        cursor.execute('SELECT feature FROM word_features WHERE word_id = 6')
+        assert {row[0] for row in cursor.fetchall()} == {'c:蓝', 'c:色', 's:lan', 's:se', 'e:blue'}
+    # The edited word is back in the list of the word it shares 色 with
+    assert neighbour_rows(portal_app) == sorted(rows + [(6, 7, 4), (7, 6, 4)])
+
+def test_quiz_items(portal_app, portal_client):
+    seed(portal_app)
+    response = portal_client.get('/api/groups/1/quiz?n=5&choices=3&seed=7')
+    assert response.status_code == 200
+    items = response.get_json()['items']
+    assert len(items) == 5
+    assert len({item['word_id'] for item in items}) == 5
+    for item in items:
+        assert len(item['choices']) == 3
+        answer = item['choices'][item['answer']]
+        assert (answer['id'], answer['english']) == (item['word_id'], item['english'])
+        assert len({choice['english'] for choice in item['choices']}) == 3
+
+    # The same seed gives the same quiz
+    assert portal_client.get('/api/groups/1/quiz?n=5&choices=3&seed=7').get_json()['items'] == items
+
+    # 学生 is asked with its closest words
+    items = portal_client.get('/api/groups/1/quiz?n=8&choices=2&seed=1').get_json()['items']
+    student = next(item for item in items if item['word_id'] == 2)
+    assert {choice['jiantizi'] for choice in student['choices']} <= {'学生', '大学生', '学习'}
+
+def test_quiz_without_neighbours_uses_group_words(portal_app, portal_client):
+    seed(portal_app, [{'jiantizi': '猫', 'pinyin': 'māo', 'english': 'cat'},
+                      {'jiantizi': '狗', 'pinyin': 'gǒu', 'english': 'dog'},
+                      {'jiantizi': '鱼', 'pinyin': 'yú', 'english': 'fish'}], group='Animals')
+    items = portal_client.get('/api/groups/1/quiz?choices=4').get_json()['items']
+    # Three words: every item has the other two as distractors
+    assert len(items) == 3
+    assert all(len(item['choices']) == 3 for item in items)
+
+def test_large_groups_are_sampled_with_seeks(portal_app, monkeypatch):
+    words = [{'jiantizi': f'字{i}', 'pinyin': f'zi{i}', 'english': f'word {i}'} for i in range(60)]
+    seed(portal_app, words)
+    monkeypatch.setattr(quiz, 'SMALL_GROUP', 10)
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        ids = quiz.sample_group_words(cursor, 1, 60, 20, random.Random(3))
+    assert len(ids) == 20
+    assert len(set(ids)) == 20
+    assert set(ids) <= set(range(1, 61))
+
+def test_quiz_errors(portal_app, portal_client):
+    seed(portal_app)
+    assert portal_client.get('/api/groups/9/quiz').status_code == 404
+    assert portal_client.get('/api/groups/1/quiz?n=0').status_code == 400
+    assert portal_client.get('/api/groups/1/quiz?n=500').status_code == 400
+    assert portal_client.get('/api/groups/1/quiz?choices=1').status_code == 400
@@ -0,0 +1,57 @@
+# Test the response cache and conditional GETs on read-mostly endpoints
+
+def seed(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute("INSERT INTO study_activities (name, url) VALUES ('Typing Tutor', 'http://localhost:8080')")
+        cursor.execute("INSERT INTO groups (name) VALUES ('Core Verbs')")
+        cursor.execute("INSERT INTO words (jiantizi, pinyin, english, parts) VALUES ('学习', 'xué xí', 'to study', '[]')")
+        cursor.execute('INSERT INTO word_groups (word_id, group_id) VALUES (1, 1)')
+        cursor.execute("INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (1, 1, '2025-01-01 10:00:00')")
+        app.db.commit()
+
+def test_etag_and_not_modified(portal_app, portal_client):
+    seed(portal_app)
+    for url in ('/api/study-activities', '/groups', '/groups/1', '/words/1'):
+        first = portal_client.get(url)
+        assert first.status_code == 200
+        assert first.headers['ETag'] and first.headers['Last-Modified']
+
+        cached = portal_client.get(url)
+        assert cached.get_data() == first.get_data()
+        assert cached.headers['ETag'] == first.headers['ETag']
+
+        revalidated = portal_client.get(url, headers={'If-None-Match': first.headers['ETag']})
+        assert revalidated.status_code == 304
+        assert revalidated.get_data() == b''
+
+    stats = portal_client.get('/api/admin/cache').get_json()
+    assert (stats['stores'], stats['hits'], stats['not_modified']) == (4, 8, 4)
+
+def test_writes_invalidate_dependent_entries(portal_app, portal_client):
+    seed(portal_app)
+    before = portal_client.get('/words/1')
+    portal_client.get('/groups')
+    assert before.get_json()['word']['correct_count'] == 0
+
+    portal_client.post('/api/study-sessions/1/review', json={'word_id': 1, 'correct': True})
+
+    after = portal_client.get('/words/1', headers={'If-None-Match': before.headers['ETag']})
+    assert after.status_code == 200
+    assert after.get_json()['word']['correct_count'] == 1
+    assert after.headers['ETag'] != before.headers['ETag']
+    # /groups does not depend on the review tables and stays cached
+    assert portal_app.response_cache.stats()['invalidations'] == 1
+
+def test_errors_and_disabled_cache_are_not_stored(portal_app, portal_client):
+    seed(portal_app)
+    assert portal_client.get('/words/99').status_code == 404
+    assert portal_app.response_cache.stats()['size'] == 0
+
+    portal_app.response_cache.ttl = 0
+    portal_client.get('/groups/1')
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        cursor.execute("UPDATE groups SET name = 'Verbs' WHERE id = 1")
+        portal_app.db.commit()
+    assert portal_client.get('/groups/1').get_json()['group_name'] == 'Verbs'
@@ -0,0 +1,82 @@
+# Test batch review ingestion for study sessions
+
+import json
+
+def seed(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute("INSERT INTO study_activities (name, url) VALUES ('Typing Tutor', 'http://localhost:8080')")
+        cursor.execute("INSERT INTO groups (name) VALUES ('Core Verbs')")
+        for i in range(5):
+            cursor.execute('''
+                INSERT INTO words (jiantizi, pinyin, english, parts) VALUES (?, ?, ?, '[]')
+            ''', (f'字{i}', f'zi{i}', f'word {i}'))
+        cursor.execute("INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (1, 1, '2025-01-01 10:00:00')")
+        app.db.commit()
+
+def counters(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT COUNT(*) as count FROM word_review_items')
+        items = cursor.fetchone()['count']
+        cursor.execute('SELECT word_id, correct_count, wrong_count FROM word_reviews ORDER BY word_id')
+        return items, [tuple(row) for row in cursor.fetchall()]
+
+def test_batch_records_items_and_counters(portal_app, portal_client):
+    seed(portal_app)
+    response = portal_client.post('/api/study-sessions/1/reviews', json=[
+        {'word_id': 1, 'correct': True},
+        {'word_id': 1, 'correct': False},
+        {'word_id': 2, 'correct': True},
+        {'word_id': 1, 'correct': True},
+    ])
+
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['recorded'] == 4
+    assert [item['status'] for item in data['items']] == ['recorded'] * 4
+    assert counters(portal_app) == (4, [(1, 2, 1), (2, 1, 0)])
+
+    # Counters accumulate across batches and the single-item endpoint
+    portal_client.post('/api/study-sessions/1/review', json={'word_id': 2, 'correct': False})
+    assert counters(portal_app) == (5, [(1, 2, 1), (2, 1, 1)])
+
+def test_batch_reports_rejected_items(portal_app, portal_client):
+    seed(portal_app)
+    response = portal_client.post('/api/study-sessions/1/reviews', json={'items': [
+        {'word_id': 3, 'correct': True},
+        {'word_id': 99, 'correct': True},
+        {'word_id': 4},
+        {'word_id': 'x', 'correct': True},
+    ]})
+
+    assert response.status_code == 201
+    data = response.get_json()
+    assert (data['recorded'], data['rejected']) == (1, 3)
+    assert [item['status'] for item in data['items']] == ['recorded', 'rejected', 'rejected', 'rejected']
+    assert data['items'][1]['error'] == 'Word not found'
+    assert counters(portal_app) == (1, [(3, 1, 0)])
+
+def test_batch_accepts_ndjson(portal_app, portal_client):
+    seed(portal_app)
+    body = '\n'.join(json.dumps({'word_id': i % 5 + 1, 'correct': i % 3 != 0}) for i in range(50)) + '\n'
+    response = portal_client.post('/api/study-sessions/1/reviews', data=body,
+                                  content_type='application/x-ndjson')
+
+    assert response.status_code == 201
+    assert response.get_json()['recorded'] == 50
+    items, reviews = counters(portal_app)
+    assert items == 50
+    assert sum(c + w for _, c, w in reviews) == 50
+
+def test_batch_errors(portal_app, portal_client):
+    seed(portal_app)
+    assert portal_client.post('/api/study-sessions/42/reviews', json=[{'word_id': 1, 'correct': True}]).status_code == 404
+    assert portal_client.post('/api/study-sessions/1/reviews', json={'word_id': 1}).status_code == 400
+    assert portal_client.post('/api/study-sessions/1/reviews', data='{"word_id": 1,\n',
+                              content_type='application/x-ndjson').status_code == 400
+
+    portal_app.config['MAX_REVIEW_BATCH'] = 2
+    response = portal_client.post('/api/study-sessions/1/reviews', json=[{'word_id': 1, 'correct': True}] * 3)
+    assert response.status_code == 413
+    assert counters(portal_app) == (0, [])
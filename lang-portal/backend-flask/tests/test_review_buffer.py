@@ -0,0 +1,177 @@
+# Test the write-behind review buffer: group commit, the review log and backpressure
+
+import glob
+import os
+import tempfile
+import threading
+import pytest
+from app import create_app
+from lib import review_buffer
+
+@pytest.fixture
+def make_app():
+    """Create fully routed apps with the given review buffer settings on one database."""
+    db_fd, db_path = tempfile.mkstemp()
+    apps = []
+
+    def make(**config):
+        test_app = create_app({'DATABASE': db_path, **config})
+        test_app.testing = True
+        if not apps:
+            with test_app.app_context():
+                test_app.db.setup_tables(test_app.db.cursor())
+                cursor = test_app.db.cursor()
+                cursor.execute("INSERT INTO study_activities (name, url) VALUES ('Typing Tutor', 'http://localhost:8080')")
+                cursor.execute("INSERT INTO groups (name) VALUES ('Core Verbs')")
+                for i in range(5):
+                    cursor.execute("INSERT INTO words (jiantizi, pinyin, english, parts) VALUES (?, ?, ?, '[]')",
+                                   (f'字{i}', f'zi{i}', f'word {i}'))
+                cursor.execute("INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (1, 1, '2025-01-01 10:00:00')")
+                test_app.db.commit()
+        apps.append(test_app)
+        return test_app
+
+    yield make
+
+    for test_app in apps:
+        if test_app.review_buffer is not None:
+            test_app.review_buffer.close()
+        test_app.db.dispose()
+    os.close(db_fd)
+    # The database, its WAL files, the review logs and dead letters
+    for path in glob.glob(glob.escape(db_path) + '*'):
+        os.unlink(path)
+
+def counters(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT COUNT(*) AS count FROM word_review_items')
+        items = cursor.fetchone()['count']
+        cursor.execute('SELECT word_id, correct_count, wrong_count FROM word_reviews ORDER BY word_id')
+        return items, [tuple(row) for row in cursor.fetchall()]
+
+def test_group_commit_shares_transactions(make_app):
+    app = make_app(REVIEW_WRITES='group', REVIEW_FLUSH_MS=50)
+    statuses = []
+
+    def post():
+        client = app.test_client()
+        response = client.post('/api/study-sessions/1/reviews', json=[
+            {'word_id': 1, 'correct': True}, {'word_id': 2, 'correct': False}
+        ])
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=post) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Every request was answered after its reviews were committed
+    assert statuses == [201] * 10
+    assert counters(app) == (20, [(1, 10, 0), (2, 0, 10)])
+    stats = app.review_buffer.stats()
+    assert stats['items_written'] == 20
+    assert stats['flushes'] < 10
+
+    # Rejected items are still reported per item
+    response = app.test_client().post('/api/study-sessions/1/reviews', json=[{'word_id': 99, 'correct': True}])
+    assert response.status_code == 400
+    assert response.get_json()['items'][0]['error'] == 'Word not found'
+
+def test_log_mode_acknowledges_before_commit(make_app):
+    app = make_app(REVIEW_WRITES='log', REVIEW_FLUSH_MS=60000)
+    client = app.test_client()
+
+    assert client.post('/api/study-sessions/1/review', json={'word_id': 3, 'correct': True}).status_code == 202
+    assert client.post('/api/study-sessions/1/reviews', json=[{'word_id': 3, 'correct': False}]).status_code == 202
+    assert counters(app)[0] == 0
+    assert len(review_buffer.read_log(app.review_buffer.log_path)) == 2
+
+    assert client.post('/api/admin/reviews/flush').status_code == 200
+    assert counters(app) == (2, [(3, 1, 1)])
+    # Once everything logged is committed the log starts over
+    assert review_buffer.read_log(app.review_buffer.log_path) == []
+
+def test_log_is_replayed_once_after_a_crash(make_app):
+    app = make_app(REVIEW_WRITES='log', REVIEW_FLUSH_MS=60000)
+    client = app.test_client()
+    for word_id in (1, 2, 2):
+        assert client.post('/api/study-sessions/1/review', json={'word_id': word_id, 'correct': True}).status_code == 202
+    # Stop the committer without writing, as if the process had died
+    app.review_buffer.close(flush=False)
+    assert counters(app)[0] == 0
+
+    restarted = make_app(REVIEW_WRITES='log')
+    assert restarted.review_buffer.stats()['replayed'] == 3
+    assert counters(restarted) == (3, [(1, 1, 0), (2, 2, 0)])
+    restarted.review_buffer.close()
+
+    again = make_app(REVIEW_WRITES='log')
+    assert again.review_buffer.stats()['replayed'] == 0
+    assert counters(again)[0] == 3
+
+def test_each_process_has_its_own_log(make_app):
+    first = make_app(REVIEW_WRITES='log', REVIEW_FLUSH_MS=60000)
+    second = make_app(REVIEW_WRITES='log', REVIEW_FLUSH_MS=60000)
+    assert (first.review_buffer.slot, second.review_buffer.slot) == (0, 1)
+    assert first.test_client().post('/api/study-sessions/1/review', json={'word_id': 1, 'correct': True}).status_code == 202
+    assert second.test_client().post('/api/study-sessions/1/review', json={'word_id': 2, 'correct': True}).status_code == 202
+
+    # Committing one log leaves the other's entries alone
+    first.review_buffer.flush()
+    assert len(review_buffer.read_log(second.review_buffer.log_path)) == 1
+
+    # A dead worker's log is replayed by the next process to start
+    second.review_buffer.close(flush=False)
+    restarted = make_app(REVIEW_WRITES='log')
+    assert restarted.review_buffer.slot == 1
+    assert restarted.review_buffer.stats()['replayed'] == 1
+    assert counters(restarted) == (2, [(1, 1, 0), (2, 1, 0)])
+
+def test_failing_reviews_are_dead_lettered(make_app, monkeypatch):
+    monkeypatch.setattr(review_buffer, 'MAX_FLUSH_ATTEMPTS', 2)
+    monkeypatch.setattr(review_buffer, 'RETRY_DELAY', 0.01)
+    write_reviews = review_buffer.reviews.write_reviews
+
+    def failing_write_reviews(cursor, session_id, rows, reviewed_at):
+        if any(row[0] == 4 for row in rows):
+            raise ValueError('cannot write word 4')
+        return write_reviews(cursor, session_id, rows, reviewed_at)
+
+    monkeypatch.setattr(review_buffer.reviews, 'write_reviews', failing_write_reviews)
+    app = make_app(REVIEW_WRITES='log', REVIEW_FLUSH_MS=60000)
+    client = app.test_client()
+    for word_id in (1, 4, 2):
+        assert client.post('/api/study-sessions/1/review', json={'word_id': word_id, 'correct': True}).status_code == 202
+
+    assert app.review_buffer.flush(timeout=5)
+    assert counters(app) == (2, [(1, 1, 0), (2, 1, 0)])
+    assert [entry['rows'] for entry in review_buffer.read_log(app.review_buffer.log_path + '.dead')] == [[[4, True]]]
+    stats = app.review_buffer.stats()
+    assert stats['dead_lettered'] == 1
+    assert stats['pending_items'] == 0
+
+def test_group_commit_times_out(make_app):
+    app = make_app(REVIEW_WRITES='group', REVIEW_FLUSH_MS=60000, REVIEW_COMMIT_TIMEOUT=0.05)
+    response = app.test_client().post('/api/study-sessions/1/review', json={'word_id': 1, 'correct': True})
+    assert response.status_code == 503
+
+def test_full_queue_is_rejected_with_503(make_app):
+    app = make_app(REVIEW_WRITES='log', REVIEW_FLUSH_MS=60000, REVIEW_QUEUE_SIZE=3, REVIEW_QUEUE_TIMEOUT=0.05)
+    client = app.test_client()
+    items = [{'word_id': 1, 'correct': True}, {'word_id': 2, 'correct': True}]
+
+    assert client.post('/api/study-sessions/1/reviews', json=items).status_code == 202
+    response = client.post('/api/study-sessions/1/reviews', json=items)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert app.review_buffer.stats()['rejected'] == 1
+
+    # Room frees up once the committer has written the queue
+    app.review_buffer.flush()
+    assert client.post('/api/study-sessions/1/reviews', json=items).status_code == 202
+
+def test_unknown_write_mode():
+    with pytest.raises(ValueError):
+        create_app({'REVIEW_WRITES': 'eventually'})
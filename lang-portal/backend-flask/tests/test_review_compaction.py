@@ -0,0 +1,99 @@
+# Test rolling old review items up into daily totals and archiving them
+
+import os
+import sqlite3
+import tempfile
+from lib import compaction, stats
+
+def seed(app):
+    """Two sessions a year apart: four old reviews and two recent ones."""
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute("INSERT INTO study_activities (name, url) VALUES ('Typing Tutor', 'http://localhost:8080')")
+        cursor.execute("INSERT INTO groups (name) VALUES ('Core Verbs')")
+        for i in range(3):
+            cursor.execute("INSERT INTO words (jiantizi, pinyin, english, parts) VALUES (?, ?, ?, '[]')",
+                           (f'字{i}', f'zi{i}', f'word {i}'))
+        cursor.execute("INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (1, 1, datetime('now', '-400 days'))")
+        cursor.execute("INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (1, 1, datetime('now', '-1 hour'))")
+        cursor.executemany('''
+            INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
+            VALUES (?, ?, ?, datetime('now', ?))
+        ''', [
+            (1, 1, 1, '-400 days'), (1, 1, 0, '-400 days'), (1, 1, 1, '-399 days'), (2, 1, 1, '-400 days'),
+            (1, 2, 1, '-30 minutes'), (3, 2, 0, '-30 minutes'),
+        ])
+        app.db.commit()
+
+def snapshot(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('SELECT COUNT(*) FROM word_review_items')
+        items = cursor.fetchone()[0]
+        cursor.execute('SELECT id, review_items_count, correct_count FROM study_sessions ORDER BY id')
+        sessions = [tuple(row) for row in cursor.fetchall()]
+        return items, sessions, stats.read_stats(cursor)
+
+def test_compaction_keeps_statistics(portal_app, portal_client):
+    seed(portal_app)
+    before_items, before_sessions, before_stats = snapshot(portal_app)
+    assert before_items == 6
+
+    report = portal_client.post('/api/admin/reviews/compact').get_json()
+    assert (report['compacted'], report['daily_rows'], report['archived']) == (4, 3, 0)
+
+    items, sessions, dashboard = snapshot(portal_app)
+    assert items == 2
+    # Session counters and the dashboard are untouched by the compaction
+    assert (sessions, dashboard) == (before_sessions, before_stats)
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        assert stats.verify_stats(cursor) == {}
+        # A full rebuild counts the rollups too
+        stats.rebuild_stats(cursor)
+        assert stats.read_stats(cursor) == before_stats
+        # The triggers are back for new review items
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'word_review_items'")
+        assert cursor.fetchone()[0] == 4
+
+    # Compacting again finds nothing left to do
+    assert portal_client.post('/api/admin/reviews/compact').get_json()['compacted'] == 0
+
+def test_word_history_combines_rollups_and_recent_reviews(portal_app, portal_client):
+    seed(portal_app)
+    portal_client.post('/api/admin/reviews/compact')
+
+    data = portal_client.get('/words/1/history?days=500').get_json()
+    assert [(day['correct'], day['wrong']) for day in data['days']] == [(1, 1), (1, 0), (1, 0)]
+    assert (data['correct'], data['wrong']) == (3, 1)
+    assert len(portal_client.get('/words/1/history').get_json()['days']) == 1
+
+    assert portal_client.get('/words/99/history').status_code == 404
+    assert portal_client.get('/words/1/history?days=0').status_code == 400
+
+def test_compaction_archives_raw_items(portal_app):
+    seed(portal_app)
+    archive_fd, archive_path = tempfile.mkstemp()
+    try:
+        with portal_app.app_context():
+            report = compaction.compact_reviews(portal_app.db.get(), days=30, archive_path=archive_path, chunk_size=3)
+        assert (report['compacted'], report['archived'], report['chunks']) == (4, 4, 2)
+
+        archive = sqlite3.connect(archive_path)
+        rows = archive.execute('SELECT word_id, study_session_id, correct FROM word_review_items ORDER BY id').fetchall()
+        archive.close()
+        assert rows == [(1, 1, 1), (1, 1, 0), (1, 1, 1), (2, 1, 1)]
+    finally:
+        os.close(archive_fd)
+        os.unlink(archive_path)
+
+def test_reset_clears_rollups(portal_app, portal_client):
+    seed(portal_app)
+    portal_client.post('/api/admin/reviews/compact')
+    portal_client.post('/api/study-sessions/reset')
+
+    items, sessions, dashboard = snapshot(portal_app)
+    assert (items, sessions) == (0, [])
+    assert (dashboard['total_words_studied'], dashboard['success_rate']) == (0, 0)
+    with portal_app.app_context():
+        assert stats.verify_stats(portal_app.db.cursor()) == {}
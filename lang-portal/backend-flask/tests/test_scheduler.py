@@ -0,0 +1,69 @@
+# Test the SM-2 scheduler and the group due queue
+
+from lib import scheduler
+
+def test_sm2_progression():
+    schedule = scheduler.new_schedule(1)
+    intervals = []
+    for _ in range(4):
+        schedule = scheduler.review(schedule, True, '2025-01-01 10:00:00')
+        intervals.append(schedule['interval_days'])
+    assert intervals == [1.0, 6.0, 15.0, 37.5]
+    assert schedule['ease'] == 2.5
+
+    lapsed = scheduler.review(schedule, False, '2025-01-01 10:00:00')
+    assert (lapsed['repetitions'], lapsed['lapses'], lapsed['due_at']) == (0, 1, '2025-01-01 10:10:00')
+    assert lapsed['ease'] == 1.96
+
+    # The ease factor never drops below the SM-2 minimum
+    for _ in range(10):
+        lapsed = scheduler.review(lapsed, False, '2025-01-01 10:00:00')
+    assert lapsed['ease'] == scheduler.MINIMUM_EASE
+
+def seed(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute("INSERT INTO study_activities (name, url) VALUES ('Typing Tutor', 'http://localhost:8080')")
+        cursor.execute("INSERT INTO groups (name) VALUES ('Core Verbs'), ('Core Adjectives')")
+        for i in range(6):
+            cursor.execute('''
+                INSERT INTO words (jiantizi, pinyin, english, parts) VALUES (?, ?, ?, '[]')
+            ''', (f'字{i}', f'zi{i}', f'word {i}'))
+            cursor.execute('INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)', (cursor.lastrowid, i % 2 + 1))
+        cursor.execute("INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (1, 1, '2025-01-01 10:00:00')")
+        app.db.commit()
+
+def due_ids(client, url):
+    return [(word['id'], word['new']) for word in client.get(url).get_json()['words']]
+
+def test_due_queue(portal_app, portal_client):
+    seed(portal_app)
+    # Group 1 holds words 1, 3 and 5; nothing has been reviewed yet
+    assert due_ids(portal_client, '/api/groups/1/due') == [(1, True), (3, True), (5, True)]
+
+    portal_client.post('/api/study-sessions/1/reviews', json=[
+        {'word_id': 1, 'correct': True},
+        {'word_id': 3, 'correct': False},
+        {'word_id': 2, 'correct': True},
+    ])
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        cursor.execute('SELECT word_id, repetitions, lapses FROM word_schedules ORDER BY word_id')
+        assert [tuple(row) for row in cursor.fetchall()] == [(1, 1, 0), (2, 1, 0), (3, 0, 1)]
+
+    # Reviewed words are not due yet, so only the new word is left
+    assert due_ids(portal_client, '/api/groups/1/due') == [(5, True)]
+    assert due_ids(portal_client, '/api/groups/1/due?new=false') == []
+
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        cursor.execute("UPDATE word_schedules SET due_at = '2025-01-02 00:00:00' WHERE word_id = 1")
+        cursor.execute("UPDATE word_schedules SET due_at = '2025-01-01 00:00:00' WHERE word_id IN (2, 3)")
+        portal_app.db.commit()
+    assert due_ids(portal_client, '/api/groups/1/due') == [(3, False), (1, False), (5, True)]
+    assert due_ids(portal_client, '/api/groups/1/due?limit=1') == [(3, False)]
+
+def test_due_errors(portal_app, portal_client):
+    seed(portal_app)
+    assert portal_client.get('/api/groups/9/due').status_code == 404
+    assert portal_client.get('/api/groups/1/due?limit=0').status_code == 400
@@ -0,0 +1,75 @@
+# Test the persisted session end time, duration and review counters
+
+def seed(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute("INSERT INTO study_activities (name, url) VALUES ('Typing Tutor', 'http://localhost:8080')")
+        cursor.execute("INSERT INTO groups (name) VALUES ('Core Verbs')")
+        cursor.execute("INSERT INTO words (jiantizi, pinyin, english, parts) VALUES ('学习', 'xué xí', 'to study', '[]')")
+        cursor.execute("INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (1, 1, '2025-01-01 10:00:00')")
+        app.db.commit()
+
+def review(app, created_at, correct=1):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute('''
+            INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
+            VALUES (1, 1, ?, ?)
+        ''', (correct, created_at))
+        app.db.commit()
+        return cursor.lastrowid
+
+def session(client):
+    return client.get('/api/study-sessions/1').get_json()['session']
+
+def test_reviews_extend_the_session(portal_app, portal_client):
+    seed(portal_app)
+    assert session(portal_client)['end_time'] == '2025-01-01 10:00:00'
+    assert session(portal_client)['duration_ms'] == 0
+
+    review(portal_app, '2025-01-01 10:02:00')
+    last = review(portal_app, '2025-01-01 10:05:30', correct=0)
+    review(portal_app, '2025-01-01 10:04:00')
+
+    current = session(portal_client)
+    assert (current['end_time'], current['duration_ms'], current['review_items_count']) == ('2025-01-01 10:05:30', 330000, 3)
+    recent = portal_client.get('/dashboard/recent-session').get_json()
+    assert (recent['correct_count'], recent['wrong_count']) == (2, 1)
+
+    # Removing the latest review moves the end back
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        cursor.execute('DELETE FROM word_review_items WHERE id = ?', (last,))
+        portal_app.db.commit()
+    current = session(portal_client)
+    assert (current['end_time'], current['duration_ms'], current['review_items_count']) == ('2025-01-01 10:04:00', 240000, 2)
+
+def test_close_fixes_the_end(portal_app, portal_client):
+    seed(portal_app)
+    review(portal_app, '2025-01-01 10:02:00')
+
+    response = portal_client.post('/api/study-sessions/1/close', json={'ended_at': '2025-01-01 10:10:00'})
+    assert response.status_code == 200
+    closed = response.get_json()
+    assert (closed['closed'], closed['end_time'], closed['duration_ms']) == (True, '2025-01-01 10:10:00', 600000)
+
+    # Late reviews are counted but do not move a closed session's end; closing again is a no-op
+    review(portal_app, '2025-01-01 10:20:00')
+    portal_client.post('/api/study-sessions/1/close')
+    current = session(portal_client)
+    assert (current['end_time'], current['review_items_count']) == ('2025-01-01 10:10:00', 2)
+
+    group_session = portal_client.get('/groups/1/study_sessions').get_json()['study_sessions'][0]
+    assert (group_session['end_time'], group_session['review_items_count']) == ('2025-01-01 10:10:00', 2)
+
+def test_close_never_ends_before_last_review(portal_app, portal_client):
+    seed(portal_app)
+    review(portal_app, '2025-01-01 10:02:00')
+    closed = portal_client.post('/api/study-sessions/1/close', json={'ended_at': '2025-01-01 10:01:00'}).get_json()
+    assert closed['end_time'] == '2025-01-01 10:02:00'
+
+def test_close_errors(portal_app, portal_client):
+    seed(portal_app)
+    assert portal_client.post('/api/study-sessions/7/close').status_code == 404
+    assert portal_client.post('/api/study-sessions/1/close', json={'ended_at': 'soon'}).status_code == 400
+    assert session(portal_client)['closed'] is False
@@ -0,0 +1,45 @@
+# Test fetching several words, with their groups and counters, in one request
+
+def seed(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.execute("INSERT INTO groups (name) VALUES ('Core Verbs'), ('Food, Drink & More')")
+        for i in range(4):
+            cursor.execute('''
+                INSERT INTO words (jiantizi, pinyin, english, parts) VALUES (?, ?, ?, '[]')
+            ''', (f'字{i}', f'zi{i}', f'word {i}'))
+        cursor.executemany('INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)',
+                           [(1, 1), (1, 2), (1, 2), (2, 2)])
+        cursor.execute('INSERT INTO word_reviews (word_id, correct_count, wrong_count) VALUES (2, 3, 1)')
+        app.db.commit()
+
+def test_get_word_parses_group_names(portal_app, portal_client):
+    seed(portal_app)
+    word = portal_client.get('/words/1').get_json()['word']
+    # Duplicate links collapse and commas in names survive
+    assert word['groups'] == [{'id': 1, 'name': 'Core Verbs'}, {'id': 2, 'name': 'Food, Drink & More'}]
+    assert portal_client.get('/words/3').get_json()['word']['groups'] == []
+    assert portal_client.get('/words/99').status_code == 404
+
+def test_multi_get_keeps_request_order(portal_app, portal_client):
+    seed(portal_app)
+    data = portal_client.get('/words?ids=2,99,1&ids=2').get_json()
+    assert [word['id'] for word in data['words']] == [2, 1]
+    assert data['missing'] == [99]
+    assert (data['words'][0]['correct_count'], data['words'][0]['wrong_count']) == (3, 1)
+    assert data['words'][0]['groups'] == [{'id': 2, 'name': 'Food, Drink & More'}]
+
+    response = portal_client.post('/words/batch', json={'ids': [4, 3]})
+    assert response.status_code == 200
+    assert [word['jiantizi'] for word in response.get_json()['words']] == ['字3', '字2']
+    assert portal_client.post('/words/batch', json=[1]).get_json()['words'][0]['id'] == 1
+
+def test_multi_get_errors(portal_app, portal_client):
+    seed(portal_app)
+    assert portal_client.get('/words?ids=1,x').status_code == 400
+    assert portal_client.get('/words?ids=').status_code == 400
+    assert portal_client.post('/words/batch', json={'ids': [1, True]}).status_code == 400
+    assert portal_client.post('/words/batch', json={'word_ids': [1]}).status_code == 400
+
+    portal_app.config['MAX_WORD_IDS'] = 2
+    assert portal_client.post('/words/batch', json=[1, 2, 3]).status_code == 413
@@ -0,0 +1,84 @@
+# Test the FTS5-backed word search and the triggers keeping it in sync
+
+WORDS = [
+    ('学习', 'xué xí', 'to study'),
+    ('学生', 'xué sheng', 'student'),
+    ('大学生', 'dà xué sheng', 'university student'),
+    ('绿色', 'lǜ sè', 'green'),
+    ('跑步', 'pǎo bù', 'to run'),
+]
+
+def seed(app):
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.executemany('''
+            INSERT INTO words (jiantizi, pinyin, english, parts) VALUES (?, ?, ?, '[]')
+        ''', WORDS)
+        app.db.commit()
+
+def search(client, **params):
+    response = client.get('/words/search', query_string=params)
+    assert response.status_code == 200
+    return [word['jiantizi'] for word in response.get_json()['words']]
+
+def test_hanzi_search(portal_app, portal_client):
+    seed(portal_app)
+    assert search(portal_client, q='学') == ['学习', '学生']
+    assert search(portal_client, q='学生', match='exact') == ['学生']
+    # One and two character substrings use the character index, longer ones the trigrams
+    assert search(portal_client, q='生', match='contains') == ['学生', '大学生']
+    assert search(portal_client, q='学生', match='contains') == ['学生', '大学生']
+    assert search(portal_client, q='大学生', match='contains') == ['大学生']
+
+def test_pinyin_is_tone_insensitive(portal_app, portal_client):
+    seed(portal_app)
+    assert search(portal_client, q='xue xi') == ['学习']
+    assert sorted(search(portal_client, q='xué')) == ['学习', '学生']
+    assert search(portal_client, q='xue2 sheng', field='pinyin', match='exact') == ['学生', '大学生']
+    assert search(portal_client, q='lv4', field='pinyin') == ['绿色']
+    assert sorted(search(portal_client, q='xue', match='contains')) == ['大学生', '学习', '学生']
+
+def test_v_stands_for_u_umlaut_in_pinyin_only(portal_app, portal_client):
+    seed(portal_app)
+    with portal_app.app_context():
+        portal_app.db.cursor().execute('''
+            INSERT INTO words (jiantizi, pinyin, english, parts) VALUES ('爱', 'ài', 'to love', '[]')
+        ''')
+        portal_app.db.commit()
+    assert search(portal_client, q='lv') == ['绿色']
+    assert search(portal_client, q='lv se', match='exact') == ['绿色']
+    # English terms keep their "v"
+    assert search(portal_client, q='love') == ['爱']
+
+def test_english_is_stemmed(portal_app, portal_client):
+    seed(portal_app)
+    assert search(portal_client, q='studying', field='english', match='exact') == ['学习']
+    assert search(portal_client, q='running', field='english', match='contains') == ['跑步']
+    assert sorted(search(portal_client, q='students', match='contains')) == ['大学生', '学生']
+
+def test_english_prefix_matches_any_term(portal_app, portal_client):
+    seed(portal_app)
+    assert search(portal_client, q='study') == ['学习']
+    assert sorted(search(portal_client, q='stud', field='english')) == ['大学生', '学习', '学生']
+    # Pinyin prefixes still start at the first syllable
+    assert sorted(search(portal_client, q='xue', field='pinyin')) == ['学习', '学生']
+
+def test_index_follows_word_changes(portal_app, portal_client):
+    seed(portal_app)
+    with portal_app.app_context():
+        cursor = portal_app.db.cursor()
+        cursor.execute("UPDATE words SET jiantizi = '练习', pinyin = 'liàn xí', english = 'to practise' WHERE id = 1")
+        cursor.execute('DELETE FROM words WHERE id = 2')
+        portal_app.db.commit()
+
+    assert search(portal_client, q='学') == []
+    assert search(portal_client, q='习', match='contains') == ['练习']
+    assert search(portal_client, q='lian') == ['练习']
+    assert search(portal_client, q='xue sheng', match='contains') == ['大学生']
+    assert search(portal_client, q='study') == []
+
+def test_search_errors(portal_app, portal_client):
+    assert portal_client.get('/words/search').status_code == 400
+    assert portal_client.get('/words/search?q=xue&field=hanzi').status_code == 400
+    assert portal_client.get('/words/search?q=xue&match=fuzzy').status_code == 400
+    assert portal_client.get('/words/search?q=%22%2A').status_code == 400
@@ -160,6 +160,26 @@ export const fetchWordDetails = async (wordId: number): Promise<Word> => {
   return data.word;
 };
 
+export interface WordsByIdResponse {
+  words: Word[];
+  missing: number[];
+}
+
+// Fetch several words (with groups and review counters) in one request
+export const fetchWordsByIds = async (wordIds: number[]): Promise<WordsByIdResponse> => {
+  const response = await fetch(`${API_BASE_URL}/words/batch`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ ids: wordIds }),
+  });
+  if (!response.ok) {
+    throw new Error('Failed to fetch words');
+  }
+  return response.json();
+};
+
 // Study Session API
 export const createStudySession = async (
   groupId: number,